@@ -0,0 +1,896 @@
+# -*- coding: utf-8 -*-
+"""
+异步数据库操作模块（MySQL存储后端）
+基于aiomysql连接池，供FastAPI路由直接await，避免阻塞事件循环
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import aiomysql
+
+from .migrations import check_schema
+from .query_log import TimedCursorMixin, db_timed, record_pool_wait
+from .retention import add_months, month_start, months_between, partition_month, partition_name
+from .storage.base import (
+    StorageBackend,
+    build_access_stats,
+    build_cursor_page,
+    decode_log_cursor,
+    stats_start_date
+)
+
+logger = logging.getLogger(__name__)
+
+
+# 每次删除过期日志分区后，分批删除对应日期的每日IP记录
+DAILY_IPS_PURGE_BATCH = 10000
+
+# 应用进程与MySQL的当前时间相差超过此秒数时警告（时区 TZ 不一致或时钟不同步）
+CLOCK_SKEW_WARNING_SECONDS = 300
+
+# 日志查询的列；未执行迁移5的旧表没有 hits 列，每行按1次访问返回
+LOG_COLUMNS = "id, ip_address, user_agent, access_time, hits"
+LOG_COLUMNS_WITHOUT_HITS = "id, ip_address, user_agent, access_time, 1 AS hits"
+
+
+def partition_definition(month):
+    """access_logs 的月份分区定义"""
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN ('{add_months(month, 1).isoformat()}')"
+
+
+class TimedDictCursor(TimedCursorMixin, aiomysql.DictCursor):
+    """带计时的字典游标（AsyncDatabase默认游标）"""
+
+
+class TimedSSDictCursor(TimedCursorMixin, aiomysql.SSDictCursor):
+    """带计时的服务端字典游标（流式读取，只统计执行语句的耗时）"""
+
+
+class AsyncDatabase(StorageBackend):
+    """异步数据库管理类（MySQL）"""
+    
+    name = 'mysql'
+    
+    def __init__(self, config):
+        """初始化数据库连接配置（连接池在 warm_up 或首次使用时创建）"""
+        super().__init__(config)
+        self.config = {
+            'host': config.MYSQL_HOST,
+            'port': config.MYSQL_PORT,
+            'user': config.MYSQL_USER,
+            'password': config.MYSQL_PASSWORD,
+            'db': config.MYSQL_DATABASE,
+            'charset': 'utf8mb4',
+            'cursorclass': TimedDictCursor,
+            'autocommit': False,
+        }
+        self.pool_size = config.MYSQL_POOL_SIZE
+        self.pool_min_size = min(config.MYSQL_POOL_MIN_SIZE, config.MYSQL_POOL_SIZE)
+        self.pool_recycle = config.MYSQL_POOL_RECYCLE
+        self.pool_timeout = config.MYSQL_POOL_TIMEOUT
+        self._pool = None
+        self._pool_lock = asyncio.Lock()
+        self._log_stats_ready = False
+        self._log_stats_retry_at = 0.0
+        self._config_version_ready = False
+        self._config_version_retry_at = 0.0
+        self._hits_column = False
+    
+    async def get_pool(self):
+        """获取（必要时创建）aiomysql连接池"""
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await aiomysql.create_pool(
+                        minsize=self.pool_min_size,
+                        maxsize=self.pool_size,
+                        pool_recycle=self.pool_recycle,
+                        **self.config
+                    )
+        return self._pool
+    
+    @asynccontextmanager
+    async def get_connection(self):
+        """从连接池获取数据库连接的异步上下文管理器（等待连接的时间计入当前请求）"""
+        start = time.perf_counter()
+        pool = await self.get_pool()
+        connection = await asyncio.wait_for(pool.acquire(), self.pool_timeout)
+        record_pool_wait(time.perf_counter() - start)
+        try:
+            yield connection
+            await connection.commit()
+        except Exception as e:
+            try:
+                await connection.rollback()
+            except Exception:
+                # 回滚失败说明连接已不可用，关闭后连接池不会再复用
+                connection.close()
+            logger.error(f"数据库错误: {str(e)}")
+            raise
+        finally:
+            pool.release(connection)
+    
+    async def warm_up(self):
+        """
+        预热连接池：建立 MYSQL_POOL_MIN_SIZE 个连接并逐个验证可用，
+        同时检查访问统计表，避免首批请求承担建连开销；最后检查索引和热点查询的执行计划
+        """
+        pool = await self.get_pool()
+        connections = []
+        try:
+            # 逐个借出：中途失败时已借出的连接也会归还
+            for _ in range(self.pool_min_size):
+                connections.append(await pool.acquire())
+            for connection in connections:
+                await connection.ping(reconnect=False)
+        finally:
+            for connection in connections:
+                pool.release(connection)
+        await self.ensure_access_log_stats()
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                if not await self._has_hits_column(cursor):
+                    logger.warning("access_logs 没有 hits 列（迁移5未执行），合并的重复访问只计入统计，请运行 python migrate.py")
+                await self._check_clock(cursor)
+        logger.info(f"数据库连接池已预热: {self.get_pool_stats()}")
+        
+        # 只检查不修改：缺少索引时提示运行 migrate.py
+        try:
+            for warning in await check_schema(self):
+                logger.warning(warning)
+        except Exception as e:
+            logger.warning(f"检查表结构失败: {str(e)}")
+    
+    @staticmethod
+    async def _check_clock(cursor):
+        """
+        比较应用进程与MySQL的当前时间
+        
+        access_time 由应用进程生成（批量写入），进程时区必须与MySQL的 time_zone 一致，
+        否则新日志与旧日志（由MySQL的 CURRENT_TIMESTAMP 生成）的时间错开
+        
+        Returns:
+            相差的秒数（应用减MySQL）
+        """
+        await cursor.execute("SELECT NOW() AS db_now")
+        skew = (datetime.now() - (await cursor.fetchone())['db_now']).total_seconds()
+        if abs(skew) > CLOCK_SKEW_WARNING_SECONDS:
+            logger.warning(
+                f"应用进程时间与MySQL相差{skew / 3600:+.1f}小时，访问日志时间会错开，"
+                f"请设置 TZ 与MySQL的 time_zone 一致"
+            )
+        return skew
+    
+    def get_pool_stats(self):
+        """获取连接池统计信息"""
+        if self._pool is None:
+            return {'size': self.pool_size, 'open': 0, 'idle': 0, 'in_use': 0}
+        return {
+            'size': self._pool.maxsize,
+            'open': self._pool.size,
+            'idle': self._pool.freesize,
+            'in_use': self._pool.size - self._pool.freesize,
+        }
+    
+    async def close(self):
+        """关闭连接池和密码哈希线程池"""
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+        await super().close()
+    
+    # ==================== 配置管理 ====================
+    
+    @db_timed
+    async def get_all_config(self):
+        """获取所有配置"""
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT config_key, config_value FROM config")
+                results = await cursor.fetchall()
+                return {row['config_key']: row['config_value'] for row in results}
+    
+    @db_timed
+    async def get_config_snapshot(self):
+        """
+        获取所有配置及最后修改时间（一次查询）
+        
+        Returns:
+            (配置字典, 最后修改时间datetime或None)
+        """
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT config_key, config_value, updated_at FROM config")
+                results = await cursor.fetchall()
+        
+        configs = {row['config_key']: row['config_value'] for row in results}
+        timestamps = [row['updated_at'] for row in results if row.get('updated_at')]
+        return configs, max(timestamps) if timestamps else None
+    
+    @db_timed
+    async def update_configs(self, updates):
+        """
+        写入多个配置项（一条多行upsert + 版本号递增，同一事务提交）
+        
+        按 config_key 排序写入，并发更新时加锁顺序一致
+        
+        Returns:
+            新的配置版本号（版本号表不可用时为None）
+        """
+        items = sorted(updates.items())
+        await self.ensure_config_version()
+        version = None
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(f"""
+                    INSERT INTO config (config_key, config_value)
+                    VALUES {', '.join(['(%s, %s)'] * len(items))}
+                    ON DUPLICATE KEY UPDATE
+                        config_value = VALUES(config_value),
+                        updated_at = CURRENT_TIMESTAMP
+                """, [param for item in items for param in item])
+                if self._config_version_ready:
+                    await cursor.execute("UPDATE config_version SET version = version + 1 WHERE id = 1")
+                    # 版本号行已被本事务锁定，读到的就是本次写入后的值
+                    await cursor.execute("SELECT version FROM config_version WHERE id = 1")
+                    result = await cursor.fetchone()
+                    version = result['version'] if result else None
+        logger.info(f"配置更新（版本{version}）: {updates}")
+        return version
+    
+    async def ensure_config_version(self):
+        """
+        检查配置版本号表（单行，每次修改配置加1；由迁移4创建，这里不建表）
+        
+        各worker进程通过比较版本号判断本地配置缓存是否过期
+        
+        Returns:
+            版本号表是否可用
+        """
+        if self._config_version_ready:
+            return True
+        if time.monotonic() < self._config_version_retry_at:
+            return False
+        try:
+            async with self.get_connection() as conn:
+                async with conn.cursor() as cursor:
+                    self._config_version_ready = await self._table_exists(cursor, 'config_version')
+        except Exception as e:
+            logger.warning(f"检查配置版本号表失败: {str(e)}")
+        if not self._config_version_ready:
+            self._config_version_retry_at = time.monotonic() + 60
+        return self._config_version_ready
+    
+    @db_timed
+    async def get_config_version(self):
+        """
+        获取当前配置版本号（主键查询）
+        
+        Returns:
+            版本号；版本号表不可用时返回None
+        """
+        if not await self.ensure_config_version():
+            return None
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT version FROM config_version WHERE id = 1")
+                result = await cursor.fetchone()
+                return result['version'] if result else None
+    
+    # ==================== 管理员认证 ====================
+    
+    @db_timed
+    async def get_admin_by_username(self, username):
+        """根据用户名获取管理员（包含 password_hash）"""
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("""
+                    SELECT id, username, password_hash, created_at
+                    FROM admin_users
+                    WHERE username = %s
+                """, (username,))
+                return await cursor.fetchone()
+    
+    @db_timed
+    async def set_admin_password_hash(self, username, password_hash):
+        """保存管理员密码哈希"""
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("""
+                    UPDATE admin_users
+                    SET password_hash = %s
+                    WHERE username = %s
+                """, (password_hash, username))
+    
+    @db_timed
+    async def get_admin_by_id(self, admin_id):
+        """根据ID获取管理员信息"""
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("""
+                    SELECT id, username, created_at
+                    FROM admin_users
+                    WHERE id = %s
+                """, (admin_id,))
+                return await cursor.fetchone()
+    
+    # ==================== 访问日志 ====================
+    
+    @staticmethod
+    async def _table_exists(cursor, table):
+        """当前库中是否存在该表（查询 information_schema，表不存在时不报错）"""
+        await cursor.execute("""
+            SELECT COUNT(*) AS count FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """, (table,))
+        result = await cursor.fetchone()
+        return bool(result and result['count'])
+    
+    async def ensure_access_log_stats(self):
+        """
+        检查访问统计表（计数行 + 按天汇总）是否可用，之后随日志写入在同一事务内增量更新
+        
+        统计表由迁移4创建、迁移6根据现有日志初始化，这里只检查不建表；
+        未初始化时统计查询使用实时查询
+        
+        - table_counters: 'access_logs' 日志总数，'access_log_ips' 独立IP总数，
+          'access_logs_purged' 按保留期删除的日志数，'access_log_hits' 合并到已有日志上的重复访问数
+        - access_log_daily: 每天的访问量和独立IP数
+        - access_log_daily_ips / access_log_ips: 用于判断IP是否首次出现
+        
+        Returns:
+            统计表是否可用
+        """
+        if self._log_stats_ready:
+            return True
+        if time.monotonic() < self._log_stats_retry_at:
+            return False
+        try:
+            async with self.get_connection() as conn:
+                async with conn.cursor() as cursor:
+                    self._log_stats_ready = await self._probe_access_log_stats(cursor)
+        except Exception as e:
+            logger.warning(f"检查访问统计表失败，暂时使用实时查询: {str(e)}")
+        if not self._log_stats_ready:
+            self._log_stats_retry_at = time.monotonic() + 60
+        return self._log_stats_ready
+    
+    async def _probe_access_log_stats(self, cursor):
+        """统计表是否已初始化（迁移6最后写入 'access_log_ips' 计数行，存在即表示已初始化）"""
+        if not await self._table_exists(cursor, 'table_counters'):
+            return False
+        await cursor.execute("""
+            SELECT 1 FROM table_counters WHERE table_name = 'access_log_ips'
+        """)
+        return await cursor.fetchone() is not None
+    
+    @db_timed
+    async def add_access_logs(self, rows):
+        """
+        批量记录访问日志（一次多行INSERT，失败时抛出异常由调用方处理）
+        
+        日志总数和按天汇总在同一事务内增量更新
+        
+        Args:
+            rows: [(ip_address, user_agent, access_time), ...]
+        
+        Returns:
+            写入的行数
+        """
+        if not rows:
+            return 0
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.executemany("""
+                    INSERT INTO access_logs (ip_address, user_agent, access_time)
+                    VALUES (%s, %s, %s)
+                """, rows)
+                if await self._log_stats_available(cursor):
+                    await self._update_access_log_stats(cursor, rows)
+        return len(rows)
+    
+    @db_timed
+    async def add_access_log_hits(self, hits):
+        """
+        把去重窗口内合并的重复访问累加到首条日志的 hits 上
+        
+        按 (access_time, ip_address, user_agent) 定位首条日志（access_time 索引范围很小；
+        同一IP后的多个访客按 User-Agent 区分），
+        按天汇总和 'access_log_hits' 计数在同一事务内增加；
+        未执行迁移5（没有 hits 列）时只增加统计
+        
+        Args:
+            hits: [(ip_address, user_agent, 首条日志的access_time, 重复次数), ...]
+        
+        Returns:
+            累加的访问次数
+        """
+        if not hits:
+            return 0
+        visits = {}
+        for _, _, access_time, count in hits:
+            visits[access_time.date()] = visits.get(access_time.date(), 0) + count
+        
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                if await self._has_hits_column(cursor):
+                    await cursor.executemany("""
+                        UPDATE access_logs SET hits = hits + %s
+                        WHERE access_time = %s AND ip_address = %s AND user_agent = %s
+                        ORDER BY id
+                        LIMIT 1
+                    """, [
+                        (count, access_time, ip_address, user_agent)
+                        for ip_address, user_agent, access_time, count in hits
+                    ])
+                if await self._log_stats_available(cursor):
+                    for stat_date in sorted(visits):
+                        await cursor.execute("""
+                            INSERT INTO access_log_daily (stat_date, visits, unique_ips)
+                            VALUES (%s, %s, 0)
+                            ON DUPLICATE KEY UPDATE visits = visits + VALUES(visits)
+                        """, (stat_date, visits[stat_date]))
+                    await cursor.execute("""
+                        UPDATE table_counters SET row_count = row_count + %s
+                        WHERE table_name = 'access_log_hits'
+                    """, (sum(visits.values()),))
+        return sum(visits.values())
+    
+    async def _log_stats_available(self, cursor):
+        """
+        写入日志的事务内判断是否同时更新统计（不使用本进程缓存的否定结果）
+        
+        统计表已初始化时必须在同一事务内更新，否则计数永久偏小：检查失败时抛出异常，
+        整批回滚后由调用方重试；统计表确实未初始化时只写日志，迁移6初始化时会统计这些行
+        """
+        if not self._log_stats_ready:
+            self._log_stats_ready = await self._probe_access_log_stats(cursor)
+        return self._log_stats_ready
+    
+    async def _has_hits_column(self, cursor):
+        """access_logs 是否有 hits 列（迁移5增加；确认存在后不再检查）"""
+        if not self._hits_column:
+            await cursor.execute("""
+                SELECT COUNT(*) AS count FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'access_logs' AND COLUMN_NAME = 'hits'
+            """)
+            result = await cursor.fetchone()
+            self._hits_column = bool(result and result['count'])
+        return self._hits_column
+    
+    async def _log_columns(self, cursor):
+        """日志查询的列（没有 hits 列时每行按1次访问返回）"""
+        return LOG_COLUMNS if await self._has_hits_column(cursor) else LOG_COLUMNS_WITHOUT_HITS
+    
+    async def _update_access_log_stats(self, cursor, rows):
+        """在写入日志的事务内更新计数和按天汇总（按固定顺序加锁，避免死锁）"""
+        days = {}
+        first_seen = {}
+        for ip_address, _, access_time in rows:
+            days.setdefault(access_time.date(), []).append(ip_address)
+            if ip_address not in first_seen or access_time < first_seen[ip_address]:
+                first_seen[ip_address] = access_time
+        
+        for stat_date in sorted(days):
+            ips = days[stat_date]
+            new_daily_ips = await cursor.executemany("""
+                INSERT IGNORE INTO access_log_daily_ips (stat_date, ip_address)
+                VALUES (%s, %s)
+            """, [(stat_date, ip) for ip in sorted(set(ips))]) or 0
+            await cursor.execute("""
+                INSERT INTO access_log_daily (stat_date, visits, unique_ips)
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    visits = visits + VALUES(visits),
+                    unique_ips = unique_ips + VALUES(unique_ips)
+            """, (stat_date, len(ips), new_daily_ips))
+        
+        new_ips = await cursor.executemany("""
+            INSERT IGNORE INTO access_log_ips (ip_address, first_seen)
+            VALUES (%s, %s)
+        """, sorted(first_seen.items())) or 0
+        
+        await cursor.execute("""
+            UPDATE table_counters
+            SET row_count = row_count + IF(table_name = 'access_logs', %s, %s)
+            WHERE table_name IN ('access_log_ips', 'access_logs')
+        """, (len(rows), new_ips))
+    
+    @db_timed
+    async def get_access_logs(self, page=1, page_size=50):
+        """
+        获取访问日志（分页）
+        
+        Args:
+            page: 页码（从1开始）
+            page_size: 每页记录数
+        
+        Returns:
+            日志列表
+        """
+        offset = (page - 1) * page_size
+        
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(f"""
+                    SELECT {await self._log_columns(cursor)}
+                    FROM access_logs
+                    ORDER BY access_time DESC, id DESC
+                    LIMIT %s OFFSET %s
+                """, (page_size, offset))
+                logs = await cursor.fetchall()
+        
+        return list(logs)
+    
+    @db_timed
+    async def get_access_logs_by_cursor(self, cursor=None, page_size=50):
+        """
+        获取访问日志（游标分页）
+        
+        按 (access_time, id) 定位，不使用OFFSET，任意深度的翻页耗时相同
+        
+        Args:
+            cursor: 上一次返回的 next_cursor / prev_cursor，为空时取第一页
+            page_size: 每页记录数
+        
+        Returns:
+            {'logs': 日志列表, 'next_cursor': 更早一页的游标, 'prev_cursor': 更新一页的游标}
+        
+        Raises:
+            ValueError: 游标格式无效
+        """
+        direction, boundary_time, boundary_id = (
+            decode_log_cursor(cursor) if cursor else ('next', None, None)
+        )
+        
+        if boundary_time is None:
+            sql = """
+                SELECT {columns}
+                FROM access_logs
+                ORDER BY access_time DESC, id DESC
+                LIMIT %s
+            """
+            params = (page_size + 1,)
+        elif direction == 'next':
+            sql = """
+                SELECT {columns}
+                FROM access_logs
+                WHERE access_time <= %s AND (access_time < %s OR id < %s)
+                ORDER BY access_time DESC, id DESC
+                LIMIT %s
+            """
+            params = (boundary_time, boundary_time, boundary_id, page_size + 1)
+        else:
+            sql = """
+                SELECT {columns}
+                FROM access_logs
+                WHERE access_time >= %s AND (access_time > %s OR id > %s)
+                ORDER BY access_time ASC, id ASC
+                LIMIT %s
+            """
+            params = (boundary_time, boundary_time, boundary_id, page_size + 1)
+        
+        async with self.get_connection() as conn:
+            async with conn.cursor() as db_cursor:
+                await db_cursor.execute(sql.format(columns=await self._log_columns(db_cursor)), params)
+                logs = list(await db_cursor.fetchall())
+        
+        return build_cursor_page(logs, page_size, direction, boundary_time)
+    
+    async def iter_access_logs(self, start=None, end=None, batch_size=1000):
+        """
+        流式读取访问日志（服务端游标，不在内存中缓存整个结果集）
+        
+        独占一个连接直到读取结束；中途停止时直接关闭该连接，不读完剩余结果
+        
+        Args:
+            start: 起始时间（含），为空表示不限
+            end: 结束时间（不含），为空表示不限
+            batch_size: 每次从服务端读取的行数
+        
+        Yields:
+            日志列表（每批最多 batch_size 条，按 access_time, id 升序）
+        """
+        conditions = []
+        params = []
+        if start is not None:
+            conditions.append("access_time >= %s")
+            params.append(start)
+        if end is not None:
+            conditions.append("access_time < %s")
+            params.append(end)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        if not self._hits_column:
+            async with self.get_connection() as conn:
+                async with conn.cursor() as probe:
+                    await self._has_hits_column(probe)
+        columns = LOG_COLUMNS if self._hits_column else LOG_COLUMNS_WITHOUT_HITS
+        
+        pool = await self.get_pool()
+        connection = await asyncio.wait_for(pool.acquire(), self.pool_timeout)
+        finished = False
+        try:
+            cursor = await connection.cursor(TimedSSDictCursor)
+            await cursor.execute(f"""
+                SELECT {columns}
+                FROM access_logs
+                {where}
+                ORDER BY access_time, id
+            """, params)
+            while True:
+                rows = await cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+            await cursor.close()
+            await connection.rollback()
+            finished = True
+        finally:
+            if not finished:
+                connection.close()
+            pool.release(connection)
+    
+    @db_timed
+    async def get_access_logs_count(self):
+        """获取日志总数（精确值，读取计数行，不可用时使用COUNT(*)）"""
+        if await self.ensure_access_log_stats():
+            async with self.get_connection() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute("""
+                        SELECT row_count FROM table_counters
+                        WHERE table_name = 'access_logs'
+                    """)
+                    result = await cursor.fetchone()
+            if result:
+                return result['row_count']
+        
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT COUNT(*) as count FROM access_logs")
+                result = await cursor.fetchone()
+                return result['count'] if result else 0
+    
+    @db_timed
+    async def get_access_stats(self, days=7):
+        """
+        获取访问统计（读取按天汇总，耗时与天数相关，与日志行数无关）
+        
+        Args:
+            days: 返回最近多少天的每日数据（含今天）
+        
+        Returns:
+            {
+                'total_visits': 总访问量,
+                'unique_ips': 独立IP总数,
+                'today_visits': 今日访问量,
+                'today_unique_ips': 今日独立IP数,
+                'daily': [{'date': 'YYYY-MM-DD', 'visits': n, 'unique_ips': n}, ...]（按日期升序）
+            }
+        """
+        start_date = stats_start_date(days)
+        
+        if await self.ensure_access_log_stats():
+            async with self.get_connection() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute("""
+                        SELECT table_name, row_count FROM table_counters
+                        WHERE table_name IN ('access_logs', 'access_log_ips', 'access_logs_purged', 'access_log_hits')
+                    """)
+                    counters = {row['table_name']: row['row_count'] for row in await cursor.fetchall()}
+                    await cursor.execute("""
+                        SELECT stat_date, visits, unique_ips
+                        FROM access_log_daily
+                        WHERE stat_date >= %s
+                    """, (start_date,))
+                    daily_rows = await cursor.fetchall()
+            total_visits = sum(
+                counters.get(name, 0) for name in ('access_logs', 'access_logs_purged', 'access_log_hits')
+            )
+            unique_ips = counters.get('access_log_ips', 0)
+        else:
+            # 统计表不可用时直接查询日志表
+            async with self.get_connection() as conn:
+                async with conn.cursor() as cursor:
+                    visits = 'SUM(hits)' if await self._has_hits_column(cursor) else 'COUNT(*)'
+                    await cursor.execute(f"""
+                        SELECT COALESCE({visits}, 0) AS visits, COUNT(DISTINCT ip_address) AS unique_ips
+                        FROM access_logs
+                    """)
+                    totals = await cursor.fetchone()
+                    await cursor.execute(f"""
+                        SELECT DATE(access_time) AS stat_date, {visits} AS visits,
+                               COUNT(DISTINCT ip_address) AS unique_ips
+                        FROM access_logs
+                        WHERE access_time >= %s
+                        GROUP BY DATE(access_time)
+                    """, (start_date,))
+                    daily_rows = await cursor.fetchall()
+            total_visits = totals['visits'] if totals else 0
+            unique_ips = totals['unique_ips'] if totals else 0
+        
+        by_date = {row['stat_date']: row for row in daily_rows}
+        return build_access_stats(start_date, days, total_visits, unique_ips, by_date)
+    
+    @db_timed
+    async def estimate_access_logs_count(self):
+        """获取日志总数估计值（来自InnoDB表统计信息，不扫描数据）"""
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("""
+                    SELECT TABLE_ROWS AS count
+                    FROM information_schema.TABLES
+                    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'access_logs'
+                """)
+                result = await cursor.fetchone()
+                return int(result['count'] or 0) if result else 0
+    
+    # ==================== 保留期维护（按月分区） ====================
+    
+    @asynccontextmanager
+    async def maintenance_cursor(self, lock='access_logs_maintenance', timeout=0):
+        """
+        持有维护锁的游标（GET_LOCK，多个worker同时维护时只有一个执行）
+        
+        Args:
+            lock: 锁名（自动加数据库名前缀）
+            timeout: 等待锁的秒数
+        
+        Yields:
+            游标；其他进程持有锁时为None
+        """
+        lock_name = f"{self.config['db']}.{lock}"
+        async with self.get_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT GET_LOCK(%s, %s) AS locked", (lock_name, timeout))
+                result = await cursor.fetchone()
+                if not result or not result['locked']:
+                    logger.info(f"其他进程持有维护锁 {lock}，跳过")
+                    yield None
+                    return
+                try:
+                    yield cursor
+                finally:
+                    await cursor.execute("SELECT RELEASE_LOCK(%s)", (lock_name,))
+    
+    @staticmethod
+    async def _get_log_partitions(cursor):
+        """access_logs 的分区名列表（未分区时为空）"""
+        await cursor.execute("""
+            SELECT PARTITION_NAME AS name
+            FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'access_logs'
+            ORDER BY PARTITION_ORDINAL_POSITION
+        """)
+        return [row['name'] for row in await cursor.fetchall() if row['name']]
+    
+    async def partition_access_logs(self, through):
+        """
+        把 access_logs 转换为按月分区表（一次性操作，会重建整个表，由 maintain.py 手动执行）
+        
+        主键改为 (id, access_time)（分区列必须包含在主键中）；
+        从最早的日志所在月份建到 through 所在月份，另加 pmax 分区
+        
+        Returns:
+            新建的分区名列表；已分区时为空
+        """
+        async with self.maintenance_cursor() as cursor:
+            if cursor is None or await self._get_log_partitions(cursor):
+                return []
+            await cursor.execute("SELECT MIN(access_time) AS first_time FROM access_logs")
+            result = await cursor.fetchone()
+            first_month = month_start(result['first_time'].date() if result['first_time'] else through)
+            months = months_between(first_month, through)
+            definitions = ',\n'.join(partition_definition(month) for month in months)
+            logger.info(f"转换 access_logs 为按月分区表（{len(months)}个分区）...")
+            await cursor.execute(f"""
+                ALTER TABLE access_logs
+                DROP PRIMARY KEY, ADD PRIMARY KEY (id, access_time)
+                PARTITION BY RANGE COLUMNS (access_time) (
+                    {definitions},
+                    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+                )
+            """)
+            return [partition_name(month) for month in months]
+    
+    async def ensure_log_partitions(self, through):
+        """
+        预建到 through 所在月份为止的分区（拆分空的 pmax 分区，不移动数据）
+        
+        Returns:
+            新建的分区名列表
+        """
+        async with self.maintenance_cursor() as cursor:
+            if cursor is None:
+                return []
+            partitions = await self._get_log_partitions(cursor)
+            if not partitions:
+                logger.info("access_logs 未分区，运行 python maintain.py partition 转换后才能按月维护")
+                return []
+            months = [month for month in map(partition_month, partitions) if month]
+            start = add_months(max(months), 1) if months else month_start(through)
+            new_months = months_between(start, through)
+            if not new_months:
+                return []
+            definitions = ',\n'.join(partition_definition(month) for month in new_months)
+            await cursor.execute(f"""
+                ALTER TABLE access_logs REORGANIZE PARTITION pmax INTO (
+                    {definitions},
+                    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+                )
+            """)
+            added = [partition_name(month) for month in new_months]
+            logger.info(f"已预建访问日志分区: {', '.join(added)}")
+            return added
+    
+    async def purge_access_logs(self, before):
+        """
+        删除 before 之前的月份分区（先汇总再删除）
+        
+        每个分区：
+        1. 用分区内的原始日志重算这些天的按天汇总（覆盖写入，修正写入时未能更新的汇总）
+        2. 记录到 access_log_purges 并调整计数行，提交
+        3. DROP PARTITION（只删除分区文件，耗时与行数无关）
+        
+        在第2、3步之间中断时再次执行是安全的：已记录的分区不会重复调整计数
+        
+        Returns:
+            删除的行数
+        """
+        purged = 0
+        async with self.maintenance_cursor() as cursor:
+            if cursor is None:
+                return 0
+            partitions = await self._get_log_partitions(cursor)
+            if not partitions:
+                logger.warning("access_logs 未分区，跳过过期日志清理（运行 python maintain.py partition 转换）")
+                return 0
+            
+            for name in partitions:
+                month = partition_month(name)
+                if month is None or add_months(month, 1) > before:
+                    continue
+                purged += await self._purge_log_partition(cursor, name)
+            
+            # 这些日期的独立IP数已汇总，每日IP记录不再需要
+            while True:
+                deleted = await cursor.execute("""
+                    DELETE FROM access_log_daily_ips WHERE stat_date < %s LIMIT %s
+                """, (before, DAILY_IPS_PURGE_BATCH))
+                await cursor.connection.commit()
+                if deleted < DAILY_IPS_PURGE_BATCH:
+                    break
+        return purged
+    
+    async def _purge_log_partition(self, cursor, name):
+        """汇总并删除一个月份分区，返回删除的行数"""
+        visits = 'SUM(hits)' if await self._has_hits_column(cursor) else 'COUNT(*)'
+        await cursor.execute(f"""
+            INSERT INTO access_log_daily (stat_date, visits, unique_ips)
+            SELECT DATE(access_time), {visits}, COUNT(DISTINCT ip_address)
+            FROM access_logs PARTITION ({name})
+            GROUP BY DATE(access_time)
+            ON DUPLICATE KEY UPDATE visits = VALUES(visits), unique_ips = VALUES(unique_ips)
+        """)
+        await cursor.execute(f"SELECT COUNT(*) AS count FROM access_logs PARTITION ({name})")
+        count = (await cursor.fetchone())['count']
+        recorded = await cursor.execute("""
+            INSERT IGNORE INTO access_log_purges (partition_name, row_count)
+            VALUES (%s, %s)
+        """, (name, count))
+        if recorded and await self._log_stats_available(cursor):
+            await cursor.execute("""
+                UPDATE table_counters
+                SET row_count = row_count + IF(table_name = 'access_logs', -%s, %s)
+                WHERE table_name IN ('access_logs', 'access_logs_purged')
+            """, (count, count))
+        await cursor.connection.commit()
+        
+        await cursor.execute(f"ALTER TABLE access_logs DROP PARTITION {name}")
+        logger.info(f"已删除访问日志分区 {name}: {count}条")
+        return count
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+缓存模块
+站点配置的进程内TTL缓存，写入时立即失效；已验证JWT令牌的LRU缓存
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from email.utils import formatdate
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigSnapshot:
+    """
+    某一时刻的站点配置快照（只读）
+    
+    ETag 和 Last-Modified 在加载时计算一次，条件请求无需再序列化配置
+    """
+    
+    __slots__ = ('configs', 'updated_at', 'etag', 'last_modified')
+    
+    def __init__(self, configs, updated_at=None):
+        self.configs = configs
+        self.updated_at = updated_at
+        
+        digest = hashlib.sha1(
+            json.dumps(configs, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()
+        self.etag = f'"{digest}"'
+        self.last_modified = (
+            formatdate(updated_at.timestamp(), usegmt=True) if updated_at else None
+        )
+
+
+class ConfigCache:
+    """
+    站点配置缓存（位于 AsyncDatabase 配置查询之前）
+    
+    - 缓存有效期内直接返回内存中的配置，不访问数据库
+    - 并发未命中时只有一个协程回源，其余等待结果
+    - 回源失败且有旧数据时返回旧数据，避免数据库抖动影响首页；
+      之后 error_backoff 秒内继续使用旧数据，不是每个请求都去访问故障的数据库
+    - ttl <= 0 时不缓存，每次都回源
+    - 多worker部署时，每隔 version_check_interval 秒最多查询一次数据库中的配置版本号，
+      版本变化说明其他进程修改了配置，立即失效（最大不一致时间约为该间隔）；
+      version_check_interval <= 0 时只依赖TTL
+    """
+    
+    def __init__(self, db, ttl=60, version_check_interval=1.0, error_backoff=5.0):
+        self.db = db
+        self.ttl = ttl
+        self.version_check_interval = version_check_interval
+        self.error_backoff = error_backoff
+        self._snapshot = None
+        self._version = None
+        self._expires_at = 0.0
+        self._next_version_check = 0.0
+        self._generation = 0      # 每次失效加1，防止失效前发起的回源写回旧数据
+        self._lock = asyncio.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'loads': 0,
+            'load_errors': 0,
+            'invalidations': 0,
+            'version_checks': 0,
+            'remote_invalidations': 0,
+        }
+    
+    def _fresh(self):
+        return self._snapshot is not None and time.monotonic() < self._expires_at
+    
+    async def get_snapshot(self):
+        """获取配置快照（优先使用缓存）"""
+        if self._fresh() and self._version_check_due():
+            await self._check_version()
+        if self._fresh():
+            self._stats['hits'] += 1
+            return self._snapshot
+        
+        self._stats['misses'] += 1
+        async with self._lock:
+            # 等锁期间其他协程可能已经完成回源
+            if not self._fresh():
+                await self._load()
+            return self._snapshot
+    
+    async def get_all_config(self):
+        """获取所有配置（优先使用缓存）"""
+        snapshot = await self.get_snapshot()
+        return dict(snapshot.configs)
+    
+    def _version_check_due(self):
+        return self.version_check_interval > 0 and time.monotonic() >= self._next_version_check
+    
+    async def _check_version(self):
+        """比较数据库中的配置版本号，变化时使缓存失效（同一时间只有一个协程检查）"""
+        self._next_version_check = time.monotonic() + self.version_check_interval
+        self._stats['version_checks'] += 1
+        try:
+            version = await self.db.get_config_version()
+        except Exception as e:
+            logger.debug(f"检查配置版本号失败: {str(e)}")
+            return
+        if version is not None and version != self._version:
+            logger.info(f"配置版本号变化 {self._version} -> {version}，刷新配置缓存")
+            self._stats['remote_invalidations'] += 1
+            self.invalidate()
+    
+    async def _load(self):
+        """从数据库加载配置（先读版本号，保证版本号不会比配置内容新）"""
+        generation = self._generation
+        try:
+            version = await self.db.get_config_version()
+            configs, updated_at = await self.db.get_config_snapshot()
+        except Exception:
+            self._stats['load_errors'] += 1
+            if self._snapshot is None:
+                raise
+            logger.warning(f"刷新配置缓存失败，{self.error_backoff}秒内继续使用旧数据", exc_info=True)
+            self._expires_at = time.monotonic() + self.error_backoff
+            return
+        self._stats['loads'] += 1
+        self._snapshot = ConfigSnapshot(configs, updated_at)
+        self._version = version
+        self._next_version_check = time.monotonic() + self.version_check_interval
+        if generation != self._generation:
+            # 回源期间配置被修改，结果只返回给当前调用方并标记为过期
+            self._expires_at = 0.0
+            return
+        self._expires_at = time.monotonic() + self.ttl if self.ttl > 0 else 0.0
+    
+    def invalidate(self):
+        """使缓存失效，下次读取时回源"""
+        self._snapshot = None
+        self._expires_at = 0.0
+        self._generation += 1
+        self._stats['invalidations'] += 1
+    
+    async def refresh(self):
+        """立即从数据库重新加载配置"""
+        async with self._lock:
+            self._expires_at = 0.0
+            await self._load()
+    
+    async def update_configs(self, updates):
+        """
+        在一个事务内写入多个配置并使缓存失效
+        
+        Returns:
+            新的配置版本号
+        """
+        try:
+            return await self.db.update_configs(updates)
+        finally:
+            self.invalidate()
+    
+    async def update_config(self, key, value):
+        """写入单个配置并使缓存失效"""
+        return await self.update_configs({key: value})
+    
+    def stats(self):
+        """缓存命中统计"""
+        lookups = self._stats['hits'] + self._stats['misses']
+        return {
+            'ttl': self.ttl,
+            'cached': self._snapshot is not None,
+            'version': self._version,
+            **self._stats,
+            'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+        }
+
+
+class VerifiedTokenCache:
+    """
+    已通过签名校验的JWT令牌缓存（LRU）
+    
+    - 以令牌的SHA-256摘要为键，命中时跳过签名校验和JSON解析
+    - 到达令牌的 exp 时间后条目失效
+    - 签名密钥变化时清空全部条目
+    - max_size <= 0 时不缓存
+    """
+    
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._entries = OrderedDict()   # digest -> (payload, exp)
+        self._secret_key = None
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'evictions': 0,
+            'flushes': 0,
+        }
+    
+    @staticmethod
+    def _digest(token):
+        return hashlib.sha256(token.encode('utf-8')).digest()
+    
+    def _check_secret(self, secret_key):
+        if secret_key != self._secret_key:
+            if self._entries:
+                logger.info("JWT签名密钥已变化，清空令牌缓存")
+                self._stats['flushes'] += 1
+            self._entries.clear()
+            self._secret_key = secret_key
+    
+    def get(self, token, secret_key):
+        """
+        查找已验证的令牌
+        
+        Returns:
+            令牌载荷（未命中或已过期时返回None）
+        """
+        if self.max_size <= 0:
+            return None
+        self._check_secret(secret_key)
+        digest = self._digest(token)
+        entry = self._entries.get(digest)
+        if entry is None:
+            self._stats['misses'] += 1
+            return None
+        payload, exp = entry
+        if exp <= time.time():
+            del self._entries[digest]
+            self._stats['expired'] += 1
+            self._stats['misses'] += 1
+            return None
+        self._entries.move_to_end(digest)
+        self._stats['hits'] += 1
+        return payload
+    
+    def put(self, token, secret_key, payload):
+        """缓存已验证的令牌（没有 exp 的令牌不缓存）"""
+        exp = payload.get('exp')
+        if self.max_size <= 0 or not isinstance(exp, (int, float)):
+            return
+        self._check_secret(secret_key)
+        digest = self._digest(token)
+        self._entries[digest] = (payload, exp)
+        self._entries.move_to_end(digest)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+    
+    def clear(self):
+        """清空缓存"""
+        self._entries.clear()
+    
+    def stats(self):
+        """缓存命中统计"""
+        lookups = self._stats['hits'] + self._stats['misses']
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            **self._stats,
+            'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+        }
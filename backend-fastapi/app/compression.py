@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+响应压缩
+按 Accept-Encoding 协商 br / gzip，只压缩允许的内容类型且不小于最小长度的响应；
+流式响应（StreamingResponse）逐块压缩并立即发送，不缓存整个响应体
+未安装brotli时只使用gzip
+"""
+
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 可选依赖
+    brotli = None
+
+DEFAULT_CONTENT_TYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'text/csv',
+    'text/plain',
+    'text/html',
+)
+
+# 服务端优先顺序（客户端权重相同时使用靠前的编码）
+SUPPORTED_ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding, encodings=SUPPORTED_ENCODINGS):
+    """
+    根据 Accept-Encoding 选择压缩编码
+    
+    Args:
+        accept_encoding: 请求头的值，如 'gzip, deflate, br;q=0.9'
+        encodings: 服务端支持的编码（按优先顺序）
+    
+    Returns:
+        选中的编码，客户端不接受任何支持的编码时返回None
+    """
+    weights = {}
+    for item in (accept_encoding or '').split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        params = params.strip().lower()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+    
+    best, best_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class _GzipCompressor:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    
+    def compress(self, data, finish):
+        # 未结束时 Z_SYNC_FLUSH，保证已收到的数据块可以立即解压
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_FINISH if finish else zlib.Z_SYNC_FLUSH
+        )
+
+
+class _BrotliCompressor:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+    
+    def compress(self, data, finish):
+        output = self._compressor.process(data)
+        return output + (self._compressor.finish() if finish else self._compressor.flush())
+
+
+class CompressionMiddleware:
+    """
+    响应压缩ASGI中间件
+    
+    - 只压缩 content_types 中的内容类型，已有 Content-Encoding 的响应（如导出的 .gz 文件）不处理
+    - 完整响应体小于 minimum_size 字节时不压缩（如 /api/health），
+      流式响应有 Content-Length 且小于 minimum_size 时不压缩
+    - 可压缩的内容类型都带 Vary: Accept-Encoding；压缩后强ETag改为弱ETag
+    - 304 没有 Content-Type，除非明确是不可压缩的类型，也带 Vary: Accept-Encoding（与200一致）
+    """
+    
+    def __init__(self, app, minimum_size=1024, content_types=DEFAULT_CONTENT_TYPES,
+                 gzip_level=6, brotli_quality=4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.content_types = frozenset(t.lower() for t in content_types)
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        
+        encoding = None
+        if scope['method'] != 'HEAD':
+            encoding = negotiate_encoding(Headers(scope=scope).get('accept-encoding'))
+        await self.app(scope, receive, _CompressingSender(self, encoding, send))
+    
+    def compressible(self, status, headers):
+        """响应是否可以压缩（不考虑长度和客户端支持的编码）"""
+        if status < 200 or status in (204, 304) or 'content-encoding' in headers:
+            return False
+        return self._compressible_type(headers)
+    
+    def varies(self, status, headers):
+        """响应是否需要 Vary: Accept-Encoding"""
+        if status == 304:
+            # 304只有验证器，缓存用它更新已缓存的200，Vary必须与200相同
+            return 'content-type' not in headers or self._compressible_type(headers)
+        return self.compressible(status, headers)
+    
+    def _compressible_type(self, headers):
+        content_type = headers.get('content-type', '').split(';', 1)[0].strip().lower()
+        return content_type in self.content_types
+    
+    def create_compressor(self, encoding):
+        if encoding == 'br':
+            return _BrotliCompressor(self.brotli_quality)
+        return _GzipCompressor(self.gzip_level)
+
+
+class _CompressingSender:
+    """包装 send：暂存响应头，收到第一个响应体消息后决定是否压缩"""
+    
+    def __init__(self, middleware, encoding, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start_message = None
+        self.compressor = None
+    
+    async def __call__(self, message):
+        if message['type'] == 'http.response.start':
+            self.start_message = message
+            return
+        if self.start_message is not None:
+            start_message, self.start_message = self.start_message, None
+            if message['type'] == 'http.response.body':
+                await self._start(start_message, message)
+                return
+            await self.send(start_message)
+        
+        if self.compressor is None or message['type'] != 'http.response.body':
+            await self.send(message)
+            return
+        more_body = message.get('more_body', False)
+        body = self.compressor.compress(message.get('body', b''), finish=not more_body)
+        if body or not more_body:
+            await self.send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+    
+    async def _start(self, start_message, message):
+        middleware = self.middleware
+        headers = MutableHeaders(raw=list(start_message.get('headers', [])))
+        if not middleware.compressible(start_message['status'], headers):
+            if middleware.varies(start_message['status'], headers):
+                headers.add_vary_header('Accept-Encoding')
+                start_message = {**start_message, 'headers': headers.raw}
+            await self.send(start_message)
+            await self.send(message)
+            return
+        
+        headers.add_vary_header('Accept-Encoding')
+        body = message.get('body', b'')
+        more_body = message.get('more_body', False)
+        if more_body:
+            content_length = headers.get('content-length')
+            too_small = content_length is not None and int(content_length) < middleware.minimum_size
+        else:
+            too_small = len(body) < middleware.minimum_size
+        if self.encoding is None or too_small:
+            await self.send({**start_message, 'headers': headers.raw})
+            await self.send(message)
+            return
+        
+        self.compressor = middleware.create_compressor(self.encoding)
+        body = self.compressor.compress(body, finish=not more_body)
+        headers['Content-Encoding'] = self.encoding
+        etag = headers.get('etag')
+        if etag and not etag.startswith('W/'):
+            headers['ETag'] = f'W/{etag}'
+        if more_body:
+            del headers['Content-Length']
+        else:
+            headers['Content-Length'] = str(len(body))
+            self.compressor = None
+        await self.send({**start_message, 'headers': headers.raw})
+        await self.send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
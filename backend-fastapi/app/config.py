@@ -33,10 +33,83 @@ class Config:
     MYSQL_PASSWORD = os.environ.get('MYSQL_PASSWORD') or ''
     MYSQL_DATABASE = os.environ.get('MYSQL_DATABASE') or 'hello_world'
     
+    # 存储后端（mysql / sqlite / memory）
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND') or 'mysql'
+    # SQLite数据库文件路径（STORAGE_BACKEND=sqlite 时使用）
+    SQLITE_PATH = os.environ.get('SQLITE_PATH') or 'hello_world.db'
+    # sqlite / memory 后端首次启动时创建的 admin 账号密码，为空时不创建
+    ADMIN_INITIAL_PASSWORD = os.environ.get('ADMIN_INITIAL_PASSWORD') or ''
+    
     # 数据库连接池配置
-    MYSQL_POOL_SIZE = 5
-    MYSQL_POOL_RECYCLE = 3600
-    MYSQL_POOL_TIMEOUT = 30
+    MYSQL_POOL_SIZE = int(os.environ.get('MYSQL_POOL_SIZE') or 5)            # 最大连接数
+    MYSQL_POOL_MIN_SIZE = int(os.environ.get('MYSQL_POOL_MIN_SIZE') or 2)    # 启动时预热并保持的连接数
+    MYSQL_POOL_RECYCLE = int(os.environ.get('MYSQL_POOL_RECYCLE') or 3600)   # 连接最大存活秒数
+    MYSQL_POOL_TIMEOUT = int(os.environ.get('MYSQL_POOL_TIMEOUT') or 30)     # 获取连接等待秒数
+    
+    # 启动预热（连接池和配置缓存）最长等待秒数，超时后不阻塞启动
+    STARTUP_WARMUP_TIMEOUT = float(os.environ.get('STARTUP_WARMUP_TIMEOUT') or 10)
+    
+    # 密码哈希线程池（并发计算数 / 最多排队数，超出时登录返回429）
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 2)
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING') or 32)
+    
+    # 已验证JWT令牌缓存条数，0表示不缓存
+    TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE') or 1024)
+    
+    # 按客户端IP限流（每分钟请求数 / 允许的突发请求数），每分钟请求数为0表示不限流
+    RATE_LIMIT_LOG_PER_MINUTE = int(os.environ.get('RATE_LIMIT_LOG_PER_MINUTE') or 60)
+    RATE_LIMIT_LOG_BURST = int(os.environ.get('RATE_LIMIT_LOG_BURST') or 20)
+    RATE_LIMIT_LOGIN_PER_MINUTE = int(os.environ.get('RATE_LIMIT_LOGIN_PER_MINUTE') or 5)
+    RATE_LIMIT_LOGIN_BURST = int(os.environ.get('RATE_LIMIT_LOGIN_BURST') or 10)
+    # 限流器最多记录的客户端IP数，超出时淘汰最久未访问的IP
+    RATE_LIMIT_MAX_CLIENTS = int(os.environ.get('RATE_LIMIT_MAX_CLIENTS') or 10000)
+    
+    # 站点配置缓存有效期（秒），0表示不缓存
+    CONFIG_CACHE_TTL = int(os.environ.get('CONFIG_CACHE_TTL') or 60)
+    # 多worker时检查配置版本号的最小间隔（毫秒），即其他worker修改配置后的最大不一致时间，0表示不检查
+    CONFIG_VERSION_CHECK_INTERVAL_MS = int(os.environ.get('CONFIG_VERSION_CHECK_INTERVAL_MS') or 1000)
+    # /api/config 的Cache-Control响应头（配合ETag使浏览器/CDN每次都做条件请求）
+    CONFIG_CACHE_CONTROL = os.environ.get('CONFIG_CACHE_CONTROL') or 'no-cache'
+    
+    # 访问日志缓冲（队列容量 / 每批写入条数 / 最长写入间隔秒数）
+    ACCESS_LOG_BUFFER_SIZE = int(os.environ.get('ACCESS_LOG_BUFFER_SIZE') or 10000)
+    ACCESS_LOG_BATCH_SIZE = int(os.environ.get('ACCESS_LOG_BATCH_SIZE') or 200)
+    ACCESS_LOG_FLUSH_INTERVAL = float(os.environ.get('ACCESS_LOG_FLUSH_INTERVAL') or 1.0)
+    # 访问去重窗口秒数：同一访客（IP + User-Agent）窗口内的重复访问只累加到首条日志的 hits 上，0表示不去重
+    ACCESS_LOG_DEDUP_WINDOW = int(os.environ.get('ACCESS_LOG_DEDUP_WINDOW') or 0)
+    # 去重窗口最多记录的访客数，超出时提前结束最早的窗口
+    ACCESS_LOG_DEDUP_MAX_VISITORS = int(os.environ.get('ACCESS_LOG_DEDUP_MAX_VISITORS') or 10000)
+    
+    # 访问日志保留的完整月份数（另加当月），0表示永久保留；过期日志删除前已汇总到按天统计
+    ACCESS_LOG_RETENTION_MONTHS = int(os.environ.get('ACCESS_LOG_RETENTION_MONTHS') or 0)
+    # MySQL按月分区预建到当月之后第几个月
+    ACCESS_LOG_PARTITIONS_AHEAD = int(os.environ.get('ACCESS_LOG_PARTITIONS_AHEAD') or 3)
+    # 访问日志维护（预建分区、删除过期日志）的执行间隔秒数，0表示不在应用内执行（改用 maintain.py）
+    ACCESS_LOG_MAINTENANCE_INTERVAL = int(os.environ.get('ACCESS_LOG_MAINTENANCE_INTERVAL') or 21600)
+    
+    # 慢查询阈值（毫秒），超过时输出慢查询日志，0表示不记录
+    SLOW_QUERY_THRESHOLD_MS = int(os.environ.get('SLOW_QUERY_THRESHOLD_MS') or 200)
+    
+    # JSON响应编码器（orjson / json），未安装orjson时自动使用json
+    JSON_ENCODER = os.environ.get('JSON_ENCODER') or 'orjson'
+    
+    # 响应压缩（br / gzip）：小于该字节数的响应不压缩
+    COMPRESSION_MINIMUM_SIZE = int(os.environ.get('COMPRESSION_MINIMUM_SIZE') or 1024)
+    # 压缩的内容类型（逗号分隔）
+    COMPRESSION_CONTENT_TYPES = [
+        content_type.strip()
+        for content_type in (
+            os.environ.get('COMPRESSION_CONTENT_TYPES')
+            or 'application/json,application/x-ndjson,text/csv,text/plain,text/html'
+        ).split(',')
+        if content_type.strip()
+    ]
+    # gzip压缩级别（1-9）/ brotli压缩质量（0-11），级别越高CPU开销越大
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL') or 6)
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY') or 4)
+    
+    # /api/metrics 的访问令牌（Prometheus抓取用），为空时只允许管理员JWT
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or ''
     
     # CORS配置
     CORS_ORIGINS = ['*']  # 生产环境应该限制为具体域名
@@ -9,9 +9,12 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional
+import hmac
 import logging
 
 from .config import Config
+from .cache import VerifiedTokenCache
+from .rate_limit import TokenBucketLimiter
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +25,22 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 24 * 60  # 24小时
 
 # HTTP Bearer认证
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# 已验证令牌缓存（管理后台轮询时跳过重复的签名校验）
+token_cache = VerifiedTokenCache(max_size=Config.TOKEN_CACHE_SIZE)
+
+# 按客户端IP限流（记录访问日志 / 管理员登录）
+log_rate_limiter = TokenBucketLimiter(
+    Config.RATE_LIMIT_LOG_PER_MINUTE,
+    burst=Config.RATE_LIMIT_LOG_BURST,
+    max_clients=Config.RATE_LIMIT_MAX_CLIENTS
+)
+login_rate_limiter = TokenBucketLimiter(
+    Config.RATE_LIMIT_LOGIN_PER_MINUTE,
+    burst=Config.RATE_LIMIT_LOGIN_BURST,
+    max_clients=Config.RATE_LIMIT_MAX_CLIENTS
+)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -61,8 +80,13 @@ def verify_token(token: str) -> dict:
     Raises:
         HTTPException: 令牌无效或过期
     """
+    payload = token_cache.get(token, SECRET_KEY)
+    if payload is not None:
+        return payload
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        token_cache.put(token, SECRET_KEY, payload)
         return payload
     except JWTError as e:
         logger.error(f"JWT验证失败: {str(e)}")
@@ -106,6 +130,59 @@ async def get_current_admin(
     }
 
 
+async def verify_metrics_access(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> None:
+    """
+    校验监控指标的访问权限（METRICS_TOKEN 或管理员JWT令牌）
+    
+    Raises:
+        HTTPException: 未提供令牌或令牌无效
+    """
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="未提供认证信息",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    token = credentials.credentials
+    if Config.METRICS_TOKEN and hmac.compare_digest(token.encode(), Config.METRICS_TOKEN.encode()):
+        return
+    verify_token(token)
+
+
+def _get_app_resource(request: Request, name: str):
+    """
+    获取在 main.lifespan 中创建的共享资源
+    
+    Raises:
+        HTTPException: 应用尚未完成启动
+    """
+    resource = getattr(request.app.state, name, None)
+    if resource is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="服务尚未就绪"
+        )
+    return resource
+
+
+def get_db(request: Request):
+    """获取应用共享的数据库实例"""
+    return _get_app_resource(request, 'db')
+
+
+def get_config_cache(request: Request):
+    """获取应用共享的站点配置缓存"""
+    return _get_app_resource(request, 'config_cache')
+
+
+def get_log_buffer(request: Request):
+    """获取应用共享的访问日志缓冲队列"""
+    return _get_app_resource(request, 'log_buffer')
+
+
 def get_client_ip(request: Request) -> str:
     """
     获取客户端真实IP地址
@@ -126,3 +203,26 @@ def get_client_ip(request: Request) -> str:
     
     # 最后使用直接连接IP
     return request.client.host if request.client else '0.0.0.0'
+
+
+def rate_limit(limiter: TokenBucketLimiter, detail: str = "请求过于频繁，请稍后重试"):
+    """
+    生成按客户端IP限流的依赖（在路由处理函数之前执行）
+    
+    Args:
+        limiter: 限流器
+        detail: 被拒绝时的错误信息
+    
+    Raises:
+        HTTPException: 超出限制时返回429和 Retry-After 响应头
+    """
+    async def check_rate_limit(request: Request) -> None:
+        wait = limiter.acquire(get_client_ip(request))
+        if wait:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=detail,
+                headers={"Retry-After": limiter.retry_after(wait)},
+            )
+    
+    return check_rate_limit
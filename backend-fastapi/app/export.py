@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+访问日志导出
+把 AsyncDatabase.iter_access_logs 的结果逐批编码为 CSV / NDJSON，可选gzip压缩
+"""
+
+import csv
+import io
+import json
+import zlib
+from contextlib import aclosing
+
+EXPORT_FIELDS = ('id', 'ip_address', 'user_agent', 'access_time', 'hits')
+
+EXPORT_MEDIA_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# 以这些字符开头的单元格会被Excel等表格软件当作公式执行（CSV公式注入）
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _format_time(value):
+    return value.isoformat(sep=' ') if hasattr(value, 'isoformat') else value
+
+
+def _csv_text(value):
+    """客户端提供的文本（User-Agent、IP）以公式字符开头时加单引号前缀，按文本显示"""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def encode_csv(rows, header=False):
+    """把一批日志编码为CSV"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        writer.writerow((
+            row['id'],
+            _csv_text(row['ip_address']),
+            _csv_text(row['user_agent']),
+            _format_time(row['access_time']),
+            row['hits']
+        ))
+    return buffer.getvalue().encode('utf-8')
+
+
+def encode_ndjson(rows):
+    """把一批日志编码为NDJSON（每行一个JSON对象）"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({
+            'id': row['id'],
+            'ip_address': row['ip_address'],
+            'user_agent': row['user_agent'],
+            'access_time': _format_time(row['access_time']),
+            'hits': row['hits']
+        }, ensure_ascii=False))
+        lines.append('\n')
+    return ''.join(lines).encode('utf-8')
+
+
+async def stream_access_logs(db, fmt='csv', start=None, end=None, compress=False):
+    """
+    生成导出内容（字节块），供 StreamingResponse 使用
+    
+    内存占用只与批大小有关，与导出的总行数无关
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress else None
+    
+    def emit(chunk):
+        return compressor.compress(chunk) if compressor else chunk
+    
+    if fmt == 'csv':
+        header = emit(encode_csv([], header=True))
+        if header:
+            yield header
+    
+    async with aclosing(db.iter_access_logs(start=start, end=end)) as batches:
+        async for rows in batches:
+            chunk = emit(encode_csv(rows) if fmt == 'csv' else encode_ndjson(rows))
+            if chunk:
+                yield chunk
+    
+    if compressor:
+        yield compressor.flush()
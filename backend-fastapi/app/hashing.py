@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+密码哈希模块
+在独立的小线程池中执行werkzeug密码哈希计算，避免阻塞事件循环
+（hashlib 的 pbkdf2 / scrypt 计算期间会释放GIL）
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHasherBusy(Exception):
+    """等待计算的密码哈希任务过多"""
+
+
+class PasswordHasher:
+    """
+    有并发上限的密码哈希执行器
+    
+    - 最多 max_workers 个哈希计算同时进行
+    - 排队中的任务超过 max_pending 时直接拒绝（PasswordHasherBusy），
+      防止登录风暴堆积大量任务
+    """
+    
+    def __init__(self, max_workers=2, max_pending=32):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='password-hash'
+        )
+        self._in_flight = 0
+        self._stats = {
+            'completed': 0,
+            'rejected': 0,
+            'max_queue_depth': 0,
+        }
+    
+    async def _run(self, func, *args):
+        if self._in_flight >= self.max_workers + self.max_pending:
+            self._stats['rejected'] += 1
+            raise PasswordHasherBusy("密码校验请求过多")
+        self._in_flight += 1
+        queue_depth = max(self._in_flight - self.max_workers, 0)
+        if queue_depth > self._stats['max_queue_depth']:
+            self._stats['max_queue_depth'] = queue_depth
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._in_flight -= 1
+            self._stats['completed'] += 1
+    
+    async def check_password(self, password_hash, password):
+        """校验密码"""
+        return await self._run(check_password_hash, password_hash, password)
+    
+    async def hash_password(self, password):
+        """生成密码哈希"""
+        return await self._run(generate_password_hash, password)
+    
+    def shutdown(self):
+        """关闭线程池"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    def stats(self):
+        """执行器统计"""
+        return {
+            'max_workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'running': min(self._in_flight, self.max_workers),
+            'queue_depth': max(self._in_flight - self.max_workers, 0),
+            **self._stats,
+        }
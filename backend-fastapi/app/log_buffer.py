@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+访问日志缓冲模块
+POST /api/log 只把日志放入内存队列，由后台任务批量写入数据库；
+可选的去重窗口把同一访客短时间内的重复访问合并到首条日志的 hits 上
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# 与 access_logs.user_agent VARCHAR(500) 一致：超长时MySQL严格模式下整批写入失败，
+# 非严格模式下被截断后按 User-Agent 定位不到首条日志
+MAX_USER_AGENT_LENGTH = 500
+
+
+class VisitDeduplicator:
+    """
+    访问去重窗口（IP + User-Agent摘要）
+    
+    - 访客首次访问写入一条日志，之后 window 秒内的重复访问（刷新、前端重新挂载）
+      不再写入新日志，只累加到首条日志的 hits 上，总访问量不变
+    - 最多记录 max_size 个访客，超出时提前结束最早的窗口（之后的访问写入新日志）
+    - 多worker部署时每个进程单独去重
+    - window <= 0 时不去重
+    """
+    
+    def __init__(self, window=30, max_size=10000):
+        self.window = window
+        self.max_size = max(max_size, 1)
+        self._visitors = OrderedDict()   # (ip, UA摘要) -> (首条日志的access_time, 窗口结束时间)，按窗口开始时间排序
+        self._pending = {}               # (ip, User-Agent, 首条日志的access_time) -> 尚未写入的重复次数
+        self._stats = {
+            'duplicates': 0,
+            'evictions': 0,
+        }
+    
+    @property
+    def enabled(self):
+        return self.window > 0
+    
+    @staticmethod
+    def _key(ip_address, user_agent):
+        digest = hashlib.blake2b((user_agent or '').encode('utf-8'), digest_size=8).digest()
+        return ip_address, digest
+    
+    def _expire(self, now):
+        while self._visitors:
+            key, (_, expires_at) = next(iter(self._visitors.items()))
+            if expires_at > now:
+                break
+            del self._visitors[key]
+    
+    def add_repeat(self, ip_address, user_agent, now=None):
+        """
+        访客在窗口内已有日志时记为一次重复访问
+        
+        Returns:
+            是否为重复访问（True 时不需要写入新日志）
+        """
+        if not self.enabled:
+            return False
+        self._expire(time.monotonic() if now is None else now)
+        first = self._visitors.get(self._key(ip_address, user_agent))
+        if first is None:
+            return False
+        pending_key = (ip_address, user_agent, first[0])
+        self._pending[pending_key] = self._pending.get(pending_key, 0) + 1
+        self._stats['duplicates'] += 1
+        return True
+    
+    def remember(self, ip_address, user_agent, access_time, now=None):
+        """记录访客的首条日志，开始去重窗口"""
+        if not self.enabled:
+            return
+        now = time.monotonic() if now is None else now
+        self._visitors[self._key(ip_address, user_agent)] = (access_time, now + self.window)
+        while len(self._visitors) > self.max_size:
+            self._visitors.popitem(last=False)
+            self._stats['evictions'] += 1
+    
+    def take_pending(self):
+        """
+        取出尚未写入的重复访问
+        
+        Returns:
+            [(ip_address, user_agent, 首条日志的access_time, 重复次数), ...]
+        """
+        pending, self._pending = self._pending, {}
+        return [key + (count,) for key, count in pending.items()]
+    
+    def restore_pending(self, hits):
+        """写入失败时放回，下次重试"""
+        for ip_address, user_agent, access_time, count in hits:
+            key = (ip_address, user_agent, access_time)
+            self._pending[key] = self._pending.get(key, 0) + count
+    
+    def stats(self):
+        """去重统计"""
+        return {
+            'window': self.window,
+            'visitors': len(self._visitors),
+            'pending_hits': sum(self._pending.values()),
+            **self._stats,
+        }
+
+
+class AccessLogBuffer:
+    """
+    有界的访问日志缓冲队列
+    
+    - put() 不做任何IO，队列满时丢弃并计数
+    - 后台任务在积累 batch_size 条或每隔 flush_interval 秒时批量写入
+    - 写入失败的批次放回队首，下次重试（受队列容量限制）
+    - stop() 时把剩余日志全部写入
+    - 设置 deduplicator 时，去重窗口内的重复访问不入队，在日志写入后批量累加到首条日志上
+    """
+    
+    def __init__(self, db, max_size=10000, batch_size=200, flush_interval=1.0, deduplicator=None):
+        self.db = db
+        self.deduplicator = deduplicator
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer = deque()
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self._stopping = False
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'failed_batches': 0,
+            'flushes': 0,
+            'hits_written': 0,
+        }
+    
+    def put(self, ip_address, user_agent):
+        """
+        放入一条访问日志
+        
+        Returns:
+            是否成功入队（队列满时返回False，重复访问计入首条日志时返回True）
+        """
+        user_agent = (user_agent or '')[:MAX_USER_AGENT_LENGTH]
+        if self.deduplicator is not None and self.deduplicator.add_repeat(ip_address, user_agent):
+            return True
+        if len(self._buffer) >= self.max_size:
+            self._stats['dropped'] += 1
+            return False
+        # access_time 由应用进程的本地时间生成（不使用MySQL的 CURRENT_TIMESTAMP），进程时区 TZ 须与MySQL一致；
+        # 数据库只保存到秒，去重时按 (ip_address, user_agent, access_time) 定位首条日志
+        access_time = datetime.now().replace(microsecond=0)
+        self._buffer.append((ip_address, user_agent, access_time))
+        self._stats['enqueued'] += 1
+        if self.deduplicator is not None:
+            self.deduplicator.remember(ip_address, user_agent, access_time)
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        return True
+    
+    async def flush(self):
+        """把队列中的日志全部写入数据库（写入失败时停止，保留剩余日志）"""
+        async with self._flush_lock:
+            while self._buffer:
+                count = min(len(self._buffer), self.batch_size)
+                batch = [self._buffer.popleft() for _ in range(count)]
+                try:
+                    await self.db.add_access_logs(batch)
+                except Exception as e:
+                    self._stats['failed_batches'] += 1
+                    logger.error(f"批量写入访问日志失败（{len(batch)}条）: {str(e)}")
+                    room = self.max_size - len(self._buffer)
+                    if room < len(batch):
+                        self._stats['dropped'] += len(batch) - room
+                        batch = batch[:room]
+                    self._buffer.extendleft(reversed(batch))
+                    return
+                self._stats['written'] += len(batch)
+                self._stats['flushes'] += 1
+            # 队列已清空，重复访问对应的首条日志都已写入
+            if self.deduplicator is not None:
+                await self._flush_hits()
+    
+    async def _flush_hits(self):
+        """把去重窗口内合并的重复访问累加到首条日志上（失败时放回，下次重试）"""
+        hits = self.deduplicator.take_pending()
+        if not hits:
+            return
+        try:
+            await self.db.add_access_log_hits(hits)
+        except Exception as e:
+            self._stats['failed_batches'] += 1
+            logger.error(f"累加重复访问次数失败（{len(hits)}条）: {str(e)}")
+            self.deduplicator.restore_pending(hits)
+            return
+        self._stats['hits_written'] += sum(count for _, _, _, count in hits)
+    
+    async def _run(self):
+        """后台写入循环"""
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+    
+    def start(self):
+        """启动后台写入任务（需在事件循环中调用）"""
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self):
+        """停止后台任务（等待当前批次写完）并写入剩余日志"""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._buffer:
+            logger.error(f"关闭时仍有{len(self._buffer)}条访问日志未能写入")
+    
+    def stats(self):
+        """缓冲队列统计"""
+        return {
+            'pending': len(self._buffer),
+            'max_size': self.max_size,
+            **self._stats,
+        }
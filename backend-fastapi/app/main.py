@@ -6,12 +6,22 @@ FastAPI应用主文件
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+import asyncio
 import logging
 from datetime import datetime
 
 from .config import Config
-from .routers import public, admin
+from .storage import StorageBackend, create_database
+from .cache import ConfigCache
+from .log_buffer import AccessLogBuffer, VisitDeduplicator
+from .retention import LogMaintenanceTask
+from .responses import FastJSONResponse, PreEncodedJSONResponse, json_dumps
+from .metrics import REGISTRY, MetricsMiddleware, component_collector
+from .query_log import ServerTimingMiddleware
+from .compression import CompressionMiddleware
+from .dependencies import login_rate_limiter, log_rate_limiter, token_cache
+from .routers import public, admin, metrics
 
 # 配置日志
 logging.basicConfig(
@@ -20,6 +30,83 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 应用生命周期
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    启动：创建全局共享的数据库、配置缓存和访问日志缓冲，预热连接池和配置缓存，启动访问日志维护任务
+    关闭：停止维护任务，写入剩余访问日志，关闭连接池
+    """
+    db = create_database(Config)
+    config_cache = ConfigCache(
+        db,
+        ttl=Config.CONFIG_CACHE_TTL,
+        version_check_interval=Config.CONFIG_VERSION_CHECK_INTERVAL_MS / 1000
+    )
+    deduplicator = VisitDeduplicator(
+        window=Config.ACCESS_LOG_DEDUP_WINDOW,
+        max_size=Config.ACCESS_LOG_DEDUP_MAX_VISITORS
+    )
+    log_buffer = AccessLogBuffer(
+        db,
+        max_size=Config.ACCESS_LOG_BUFFER_SIZE,
+        batch_size=Config.ACCESS_LOG_BATCH_SIZE,
+        flush_interval=Config.ACCESS_LOG_FLUSH_INTERVAL,
+        deduplicator=deduplicator if deduplicator.enabled else None
+    )
+    
+    # 预热完成后才开始接收请求；数据库暂不可用时不阻止启动，首次请求时重试
+    try:
+        await asyncio.wait_for(
+            warm_up(db, config_cache),
+            timeout=Config.STARTUP_WARMUP_TIMEOUT
+        )
+    except Exception as e:
+        logger.error(f"启动预热失败（{type(e).__name__}），将在首次请求时重试: {str(e)}")
+    
+    app.state.db = db
+    app.state.config_cache = config_cache
+    app.state.log_buffer = log_buffer
+    log_buffer.start()
+    
+    # 多worker时每个进程都会执行，由数据库端的维护锁保证同一时间只有一个进程在维护
+    maintenance = LogMaintenanceTask(
+        db,
+        retention_months=Config.ACCESS_LOG_RETENTION_MONTHS,
+        months_ahead=Config.ACCESS_LOG_PARTITIONS_AHEAD,
+        interval=Config.ACCESS_LOG_MAINTENANCE_INTERVAL
+    )
+    if Config.ACCESS_LOG_MAINTENANCE_INTERVAL > 0:
+        maintenance.start()
+    
+    # 抓取 /api/metrics 时读取各组件的当前状态
+    collector = component_collector({
+        'db_pool': db.get_pool_stats,
+        'password_hasher': db.password_hasher.stats,
+        'token_cache': token_cache.stats,
+        'rate_limit_log': log_rate_limiter.stats,
+        'rate_limit_login': login_rate_limiter.stats,
+        'config_cache': config_cache.stats,
+        'access_log_buffer': log_buffer.stats,
+        'access_log_dedup': deduplicator.stats,
+        'log_maintenance': maintenance.stats,
+    })
+    REGISTRY.add_collector(collector)
+    
+    try:
+        yield
+    finally:
+        REGISTRY.remove_collector(collector)
+        await maintenance.stop()
+        await log_buffer.stop()
+        await db.close()
+        logger.info("数据库连接池已关闭")
+
+async def warm_up(db: StorageBackend, config_cache: ConfigCache):
+    """预热连接池和配置缓存"""
+    await db.warm_up()
+    await config_cache.refresh()
+
 # 创建FastAPI应用
 app = FastAPI(
     title="Hello World API",
@@ -29,6 +116,8 @@ app = FastAPI(
     openapi_url="/api/openapi.json",  # OpenAPI JSON 路径
     docs_url="/api/docs",       # Swagger UI
     redoc_url="/api/redoc",     # ReDoc
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # 配置CORS
@@ -40,37 +129,58 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 响应压缩（管理后台日志列表、导出等较大的响应）
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=Config.COMPRESSION_MINIMUM_SIZE,
+    content_types=Config.COMPRESSION_CONTENT_TYPES,
+    gzip_level=Config.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=Config.COMPRESSION_BROTLI_QUALITY,
+)
+
+# 每个请求的数据库耗时（Server-Timing响应头）
+app.add_middleware(ServerTimingMiddleware)
+
+# 请求数、处理中请求数和耗时统计（最外层，包含CORS处理时间）
+app.add_middleware(MetricsMiddleware)
+
 # 注册路由
 app.include_router(public.router, prefix="/api", tags=["公开API"])
 app.include_router(admin.router, prefix="/api/admin", tags=["管理后台"])
+app.include_router(metrics.router, prefix="/api", tags=["监控"])
+
+# 固定内容的响应体在启动时编码一次
+ROOT_BODY = json_dumps({
+    "success": True,
+    "message": "Hello World API",
+    "version": "2.0.0",
+    "docs": "/api/docs"
+})
+HEALTH_BODY_PREFIX, HEALTH_BODY_SUFFIX = json_dumps({
+    "success": True,
+    "message": "API运行正常",
+    "timestamp": "@timestamp@"
+}).split(b"@timestamp@")
 
 # 根路径
-@app.get("/")
+@app.get("/", response_class=PreEncodedJSONResponse)
 async def root():
     """API根路径"""
-    return {
-        "success": True,
-        "message": "Hello World API",
-        "version": "2.0.0",
-        "docs": "/api/docs"
-    }
+    return PreEncodedJSONResponse(ROOT_BODY)
 
 # 健康检查
-@app.get("/api/health")
+@app.get("/api/health", response_class=PreEncodedJSONResponse)
 async def health_check():
     """健康检查接口"""
-    return {
-        "success": True,
-        "message": "API运行正常",
-        "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    }
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S').encode('ascii')
+    return PreEncodedJSONResponse(HEALTH_BODY_PREFIX + timestamp + HEALTH_BODY_SUFFIX)
 
 # 全局异常处理
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """全局异常处理器"""
     logger.error(f"全局异常: {str(exc)}", exc_info=True)
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=500,
         content={
             "success": False,
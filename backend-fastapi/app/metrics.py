@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+监控指标模块
+进程内的计数器 / 仪表 / 直方图，以Prometheus文本格式输出（不依赖prometheus_client）
+
+多worker部署时每个进程各自计数，由Prometheus按实例分别抓取
+"""
+
+import logging
+import time
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+# 默认的HTTP请求耗时分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 数据库调用耗时分桶（秒）
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """指标基类（标签值按位置传入，顺序与 labelnames 一致）"""
+    
+    type = 'untyped'
+    
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+    
+    def header(self):
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}',
+        ]
+    
+    def samples(self):
+        for labels, value in sorted(self._values.items()):
+            yield self.name, labels, None, value
+    
+    def render(self):
+        lines = self.header()
+        for name, labels, extra, value in self.samples():
+            lines.append(f'{name}{_format_labels(self.labelnames, labels, extra)} {_format_value(value)}')
+        return lines
+    
+    def clear(self):
+        self._values.clear()
+
+
+class Counter(Metric):
+    """只增不减的计数器"""
+    
+    type = 'counter'
+    
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    """可增可减的当前值"""
+    
+    type = 'gauge'
+    
+    def set(self, *labels, value):
+        self._values[labels] = value
+    
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+    
+    def dec(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+
+class Histogram(Metric):
+    """分桶统计的耗时分布"""
+    
+    type = 'histogram'
+    
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, *labels, value):
+        series = self._values.get(labels)
+        if series is None:
+            # [各分桶计数（最后一个为+Inf）, 总和]
+            series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+    
+    def samples(self):
+        for labels, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield f'{self.name}_bucket', labels, f'le="{_format_value(bound)}"', cumulative
+            yield f'{self.name}_sum', labels, None, total
+            yield f'{self.name}_count', labels, None, cumulative
+
+
+class Registry:
+    """
+    指标注册表
+    
+    collector 为抓取时调用的函数，用于把连接池、缓存等组件的当前状态写入仪表
+    """
+    
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+    
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+    
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+    
+    def remove_collector(self, collector):
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+    
+    def render(self):
+        """生成Prometheus文本格式"""
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"采集监控指标失败: {str(e)}")
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    'http_requests_total', 'HTTP请求数', ('method', 'route', 'status')
+))
+HTTP_REQUESTS_IN_PROGRESS = REGISTRY.register(Gauge(
+    'http_requests_in_progress', '正在处理的HTTP请求数', ('method',)
+))
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    'http_request_duration_seconds', 'HTTP请求耗时（秒）', ('method', 'route', 'status')
+))
+DB_CALLS = REGISTRY.register(Counter(
+    'db_calls_total', '数据库方法调用次数', ('method', 'result')
+))
+DB_CALL_DURATION = REGISTRY.register(Histogram(
+    'db_call_duration_seconds', '数据库方法耗时（秒）', ('method',), buckets=DB_BUCKETS
+))
+DB_SLOW_QUERIES = REGISTRY.register(Counter(
+    'db_slow_queries_total', '超过慢查询阈值的SQL语句数'
+))
+COMPONENT_STATS = REGISTRY.register(Gauge(
+    'app_component_stat', '连接池、缓存、队列等组件的当前统计值', ('component', 'stat')
+))
+
+
+def component_collector(components):
+    """
+    生成把组件 stats() 结果写入 app_component_stat 的collector
+    
+    Args:
+        components: {组件名: 返回统计字典的函数}，只导出数值型统计项
+    """
+    def collect():
+        for component, get_stats in components.items():
+            for stat, value in get_stats().items():
+                if isinstance(value, bool):
+                    value = int(value)
+                if isinstance(value, (int, float)):
+                    COMPONENT_STATS.set(component, stat, value=value)
+    
+    return collect
+
+
+class MetricsMiddleware:
+    """
+    记录HTTP请求数、处理中请求数和耗时的ASGI中间件
+    
+    路由标签使用路由模板（如 /api/admin/logs），未匹配任何路由的请求统一记为 <unmatched>，
+    避免任意URL产生大量时间序列
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        
+        method = scope['method']
+        status_code = 500
+        
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+        
+        HTTP_REQUESTS_IN_PROGRESS.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            HTTP_REQUESTS_IN_PROGRESS.dec(method)
+            route = scope.get('route')
+            if route is not None:
+                template = route.path
+            elif 'endpoint' in scope:
+                template = scope['path']
+            else:
+                template = '<unmatched>'
+            status = str(status_code)
+            HTTP_REQUESTS.inc(method, template, status)
+            HTTP_REQUEST_DURATION.observe(method, template, status, value=duration)
@@ -0,0 +1,392 @@
+# -*- coding: utf-8 -*-
+"""
+MySQL表结构与版本化迁移
+表结构和路由查询需要的索引都在这里定义，由 migrate.py 按版本号顺序执行，
+已执行的版本记录在 schema_migrations 表中
+
+应用运行时不执行DDL：启动时只检查（check_schema），缺少索引或热点查询的执行计划为
+全表扫描 / filesort 时输出警告；统计表、配置版本号表未创建时只检查是否存在，相关功能降级
+"""
+
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+
+# 基础表（最初按部署文档手工创建，这里的定义与路由查询需要的索引一致）
+BASE_TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS config (
+        id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        config_key VARCHAR(100) NOT NULL,
+        config_value TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        UNIQUE KEY uk_config_key (config_key)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS admin_users (
+        id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        username VARCHAR(50) NOT NULL,
+        password_hash VARCHAR(255) NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE KEY uk_admin_users_username (username)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS access_logs (
+        id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+        ip_address VARCHAR(45) NOT NULL,
+        user_agent VARCHAR(500),
+        access_time DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        hits INT UNSIGNED NOT NULL DEFAULT 1,
+        KEY idx_access_logs_time_id (access_time, id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+)
+
+# 访问统计表（计数行与按天汇总，随日志写入增量维护）
+ACCESS_LOG_STATS_TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS table_counters (
+        table_name VARCHAR(64) NOT NULL PRIMARY KEY,
+        row_count BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS access_log_daily (
+        stat_date DATE NOT NULL PRIMARY KEY,
+        visits BIGINT NOT NULL DEFAULT 0,
+        unique_ips INT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS access_log_daily_ips (
+        stat_date DATE NOT NULL,
+        ip_address VARCHAR(45) NOT NULL,
+        PRIMARY KEY (stat_date, ip_address)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS access_log_ips (
+        ip_address VARCHAR(45) NOT NULL PRIMARY KEY,
+        first_seen DATETIME NOT NULL
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS access_log_purges (
+        partition_name VARCHAR(16) NOT NULL PRIMARY KEY,
+        row_count BIGINT NOT NULL,
+        purged_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+)
+
+# 配置版本号（单行，每次修改配置加1）
+CONFIG_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS config_version (
+        id TINYINT NOT NULL PRIMARY KEY,
+        version BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+SCHEMA_MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT NOT NULL PRIMARY KEY,
+        description VARCHAR(200) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+# 路由查询依赖的索引：(表, 索引前缀列, 是否必须唯一)
+REQUIRED_INDEXES = (
+    ('access_logs', ('access_time', 'id'), False),
+    ('config', ('config_key',), True),
+    ('admin_users', ('username',), True),
+)
+
+# 启动时用 EXPLAIN 检查的热点查询：(名称, 表, SQL)
+HOT_QUERIES = (
+    ('访问日志第一页', 'access_logs', """
+        SELECT id, ip_address, user_agent, access_time
+        FROM access_logs
+        ORDER BY access_time DESC, id DESC
+        LIMIT 51
+    """),
+    ('访问日志游标翻页', 'access_logs', """
+        SELECT id, ip_address, user_agent, access_time
+        FROM access_logs
+        WHERE access_time <= NOW() AND (access_time < NOW() OR id < 1)
+        ORDER BY access_time DESC, id DESC
+        LIMIT 51
+    """),
+    ('管理员登录', 'admin_users', """
+        SELECT id, username, password_hash, created_at
+        FROM admin_users
+        WHERE username = 'admin'
+    """),
+)
+
+# 表的估计行数低于此值时不检查执行计划（小表上优化器本来就会选择全表扫描）
+EXPLAIN_MIN_ROWS = 1000
+
+# 执行迁移时持有的数据库锁，等待秒数
+MIGRATION_LOCK = 'schema_migrations'
+MIGRATION_LOCK_TIMEOUT = 60
+
+
+Migration = namedtuple('Migration', ['version', 'description', 'apply'])
+
+
+# ==================== 索引检查 ====================
+
+async def _load_indexes(cursor, tables):
+    """
+    读取各表的索引
+    
+    Returns:
+        {表名: {索引名: (是否唯一, [列名...])}}
+    """
+    await cursor.execute(f"""
+        SELECT TABLE_NAME AS table_name, INDEX_NAME AS index_name,
+               NON_UNIQUE AS non_unique, COLUMN_NAME AS column_name
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({', '.join(['%s'] * len(tables))})
+        ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+    """, list(tables))
+    indexes = {}
+    for row in await cursor.fetchall():
+        index = indexes.setdefault(row['table_name'], {}).setdefault(
+            row['index_name'], (not row['non_unique'], [])
+        )
+        index[1].append(row['column_name'])
+    return indexes
+
+
+def has_index(indexes, table, columns, unique=False):
+    """
+    表上是否有以 columns 开头的索引
+    
+    unique 为True时要求唯一索引且列完全相同（前缀相同的唯一索引不能保证 columns 唯一）
+    """
+    for is_unique, index_columns in indexes.get(table, {}).values():
+        if unique:
+            if is_unique and tuple(index_columns) == tuple(columns):
+                return True
+        elif tuple(index_columns[:len(columns)]) == tuple(columns):
+            return True
+    return False
+
+
+def find_missing_indexes(indexes):
+    """返回缺少的索引 [(表, 列, 是否唯一)]（表不存在的不算）"""
+    return [
+        (table, columns, unique)
+        for table, columns, unique in REQUIRED_INDEXES
+        if table in indexes and not has_index(indexes, table, columns, unique)
+    ]
+
+
+def explain_warnings(name, plan_rows):
+    """根据 EXPLAIN 结果生成警告（全表扫描 / filesort）"""
+    warnings = []
+    for row in plan_rows:
+        extra = row.get('Extra') or ''
+        if row.get('type') == 'ALL':
+            warnings.append(f"热点查询「{name}」对 {row.get('table')} 全表扫描（约{row.get('rows')}行）")
+        if 'Using filesort' in extra:
+            warnings.append(f"热点查询「{name}」需要filesort排序: {extra}")
+    return warnings
+
+
+# ==================== 迁移 ====================
+
+async def _create_base_tables(cursor):
+    for ddl in BASE_TABLES:
+        await cursor.execute(ddl)
+
+
+async def _ensure_index(cursor, table, columns, unique, name):
+    """表上没有满足要求的索引时创建（手工建的表可能缺少索引）"""
+    indexes = await _load_indexes(cursor, [table])
+    if has_index(indexes, table, columns, unique):
+        return
+    kind = 'UNIQUE KEY' if unique else 'INDEX'
+    logger.info(f"为 {table} 创建索引 {name} ({', '.join(columns)})...")
+    await cursor.execute(f"ALTER TABLE {table} ADD {kind} {name} ({', '.join(columns)})")
+
+
+async def _add_access_logs_time_index(cursor):
+    await _ensure_index(cursor, 'access_logs', ('access_time', 'id'), False, 'idx_access_logs_time_id')
+
+
+async def _add_unique_keys(cursor):
+    # 已有重复数据时失败，需要先手工清理
+    await _ensure_index(cursor, 'config', ('config_key',), True, 'uk_config_key')
+    await _ensure_index(cursor, 'admin_users', ('username',), True, 'uk_admin_users_username')
+
+
+async def _create_stats_tables(cursor):
+    for ddl in ACCESS_LOG_STATS_TABLES + (CONFIG_VERSION_TABLE,):
+        await cursor.execute(ddl)
+    await cursor.execute("INSERT IGNORE INTO config_version (id, version) VALUES (1, 0)")
+
+
+async def _add_access_logs_hits(cursor):
+    await cursor.execute("""
+        SELECT COUNT(*) AS count FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'access_logs' AND COLUMN_NAME = 'hits'
+    """)
+    if not (await cursor.fetchone())['count']:
+        await cursor.execute("ALTER TABLE access_logs ADD COLUMN hits INT UNSIGNED NOT NULL DEFAULT 1")
+
+
+async def _init_access_log_stats(cursor):
+    # 根据现有日志初始化计数行和按天汇总；'access_log_ips' 计数行最后写入，存在即表示已初始化
+    await cursor.execute("SELECT 1 FROM table_counters WHERE table_name = 'access_log_ips'")
+    if not await cursor.fetchone():
+        logger.info("初始化访问统计表...")
+        await cursor.execute("""
+            INSERT IGNORE INTO access_log_daily_ips (stat_date, ip_address)
+            SELECT DISTINCT DATE(access_time), ip_address FROM access_logs
+        """)
+        await cursor.execute("""
+            INSERT IGNORE INTO access_log_daily (stat_date, visits, unique_ips)
+            SELECT DATE(access_time), SUM(hits), COUNT(DISTINCT ip_address)
+            FROM access_logs
+            GROUP BY DATE(access_time)
+        """)
+        await cursor.execute("""
+            INSERT IGNORE INTO table_counters (table_name, row_count)
+            SELECT 'access_log_hits', COALESCE(SUM(hits), 0) - COUNT(*) FROM access_logs
+        """)
+        await cursor.execute("""
+            INSERT IGNORE INTO access_log_ips (ip_address, first_seen)
+            SELECT ip_address, MIN(access_time) FROM access_logs GROUP BY ip_address
+        """)
+        await cursor.execute("""
+            INSERT IGNORE INTO table_counters (table_name, row_count)
+            SELECT 'access_logs', COUNT(*) FROM access_logs
+        """)
+        await cursor.execute("""
+            INSERT IGNORE INTO table_counters (table_name, row_count)
+            SELECT 'access_log_ips', COUNT(*) FROM access_log_ips
+        """)
+    # 旧版本在运行时初始化过的库可能缺少后来增加的计数行
+    await cursor.execute("""
+        INSERT IGNORE INTO table_counters (table_name, row_count)
+        VALUES ('access_logs_purged', 0), ('access_log_hits', 0)
+    """)
+
+
+# 按版本号升序执行；已发布的迁移不要修改，新的变更追加新版本
+MIGRATIONS = (
+    Migration(1, '创建 config / admin_users / access_logs 表', _create_base_tables),
+    Migration(2, 'access_logs 增加 (access_time, id) 索引', _add_access_logs_time_index),
+    Migration(3, 'config.config_key、admin_users.username 唯一索引', _add_unique_keys),
+    Migration(4, '访问统计表和配置版本号表', _create_stats_tables),
+    Migration(5, 'access_logs 增加 hits 列（合并的重复访问数）', _add_access_logs_hits),
+    Migration(6, '根据现有日志初始化访问统计', _init_access_log_stats),
+)
+
+
+async def _applied_versions(cursor):
+    """已执行的迁移版本号（schema_migrations 不存在时为空）"""
+    await cursor.execute("""
+        SELECT COUNT(*) AS count FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'schema_migrations'
+    """)
+    if not (await cursor.fetchone())['count']:
+        return set()
+    await cursor.execute("SELECT version FROM schema_migrations")
+    return {row['version'] for row in await cursor.fetchall()}
+
+
+async def migration_status(db):
+    """
+    查询迁移状态
+    
+    Returns:
+        {'applied': [已执行的版本号], 'pending': [未执行的 Migration]}
+    """
+    async with db.get_connection() as conn:
+        async with conn.cursor() as cursor:
+            applied = await _applied_versions(cursor)
+    return {
+        'applied': sorted(applied),
+        'pending': [migration for migration in MIGRATIONS if migration.version not in applied],
+    }
+
+
+async def migrate(db, target=None):
+    """
+    按顺序执行未执行的迁移（每个迁移执行后立即记录并提交）
+    
+    Args:
+        db: AsyncDatabase
+        target: 最多执行到哪个版本，为空表示全部
+    
+    Returns:
+        本次执行的版本号列表
+    
+    Raises:
+        RuntimeError: 等待迁移锁超时（其他进程正在执行迁移）
+    """
+    async with db.maintenance_cursor(MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT) as cursor:
+        if cursor is None:
+            raise RuntimeError("其他进程正在执行数据库迁移")
+        applied = await _applied_versions(cursor)
+        await cursor.execute(SCHEMA_MIGRATIONS_TABLE)
+        
+        executed = []
+        for migration in MIGRATIONS:
+            if migration.version in applied or (target is not None and migration.version > target):
+                continue
+            logger.info(f"执行数据库迁移 {migration.version}: {migration.description}")
+            await migration.apply(cursor)
+            await cursor.execute("""
+                INSERT INTO schema_migrations (version, description) VALUES (%s, %s)
+            """, (migration.version, migration.description))
+            await cursor.connection.commit()
+            executed.append(migration.version)
+        return executed
+
+
+# ==================== 启动检查 ====================
+
+async def check_schema(db):
+    """
+    检查未执行的迁移、缺少的索引和热点查询的执行计划（只读）
+    
+    Returns:
+        警告列表
+    """
+    warnings = []
+    tables = sorted({table for table, _, _ in REQUIRED_INDEXES})
+    async with db.get_connection() as conn:
+        async with conn.cursor() as cursor:
+            applied = await _applied_versions(cursor)
+            pending = [migration.version for migration in MIGRATIONS if migration.version not in applied]
+            if pending:
+                warnings.append(f"有{len(pending)}个数据库迁移未执行（{pending}），请运行 python migrate.py")
+            
+            for table, columns, unique in find_missing_indexes(await _load_indexes(cursor, tables)):
+                kind = '唯一索引' if unique else '索引'
+                warnings.append(f"{table} 缺少{kind} ({', '.join(columns)})，请运行 python migrate.py")
+            
+            await cursor.execute(f"""
+                SELECT TABLE_NAME AS table_name, TABLE_ROWS AS row_estimate
+                FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({', '.join(['%s'] * len(tables))})
+            """, tables)
+            row_estimates = {row['table_name']: row['row_estimate'] or 0 for row in await cursor.fetchall()}
+            for name, table, sql in HOT_QUERIES:
+                if row_estimates.get(table, 0) < EXPLAIN_MIN_ROWS:
+                    continue
+                await cursor.execute(f"EXPLAIN {sql}")
+                warnings.extend(explain_warnings(name, await cursor.fetchall()))
+    return warnings
@@ -24,7 +24,7 @@ class ConfigData(BaseModel):
     sub_title: str = Field(default="🎉 欢迎来到我的网站 🎉", description="副标题")
 
 class ConfigUpdateRequest(BaseModel):
-    """更新配置请求"""
+    """更新配置请求（字段名即配置键）"""
     main_title: Optional[str] = Field(None, min_length=1, max_length=100)
     sub_title: Optional[str] = Field(None, min_length=1, max_length=200)
 
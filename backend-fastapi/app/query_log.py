@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+数据库耗时统计模块
+- AsyncDatabase 方法的调用次数和耗时（Prometheus指标）
+- 超过阈值的语句输出结构化慢查询日志（SQL模板、参数个数、行数、耗时）
+- 每个HTTP请求累计数据库耗时、语句数和各方法耗时，通过 Server-Timing 响应头返回
+"""
+
+import functools
+import json
+import logging
+import re
+import time
+from contextvars import ContextVar
+
+from .config import Config
+from .metrics import DB_CALLS, DB_CALL_DURATION, DB_SLOW_QUERIES
+
+slow_query_logger = logging.getLogger('app.slow_query')
+
+# 日志中的SQL模板最大长度
+MAX_SQL_LENGTH = 500
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class RequestDbTiming:
+    """单个请求的数据库耗时累计"""
+    
+    __slots__ = ('path', 'queries', 'query_time', 'pool_wait', 'methods')
+    
+    def __init__(self, path=None):
+        self.path = path
+        self.queries = 0
+        self.query_time = 0.0
+        self.pool_wait = 0.0
+        self.methods = {}     # AsyncDatabase方法名 -> 累计耗时（秒）
+    
+    def server_timing(self):
+        """生成 Server-Timing 响应头的值（毫秒），如 db;dur=3.20;desc="2 queries", db.get_access_logs;dur=2.10"""
+        entries = [
+            f'db;dur={self.query_time * 1000:.2f};desc="{self.queries} queries"',
+            f'db-pool;dur={self.pool_wait * 1000:.2f}',
+        ]
+        entries.extend(
+            f'db.{method};dur={duration * 1000:.2f}'
+            for method, duration in self.methods.items()
+        )
+        return ', '.join(entries)
+
+
+# 当前请求的耗时累计对象（不在请求中时为None，如后台写入任务）
+_request_timing = ContextVar('request_db_timing', default=None)
+
+
+def current_timing():
+    """获取当前请求的数据库耗时累计对象"""
+    return _request_timing.get()
+
+
+def _param_count(args):
+    if args is None:
+        return 0
+    if isinstance(args, (tuple, list, dict)):
+        return len(args)
+    return 1
+
+
+def record_pool_wait(duration):
+    """记录等待连接池的时间"""
+    timing = _request_timing.get()
+    if timing is not None:
+        timing.pool_wait += duration
+
+
+def record_query(sql, params, rows, duration):
+    """
+    记录一条SQL语句的耗时
+    
+    Args:
+        sql: SQL模板（参数替换之前的语句）
+        params: 绑定的参数个数
+        rows: 返回或影响的行数
+        duration: 耗时（秒）
+    """
+    timing = _request_timing.get()
+    if timing is not None:
+        timing.queries += 1
+        timing.query_time += duration
+    
+    threshold = Config.SLOW_QUERY_THRESHOLD_MS
+    if threshold > 0 and duration * 1000 >= threshold:
+        DB_SLOW_QUERIES.inc()
+        if isinstance(sql, (bytes, bytearray)):
+            sql = bytes(sql).decode('utf-8', 'replace')
+        entry = {
+            'sql': _WHITESPACE.sub(' ', sql).strip()[:MAX_SQL_LENGTH],
+            'params': params,
+            'rows': rows,
+            'duration_ms': round(duration * 1000, 2),
+            'path': timing.path if timing is not None else None,
+        }
+        slow_query_logger.warning(
+            f"慢查询: {json.dumps(entry, ensure_ascii=False)}",
+            extra={'slow_query': entry}
+        )
+
+
+def db_timed(func):
+    """记录 AsyncDatabase 方法的调用次数和耗时（按方法名区分，同时计入当前请求）"""
+    method = func.__name__
+    
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = 'error'
+        try:
+            value = await func(*args, **kwargs)
+            result = 'ok'
+            return value
+        finally:
+            duration = time.perf_counter() - start
+            DB_CALLS.inc(method, result)
+            DB_CALL_DURATION.observe(method, value=duration)
+            timing = _request_timing.get()
+            if timing is not None:
+                timing.methods[method] = timing.methods.get(method, 0.0) + duration
+    
+    return wrapper
+
+
+class TimedCursorMixin:
+    """为aiomysql游标的 execute / executemany 计时（与具体游标类组合使用）"""
+    
+    _timing_suspended = False
+    
+    async def execute(self, query, args=None):
+        if self._timing_suspended:
+            return await super().execute(query, args)
+        start = time.perf_counter()
+        try:
+            return await super().execute(query, args)
+        finally:
+            rowcount = self.rowcount
+            record_query(
+                query,
+                _param_count(args),
+                rowcount if rowcount is not None and rowcount >= 0 else None,
+                time.perf_counter() - start
+            )
+    
+    async def executemany(self, query, args):
+        # 批量INSERT会被拼成一条多行语句执行，按原始模板记录一次
+        self._timing_suspended = True
+        start = time.perf_counter()
+        try:
+            return await super().executemany(query, args)
+        finally:
+            self._timing_suspended = False
+            if args:
+                record_query(
+                    query,
+                    sum(_param_count(row) for row in args),
+                    self.rowcount,
+                    time.perf_counter() - start
+                )
+
+
+class ServerTimingMiddleware:
+    """
+    为每个HTTP请求建立数据库耗时累计，并在响应头中返回 Server-Timing
+    
+    流式响应在发送响应头之后才读取的数据不计入
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        
+        timing = RequestDbTiming(scope.get('path'))
+        token = _request_timing.set(timing)
+        
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                headers = list(message.get('headers', []))
+                headers.append((b'server-timing', timing.server_timing().encode('latin-1')))
+                message = {**message, 'headers': headers}
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_timing.reset(token)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+请求限流
+按客户端IP的令牌桶，在写数据库或计算密码哈希之前拒绝过于频繁的请求
+"""
+
+import math
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """
+    按键（客户端IP）的令牌桶限流器（进程内，LRU淘汰）
+    
+    - 每个键最多积累 burst 个令牌，每分钟补充 per_minute 个，每个请求消耗1个
+    - 最多记录 max_clients 个键，超出时淘汰最久未访问的键（内存占用有上限）
+    - per_minute <= 0 时不限流
+    - 多worker部署时每个进程单独计数，实际上限约为 worker数 × 配置值
+    """
+    
+    def __init__(self, per_minute, burst=None, max_clients=10000):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60
+        self.burst = max(burst or per_minute, 1)
+        self.max_clients = max(max_clients, 1)
+        self._buckets = OrderedDict()    # key -> [令牌数, 上次补充时间]
+        self._stats = {
+            'allowed': 0,
+            'rejected': 0,
+            'evictions': 0,
+        }
+    
+    @property
+    def enabled(self):
+        return self.per_minute > 0
+    
+    def acquire(self, key, now=None):
+        """
+        为 key 消耗一个令牌
+        
+        Returns:
+            0表示允许；被拒绝时返回需要等待的秒数
+        """
+        if not self.enabled:
+            return 0
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+                self._stats['evictions'] += 1
+        else:
+            tokens, updated_at = bucket
+            bucket[0] = min(self.burst, tokens + (now - updated_at) * self.rate)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+        
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            self._stats['allowed'] += 1
+            return 0
+        self._stats['rejected'] += 1
+        return (1 - bucket[0]) / self.rate
+    
+    def retry_after(self, wait):
+        """Retry-After 响应头的值（整秒，至少1秒）"""
+        return str(max(math.ceil(wait), 1))
+    
+    def clear(self):
+        """清空所有计数"""
+        self._buckets.clear()
+    
+    def stats(self):
+        """限流统计"""
+        return {
+            'per_minute': self.per_minute,
+            'burst': self.burst,
+            'clients': len(self._buckets),
+            'max_clients': self.max_clients,
+            **self._stats,
+        }
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+JSON响应
+使用orjson直接序列化响应内容（原生输出ISO格式的datetime/date，省略微秒），
+未安装orjson时回退到标准库json，输出格式相同
+"""
+
+import json
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+
+from fastapi.responses import JSONResponse, Response
+
+from .config import Config
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def _default(value):
+    """json编码器无法处理的类型（orjson只会遇到Decimal）"""
+    if isinstance(value, datetime):
+        return value.isoformat(timespec='seconds')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _stdlib_dumps(content):
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        separators=(',', ':'),
+        default=_default
+    ).encode('utf-8')
+
+
+def _orjson_dumps(content):
+    # datetime 由orjson原生输出为 "2024-01-01T12:00:00"，不经过Python回调
+    return orjson.dumps(
+        content,
+        default=_default,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_OMIT_MICROSECONDS
+    )
+
+
+if Config.JSON_ENCODER == 'orjson' and orjson is None:
+    logger.warning("未安装orjson，JSON响应使用标准库json序列化")
+
+# 把响应内容序列化为UTF-8编码的JSON字节串
+json_dumps = _orjson_dumps if Config.JSON_ENCODER == 'orjson' and orjson is not None else _stdlib_dumps
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    高性能JSON响应（应用默认响应类）
+    
+    路由直接返回该类实例时跳过 jsonable_encoder，datetime等类型由编码器原生处理
+    """
+    
+    def render(self, content) -> bytes:
+        return json_dumps(content)
+
+
+class PreEncodedJSONResponse(Response):
+    """内容已预先编码为JSON字节串的响应（用于固定内容的接口）"""
+    
+    media_type = "application/json"
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+访问日志保留期维护
+MySQL的 access_logs 按月分区（RANGE COLUMNS access_time），定期预建未来分区；
+超过保留期的月份先重算按天汇总，再整个分区删除（DROP PARTITION，不逐行DELETE）
+
+可以作为后台任务运行（ACCESS_LOG_MAINTENANCE_INTERVAL），也可以用 maintain.py 手动执行
+"""
+
+import asyncio
+import logging
+import re
+import time
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+PARTITION_NAME = re.compile(r'^p(\d{4})(\d{2})$')
+
+
+def month_start(day):
+    """所在月份的1日"""
+    return day.replace(day=1)
+
+
+def add_months(month, count):
+    """month（某月1日）之后第 count 个月的1日，count 可以为负"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def months_between(first, last):
+    """[first, last] 之间每个月的1日"""
+    months = []
+    month = month_start(first)
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def partition_name(month):
+    """月份分区名，如 p202401"""
+    return f"p{month:%Y%m}"
+
+
+def partition_month(name):
+    """解析月份分区名，不是月份分区（如 pmax）时返回None"""
+    match = PARTITION_NAME.match(name or '')
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def retention_cutoff(retention_months, today=None):
+    """
+    保留当月及之前 retention_months 个完整月份，返回删除的截止日期（不含）
+    
+    例如 2024-05-20 保留3个月时返回 2024-02-01，即删除1月及更早的日志
+    """
+    return add_months(month_start(today or date.today()), -retention_months)
+
+
+async def run_log_maintenance(db, retention_months=0, months_ahead=3, today=None):
+    """
+    预建未来 months_ahead 个月的分区，删除超过保留期的访问日志
+    
+    Args:
+        db: 存储后端
+        retention_months: 保留的完整月份数，0表示不删除
+        months_ahead: 预建到当月之后第几个月
+    
+    Returns:
+        {'partitions_added': [分区名], 'cutoff': 截止日期或None, 'purged_rows': 删除的行数}
+    """
+    current_month = month_start(today or date.today())
+    result = {
+        'partitions_added': await db.ensure_log_partitions(add_months(current_month, months_ahead)),
+        'cutoff': None,
+        'purged_rows': 0,
+    }
+    if retention_months > 0:
+        result['cutoff'] = retention_cutoff(retention_months, current_month)
+        result['purged_rows'] = await db.purge_access_logs(result['cutoff'])
+    return result
+
+
+class LogMaintenanceTask:
+    """
+    定期执行 run_log_maintenance 的后台任务
+    
+    启动后立即执行一次，之后每隔 interval 秒执行；失败只记录日志，下次继续
+    """
+    
+    def __init__(self, db, retention_months=0, months_ahead=3, interval=21600):
+        self.db = db
+        self.retention_months = retention_months
+        self.months_ahead = months_ahead
+        self.interval = interval
+        self._task = None
+        self._stats = {
+            'runs': 0,
+            'failures': 0,
+            'purged_rows': 0,
+            'partitions_added': 0,
+            'last_run_time': 0.0,
+        }
+    
+    async def run_once(self):
+        """执行一次维护（异常只记录日志）"""
+        try:
+            result = await run_log_maintenance(self.db, self.retention_months, self.months_ahead)
+        except Exception as e:
+            self._stats['failures'] += 1
+            logger.error(f"访问日志维护失败: {str(e)}")
+            return None
+        finally:
+            self._stats['runs'] += 1
+            self._stats['last_run_time'] = time.time()
+        self._stats['purged_rows'] += result['purged_rows']
+        self._stats['partitions_added'] += len(result['partitions_added'])
+        if result['partitions_added'] or result['purged_rows']:
+            logger.info(f"访问日志维护完成: {result}")
+        return result
+    
+    async def _run(self):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+    
+    def start(self):
+        """启动后台任务（需在事件循环中调用）"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self):
+        """停止后台任务（正在执行的维护会被取消）"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def stats(self):
+        """维护任务统计"""
+        return {
+            'interval': self.interval,
+            'retention_months': self.retention_months,
+            **self._stats,
+        }
@@ -4,6 +4,6 @@
 导出所有路由供主应用使用
 """
 
-from . import public, admin
+from . import public, admin, metrics
 
-__all__ = ['public', 'admin']
+__all__ = ['public', 'admin', 'metrics']
@@ -5,28 +5,41 @@
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.responses import StreamingResponse
 from ..models import (
     ResponseModel, 
     AdminLoginRequest, 
     ConfigUpdateRequest,
     AccessLog
 )
-from ..dependencies import get_current_admin, create_access_token, get_client_ip
-from ..database import Database
-from ..config import Config
-from werkzeug.security import check_password_hash
+from ..dependencies import (
+    get_current_admin,
+    create_access_token,
+    get_client_ip,
+    get_db,
+    get_config_cache,
+    login_rate_limiter,
+    rate_limit
+)
+from ..storage import StorageBackend
+from ..hashing import PasswordHasherBusy
+from ..responses import FastJSONResponse
+from ..cache import ConfigCache
+from ..export import EXPORT_MEDIA_TYPES, stream_access_logs
 import logging
-from datetime import timedelta
+from datetime import datetime, timedelta
+from typing import Literal, Optional
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# 初始化数据库
-db = Database(Config)
-
 
-@router.post("/login")
-async def admin_login(request: Request, login_data: AdminLoginRequest):
+@router.post("/login", dependencies=[Depends(rate_limit(login_rate_limiter, "登录尝试过于频繁，请稍后重试"))])
+async def admin_login(
+    request: Request,
+    login_data: AdminLoginRequest,
+    db: StorageBackend = Depends(get_db)
+):
     """
     管理员登录
     
@@ -34,7 +47,7 @@ async def admin_login(request: Request, login_data: AdminLoginRequest):
     """
     try:
         # 使用固定用户名 "admin" 验证密码
-        admin = db.verify_admin("admin", login_data.password)
+        admin = await db.verify_admin("admin", login_data.password)
         
         if not admin:
             # 记录失败的登录尝试
@@ -73,6 +86,12 @@ async def admin_login(request: Request, login_data: AdminLoginRequest):
     
     except HTTPException:
         raise
+    except PasswordHasherBusy:
+        logger.warning("登录请求过多，密码校验队列已满")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="登录请求过多，请稍后重试"
+        )
     except Exception as e:
         logger.error(f"登录失败: {str(e)}")
         raise HTTPException(
@@ -97,14 +116,17 @@ async def admin_logout(current_admin: dict = Depends(get_current_admin)):
 
 
 @router.get("/config")
-async def get_admin_config(current_admin: dict = Depends(get_current_admin)):
+async def get_admin_config(
+    current_admin: dict = Depends(get_current_admin),
+    config_cache: ConfigCache = Depends(get_config_cache)
+):
     """
     获取网站配置（管理员）
     
     与公开API相同，但需要认证
     """
     try:
-        configs = db.get_all_config()
+        configs = await config_cache.get_all_config()
         
         return {
             "success": True,
@@ -124,7 +146,8 @@ async def get_admin_config(current_admin: dict = Depends(get_current_admin)):
 @router.put("/config")
 async def update_config(
     config_data: ConfigUpdateRequest,
-    current_admin: dict = Depends(get_current_admin)
+    current_admin: dict = Depends(get_current_admin),
+    config_cache: ConfigCache = Depends(get_config_cache)
 ):
     """
     更新网站配置
@@ -132,13 +155,8 @@ async def update_config(
     只有登录的管理员才能更新配置
     """
     try:
-        updates = {}
-        
-        if config_data.main_title is not None:
-            updates['main_title'] = config_data.main_title
-        
-        if config_data.sub_title is not None:
-            updates['sub_title'] = config_data.sub_title
+        # 请求模型的字段名即配置键，新增可配置字段时不需要修改这里
+        updates = config_data.model_dump(exclude_none=True)
         
         if not updates:
             raise HTTPException(
@@ -146,16 +164,16 @@ async def update_config(
                 detail="没有要更新的内容"
             )
         
-        # 更新配置
-        for key, value in updates.items():
-            db.update_config(key, value)
+        # 所有字段在一个事务内写入（同时使配置缓存失效）
+        version = await config_cache.update_configs(updates)
         
         logger.info(f"配置已更新 by {current_admin['username']}: {updates}")
         
         return {
             "success": True,
             "message": "配置更新成功",
-            "data": updates
+            "data": updates,
+            "version": version
         }
     
     except HTTPException:
@@ -168,16 +186,32 @@ async def update_config(
         )
 
 
+async def get_logs_total(db: StorageBackend, count: str) -> int:
+    """获取访问日志总数（exact：计数行，estimated：表统计信息）"""
+    if count == "estimated":
+        return await db.estimate_access_logs_count()
+    return await db.get_access_logs_count()
+
+
 @router.get("/logs")
 async def get_logs(
     page: int = 1,
     page_size: int = 50,
-    current_admin: dict = Depends(get_current_admin)
+    cursor: Optional[str] = None,
+    count: Literal["exact", "estimated"] = "exact",
+    current_admin: dict = Depends(get_current_admin),
+    db: StorageBackend = Depends(get_db)
 ):
     """
     获取访问日志
     
-    支持分页查询
+    支持两种分页方式：
+    - 页码分页：?page=N（兼容旧版）
+    - 游标分页：?cursor=（第一页）或 ?cursor=<next_cursor/prev_cursor>，
+      深度翻页不使用OFFSET，耗时与第一页相同
+    
+    总数默认为精确值（读取计数行）；?count=estimated 时使用表统计信息的估计值，
+    pagination.total_type 标明是 exact 还是 estimated
     """
     try:
         # 参数验证
@@ -186,21 +220,48 @@ async def get_logs(
         if page_size < 1 or page_size > 100:
             page_size = 50
         
+        # 游标分页
+        if cursor is not None:
+            try:
+                result = await db.get_access_logs_by_cursor(cursor=cursor, page_size=page_size)
+            except ValueError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(e)
+                )
+            total = await get_logs_total(db, count)
+            
+            # 直接返回响应对象，日志行中的datetime由编码器处理，不经过 jsonable_encoder
+            return FastJSONResponse({
+                "success": True,
+                "data": result['logs'],
+                "pagination": {
+                    "page_size": page_size,
+                    "total": total,
+                    "total_type": count,
+                    "next_cursor": result['next_cursor'],
+                    "prev_cursor": result['prev_cursor']
+                }
+            })
+        
         # 获取日志
-        logs = db.get_access_logs(page=page, page_size=page_size)
-        total = db.get_access_logs_count()
+        logs = await db.get_access_logs(page=page, page_size=page_size)
+        total = await get_logs_total(db, count)
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "data": logs,
             "pagination": {
                 "page": page,
                 "page_size": page_size,
                 "total": total,
+                "total_type": count,
                 "total_pages": (total + page_size - 1) // page_size
             }
-        }
+        })
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"获取日志失败: {str(e)}")
         raise HTTPException(
@@ -209,13 +270,80 @@ async def get_logs(
         )
 
 
+@router.get("/logs/export")
+async def export_logs(
+    format: Literal["csv", "ndjson"] = "csv",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    gzip: bool = False,
+    current_admin: dict = Depends(get_current_admin),
+    db: StorageBackend = Depends(get_db)
+):
+    """
+    导出访问日志
+    
+    流式输出全部日志或 [start, end) 时间范围内的日志，内存占用与行数无关
+    - format: csv 或 ndjson
+    - gzip: 为true时输出 .gz 压缩文件
+    """
+    if start and end and start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="开始时间必须早于结束时间"
+        )
+    
+    filename = f"access_logs.{format}" + (".gz" if gzip else "")
+    media_type = "application/gzip" if gzip else EXPORT_MEDIA_TYPES[format]
+    
+    logger.info(f"导出访问日志 by {current_admin['username']}: {format} {start} ~ {end}")
+    
+    return StreamingResponse(
+        stream_access_logs(db, fmt=format, start=start, end=end, compress=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/stats")
+async def get_stats(
+    days: int = 7,
+    current_admin: dict = Depends(get_current_admin),
+    db: StorageBackend = Depends(get_db)
+):
+    """
+    获取访问统计
+    
+    返回总访问量、独立IP数、今日访问量及最近N天的每日数据（来自按天汇总表）
+    """
+    try:
+        if days < 1 or days > 365:
+            days = 7
+        
+        stats = await db.get_access_stats(days=days)
+        
+        return {
+            "success": True,
+            "data": stats
+        }
+    
+    except Exception as e:
+        logger.error(f"获取访问统计失败: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="获取访问统计失败"
+        )
+
+
 @router.get("/profile")
-async def get_admin_profile(current_admin: dict = Depends(get_current_admin)):
+async def get_admin_profile(
+    current_admin: dict = Depends(get_current_admin),
+    db: StorageBackend = Depends(get_db)
+):
     """
     获取当前管理员信息
     """
     try:
-        admin_info = db.get_admin_by_id(current_admin['admin_id'])
+        admin_info = await db.get_admin_by_id(current_admin['admin_id'])
         
         if not admin_info:
             raise HTTPException(
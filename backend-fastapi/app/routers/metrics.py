@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""
+监控指标路由
+Prometheus文本格式的 /api/metrics（需要管理员令牌或 METRICS_TOKEN）
+"""
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from ..dependencies import verify_metrics_access
+from ..metrics import CONTENT_TYPE, REGISTRY
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(_: None = Depends(verify_metrics_access)):
+    """
+    获取监控指标
+    
+    Prometheus抓取配置示例：authorization: {credentials: <METRICS_TOKEN>}
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -4,18 +4,18 @@
 不需要登录验证的接口
 """
 
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, Depends, Request, Response, HTTPException
+from email.utils import parsedate_to_datetime
 from ..models import ResponseModel, ConfigData, LogCreateRequest
-from ..database import Database
+from ..cache import ConfigCache
+from ..log_buffer import AccessLogBuffer
+from ..dependencies import get_config_cache, get_log_buffer, log_rate_limiter, rate_limit
 from ..config import Config
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# 初始化数据库
-db = Database(Config)
-
 def get_client_ip(request: Request) -> str:
     """获取客户端IP地址"""
     if request.headers.get('X-Real-IP'):
@@ -25,11 +25,54 @@ def get_client_ip(request: Request) -> str:
     else:
         return request.client.host if request.client else '0.0.0.0'
 
+def is_not_modified(request: Request, etag: str, last_modified: str = None) -> bool:
+    """
+    判断条件请求是否命中（可返回304）
+    
+    If-None-Match 存在时优先于 If-Modified-Since
+    """
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        if if_none_match.strip() == '*':
+            return True
+        candidates = [tag.strip() for tag in if_none_match.split(',')]
+        return any(tag.removeprefix('W/') == etag for tag in candidates)
+    
+    if_modified_since = request.headers.get('If-Modified-Since')
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(if_modified_since) >= parsedate_to_datetime(last_modified)
+        except (TypeError, ValueError):
+            return False
+    
+    return False
+
 @router.get("/config", response_model=dict)
-async def get_config():
-    """获取网站配置（主标题、副标题）"""
+async def get_config(
+    request: Request,
+    response: Response,
+    config_cache: ConfigCache = Depends(get_config_cache)
+):
+    """
+    获取网站配置（主标题、副标题）
+    
+    支持 ETag / Last-Modified 条件请求，未变化时返回304
+    """
     try:
-        configs = db.get_all_config()
+        snapshot = await config_cache.get_snapshot()
+        
+        headers = {
+            'ETag': snapshot.etag,
+            'Cache-Control': Config.CONFIG_CACHE_CONTROL
+        }
+        if snapshot.last_modified:
+            headers['Last-Modified'] = snapshot.last_modified
+        
+        if is_not_modified(request, snapshot.etag, snapshot.last_modified):
+            return Response(status_code=304, headers=headers)
+        
+        response.headers.update(headers)
+        configs = snapshot.configs
         return {
             "success": True,
             "data": {
@@ -41,17 +84,23 @@ async def get_config():
         logger.error(f"获取配置失败: {str(e)}")
         raise HTTPException(status_code=500, detail="获取配置失败")
 
-@router.post("/log")
-async def add_log(request: Request, log_data: LogCreateRequest = None):
-    """记录访问日志"""
+@router.post("/log", dependencies=[Depends(rate_limit(log_rate_limiter))])
+async def add_log(
+    request: Request,
+    log_data: LogCreateRequest = None,
+    log_buffer: AccessLogBuffer = Depends(get_log_buffer)
+):
+    """记录访问日志（放入缓冲队列，由后台任务批量写入）"""
     try:
         ip_address = get_client_ip(request)
         user_agent = request.headers.get('User-Agent', '')
         
-        db.add_access_log(
-            ip_address=ip_address,
-            user_agent=user_agent
-        )
+        if not log_buffer.put(ip_address, user_agent):
+            logger.debug(f"访问日志队列已满，丢弃: {ip_address}")
+            return {
+                "success": True,
+                "message": "日志记录失败，但不影响访问"
+            }
         
         return {
             "success": True,
@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+生产环境多进程启动器（prefork，仅支持有fork的系统）
+
+主进程监听端口、加载应用后fork出多个worker，每个worker运行一个uvicorn服务器：
+- worker数默认等于可用CPU数（WORKERS=auto）
+- 默认在fork前加载应用（PRELOAD_APP），worker共享已导入的模块，启动更快
+- worker异常退出时自动重启，启动后很快又退出时逐渐延长重启间隔
+- SIGHUP：逐个滚动重启worker（新worker就绪后再优雅停止旧worker），重启期间不中断服务
+- SIGTERM / SIGINT：通知所有worker优雅退出（等待处理中的请求），超时后强制结束
+- REUSE_PORT=true 时每个worker各自监听（SO_REUSEPORT，由内核在worker间分配连接），
+  否则所有worker共享主进程监听的socket
+
+注意：预加载时SIGHUP重启的worker仍使用主进程加载的代码和配置，
+发布新代码需要重启主进程（或设置 PRELOAD_APP=false）
+"""
+
+import importlib
+import logging
+import os
+import select
+import signal
+import socket
+import sys
+import time
+import traceback
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+APP_PATH = 'app.main:app'
+
+# worker启动后在这段时间内退出视为启动即崩溃，按次数延长重启间隔（最长 MAX_RESPAWN_DELAY 秒）
+CRASH_WINDOW = 10
+MAX_RESPAWN_DELAY = 30
+
+
+def available_cpus():
+    """当前进程可用的CPU数（容器内受cpuset限制）"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def parse_workers(value):
+    """WORKERS 配置：'auto' 或空表示可用CPU数"""
+    if not value or value.lower() == 'auto':
+        return available_cpus()
+    return max(int(value), 1)
+
+
+def _env_flag(value, default):
+    return default if not value else value.lower() in ('1', 'true', 'yes')
+
+
+def import_app(path=APP_PATH):
+    """按 'module:attr' 导入ASGI应用"""
+    module_name, attr = path.split(':')
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class ServerSettings:
+    """启动参数（从环境变量读取）"""
+    
+    def __init__(self, host='127.0.0.1', port=8000, workers=1, backlog=2048,
+                 keepalive_timeout=5, graceful_timeout=30, boot_timeout=60,
+                 reuse_port=False, preload_app=True, log_level='info'):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.backlog = backlog
+        self.keepalive_timeout = keepalive_timeout
+        self.graceful_timeout = graceful_timeout
+        self.boot_timeout = boot_timeout
+        self.reuse_port = reuse_port
+        self.preload_app = preload_app
+        self.log_level = log_level
+    
+    @classmethod
+    def from_env(cls, environ=None):
+        environ = os.environ if environ is None else environ
+        return cls(
+            host=environ.get('HOST') or '127.0.0.1',
+            port=int(environ.get('PORT') or 8000),
+            workers=parse_workers(environ.get('WORKERS')),
+            backlog=int(environ.get('BACKLOG') or 2048),
+            keepalive_timeout=int(environ.get('KEEPALIVE_TIMEOUT') or 5),
+            graceful_timeout=int(environ.get('GRACEFUL_TIMEOUT') or 30),
+            boot_timeout=int(environ.get('WORKER_BOOT_TIMEOUT') or 60),
+            reuse_port=_env_flag(environ.get('REUSE_PORT'), False),
+            preload_app=_env_flag(environ.get('PRELOAD_APP'), True),
+            log_level=(environ.get('LOG_LEVEL') or 'info').lower(),
+        )
+
+
+def create_socket(host, port, backlog, reuse_port=False):
+    """创建监听socket（可被fork出的worker继承）"""
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class _WorkerServer(uvicorn.Server):
+    """启动完成（lifespan执行完、开始接受连接）后通过管道通知主进程"""
+    
+    def __init__(self, config, ready_fd):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+    
+    async def startup(self, sockets=None):
+        await super().startup(sockets=sockets)
+        if self.started:
+            os.write(self.ready_fd, b'1')
+            os.close(self.ready_fd)
+
+
+class _Worker:
+    def __init__(self, pid, ready_fd):
+        self.pid = pid
+        self.ready_fd = ready_fd
+        self.started_at = time.monotonic()
+    
+    def close(self):
+        if self.ready_fd is not None:
+            os.close(self.ready_fd)
+            self.ready_fd = None
+
+
+class PreforkServer:
+    """多进程服务器主进程（监督worker，处理信号）"""
+    
+    def __init__(self, settings, app=None):
+        self.settings = settings
+        self.app = app
+        self.socket = None
+        self.workers = {}             # pid -> _Worker
+        self._signals = []
+        self._wakeup_r = self._wakeup_w = None
+        self._crashes = 0
+        self._respawn_at = 0.0
+    
+    # ==================== worker ====================
+    
+    def spawn(self):
+        """fork一个worker，返回pid"""
+        ready_r, ready_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            self._run_worker(ready_w)
+        os.close(ready_w)
+        self.workers[pid] = _Worker(pid, ready_r)
+        return pid
+    
+    def _run_worker(self, ready_fd):
+        """worker进程入口（不返回）"""
+        code = 1
+        try:
+            signal.set_wakeup_fd(-1)
+            os.close(self._wakeup_r)
+            os.close(self._wakeup_w)
+            for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+                signal.signal(sig, signal.SIG_DFL)
+            # SIGHUP由主进程处理，worker忽略（避免终端断开时worker直接退出）
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            
+            settings = self.settings
+            sock = self.socket or create_socket(
+                settings.host, settings.port, settings.backlog, reuse_port=True
+            )
+            config = uvicorn.Config(
+                self.app or import_app(),
+                lifespan='on',
+                log_level=settings.log_level,
+                backlog=settings.backlog,
+                timeout_keep_alive=settings.keepalive_timeout,
+                timeout_graceful_shutdown=settings.graceful_timeout,
+            )
+            server = _WorkerServer(config, ready_fd)
+            server.run(sockets=[sock])
+            code = 0 if server.started else 3
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+    
+    def wait_ready(self, pid):
+        """等待worker启动完成，超时或启动前退出时返回False"""
+        worker = self.workers[pid]
+        readable, _, _ = select.select([worker.ready_fd], [], [], self.settings.boot_timeout)
+        ready = bool(readable) and os.read(worker.ready_fd, 1) == b'1'
+        worker.close()
+        if ready:
+            logger.info(f"worker进程已就绪 pid={pid}")
+        else:
+            logger.error(f"worker进程启动失败 pid={pid}")
+        return ready
+    
+    def _wait_exit(self, pids, timeout):
+        """等待指定worker退出，返回仍未退出的pid"""
+        pending = set(pids)
+        deadline = time.monotonic() + timeout
+        while pending:
+            for pid in list(pending):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    pending.discard(pid)
+            if not pending or time.monotonic() >= deadline:
+                break
+            time.sleep(0.05)
+        return pending
+    
+    def terminate(self, pids):
+        """优雅停止worker（超过 graceful_timeout 后强制结束）"""
+        for pid in pids:
+            worker = self.workers.pop(pid, None)
+            if worker:
+                worker.close()
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in self._wait_exit(pids, self.settings.graceful_timeout + 5):
+            logger.warning(f"worker进程 {pid} 未能在时限内退出，强制结束")
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            self._wait_exit([pid], 5)
+    
+    def reap(self):
+        """回收意外退出的worker"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            worker.close()
+            logger.error(f"worker进程 {pid} 异常退出（状态 {status}），将重新启动")
+            if time.monotonic() - worker.started_at < CRASH_WINDOW:
+                self._crashes += 1
+                delay = min(2 ** self._crashes, MAX_RESPAWN_DELAY)
+                self._respawn_at = time.monotonic() + delay
+            else:
+                self._crashes = 0
+    
+    def maintain_workers(self):
+        """补足worker数量"""
+        while len(self.workers) < self.settings.workers and time.monotonic() >= self._respawn_at:
+            pid = self.spawn()
+            if not self.wait_ready(pid):
+                self.terminate([pid])
+                self._crashes += 1
+                self._respawn_at = time.monotonic() + min(2 ** self._crashes, MAX_RESPAWN_DELAY)
+                return
+    
+    def rolling_restart(self):
+        """逐个替换worker：新worker就绪后再停止一个旧worker"""
+        logger.info(f"收到SIGHUP，滚动重启{len(self.workers)}个worker")
+        for old_pid in list(self.workers):
+            if old_pid not in self.workers:
+                continue
+            new_pid = self.spawn()
+            if not self.wait_ready(new_pid):
+                logger.error("新worker启动失败，停止滚动重启，保留现有worker")
+                self.terminate([new_pid])
+                return
+            self.terminate([old_pid])
+        logger.info("滚动重启完成")
+    
+    # ==================== 主进程 ====================
+    
+    def _on_signal(self, signum, frame):
+        self._signals.append(signum)
+    
+    def run(self):
+        """启动并监督worker，收到SIGTERM / SIGINT后返回退出码"""
+        settings = self.settings
+        if not settings.reuse_port:
+            self.socket = create_socket(settings.host, settings.port, settings.backlog)
+        
+        # 信号处理函数只记录信号，由主循环处理；wakeup管道让select立即返回
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        os.set_blocking(self._wakeup_w, False)
+        signal.set_wakeup_fd(self._wakeup_w)
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(sig, self._on_signal)
+        
+        logger.info(
+            f"主进程 pid={os.getpid()} 监听 {settings.host}:{settings.port}，"
+            f"worker数 {settings.workers}，SO_REUSEPORT {settings.reuse_port}，预加载 {self.app is not None}"
+        )
+        try:
+            for _ in range(settings.workers):
+                if not self.wait_ready(self.spawn()):
+                    logger.error("worker启动失败，退出")
+                    return 1
+            
+            while True:
+                select.select([self._wakeup_r], [], [], 1.0)
+                try:
+                    os.read(self._wakeup_r, 1024)
+                except BlockingIOError:
+                    pass
+                
+                signals, self._signals = self._signals, []
+                if signal.SIGTERM in signals or signal.SIGINT in signals:
+                    logger.info("收到停止信号，等待worker优雅退出")
+                    return 0
+                self.reap()
+                if signal.SIGHUP in signals:
+                    self.rolling_restart()
+                self.maintain_workers()
+        finally:
+            self.terminate(list(self.workers))
+            signal.set_wakeup_fd(-1)
+            os.close(self._wakeup_r)
+            os.close(self._wakeup_w)
+            if self.socket is not None:
+                self.socket.close()
+
+
+def serve(settings=None):
+    """生产模式入口，返回退出码"""
+    settings = settings or ServerSettings.from_env()
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    app = import_app() if settings.preload_app else None
+    return PreforkServer(settings, app).run()
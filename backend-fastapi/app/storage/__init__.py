@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+存储后端
+根据 STORAGE_BACKEND 配置选择 mysql / sqlite / memory
+"""
+
+from .base import StorageBackend
+from .memory import MemoryDatabase
+from .sqlite import SQLiteDatabase
+
+__all__ = ['StorageBackend', 'MemoryDatabase', 'SQLiteDatabase', 'create_database']
+
+
+def create_database(config):
+    """
+    创建配置指定的存储后端
+    
+    Raises:
+        ValueError: 未知的存储后端
+    """
+    backend = config.STORAGE_BACKEND.lower()
+    if backend == 'mysql':
+        # aiomysql只在使用MySQL时需要
+        from ..async_database import AsyncDatabase
+        return AsyncDatabase(config)
+    if backend == 'sqlite':
+        return SQLiteDatabase(config)
+    if backend == 'memory':
+        return MemoryDatabase(config)
+    raise ValueError(f"未知的存储后端: {config.STORAGE_BACKEND}")
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""
+存储后端接口
+路由、配置缓存和访问日志缓冲只通过 StorageBackend 访问数据，
+具体实现有 MySQL（async_database.AsyncDatabase）、SQLite 和内存三种
+"""
+
+import base64
+import json
+import logging
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timedelta
+
+from ..hashing import PasswordHasher
+
+logger = logging.getLogger(__name__)
+
+
+def encode_log_cursor(direction, access_time, log_id):
+    """
+    生成访问日志分页游标（对客户端不透明）
+    
+    Args:
+        direction: 'next'（更早的记录）或 'prev'（更新的记录）
+        access_time: 边界记录的访问时间
+        log_id: 边界记录的ID
+    """
+    raw = json.dumps([direction, access_time.isoformat(), log_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_log_cursor(cursor):
+    """
+    解析访问日志分页游标
+    
+    Returns:
+        (direction, access_time, log_id)
+    
+    Raises:
+        ValueError: 游标格式无效
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, access_time, log_id = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        return direction, datetime.fromisoformat(access_time), int(log_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("无效的分页游标") from e
+
+
+def build_cursor_page(logs, page_size, direction, boundary_time):
+    """
+    把多取一条（page_size + 1）的查询结果整理为一页游标分页结果
+    
+    Args:
+        logs: 查询结果；direction 为 'next' 时按时间倒序，为 'prev' 时按时间升序
+        page_size: 每页记录数
+        direction: 'next' 或 'prev'
+        boundary_time: 游标边界时间，第一页为None
+    
+    Returns:
+        {'logs': 日志列表（按时间倒序）, 'next_cursor': 更早一页的游标, 'prev_cursor': 更新一页的游标}
+    """
+    has_more = len(logs) > page_size
+    logs = logs[:page_size]
+    if direction == 'prev':
+        logs.reverse()
+    
+    # 向后翻页时一定还有更早的记录；向前翻页时一定还有更新的记录
+    has_older = has_more if direction == 'next' else True
+    has_newer = boundary_time is not None if direction == 'next' else has_more
+    
+    next_cursor = prev_cursor = None
+    if logs and has_older:
+        next_cursor = encode_log_cursor('next', logs[-1]['access_time'], logs[-1]['id'])
+    if logs and has_newer:
+        prev_cursor = encode_log_cursor('prev', logs[0]['access_time'], logs[0]['id'])
+    
+    return {
+        'logs': logs,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor
+    }
+
+
+def build_access_stats(start_date, days, total_visits, unique_ips, daily_rows):
+    """
+    组装访问统计结果（缺少数据的日期补0）
+    
+    Args:
+        start_date: 第一天
+        days: 天数
+        total_visits: 总访问量
+        unique_ips: 独立IP总数
+        daily_rows: {date: {'visits': n, 'unique_ips': n}}
+    """
+    daily = []
+    for offset in range(days):
+        day = start_date + timedelta(days=offset)
+        row = daily_rows.get(day)
+        daily.append({
+            'date': day.isoformat(),
+            'visits': int(row['visits']) if row else 0,
+            'unique_ips': int(row['unique_ips']) if row else 0
+        })
+    
+    return {
+        'total_visits': int(total_visits),
+        'unique_ips': int(unique_ips),
+        'today_visits': daily[-1]['visits'],
+        'today_unique_ips': daily[-1]['unique_ips'],
+        'daily': daily
+    }
+
+
+def stats_start_date(days):
+    """最近 days 天（含今天）的第一天"""
+    return date.today() - timedelta(days=days - 1)
+
+
+class StorageBackend(ABC):
+    """
+    存储后端基类
+    
+    子类实现数据读写；密码哈希、登录校验等与存储无关的逻辑在这里实现
+    """
+    
+    # 后端名称（STORAGE_BACKEND 配置值）
+    name = None
+    
+    def __init__(self, config):
+        # 密码哈希在独立线程池中计算，不阻塞事件循环
+        self.password_hasher = PasswordHasher(
+            max_workers=config.PASSWORD_HASH_WORKERS,
+            max_pending=config.PASSWORD_HASH_MAX_PENDING
+        )
+    
+    # ==================== 生命周期 ====================
+    
+    async def warm_up(self):
+        """启动预热（建立连接、准备表结构等）"""
+    
+    def get_pool_stats(self):
+        """获取连接池统计信息"""
+        return {}
+    
+    async def close(self):
+        """释放资源"""
+        self.password_hasher.shutdown()
+    
+    # ==================== 配置管理 ====================
+    
+    @abstractmethod
+    async def get_config_snapshot(self):
+        """
+        获取所有配置及最后修改时间
+        
+        Returns:
+            (配置字典, 最后修改时间datetime或None)
+        """
+    
+    async def get_all_config(self):
+        """获取所有配置"""
+        configs, _ = await self.get_config_snapshot()
+        return configs
+    
+    @abstractmethod
+    async def update_configs(self, updates):
+        """
+        在一个事务内写入多个配置项，配置版本号只递增一次
+        
+        Args:
+            updates: {config_key: config_value}，不能为空
+        
+        Returns:
+            新的配置版本号（版本号不可用时为None）
+        """
+    
+    async def update_config(self, key, value):
+        """更新单个配置项，返回新的配置版本号"""
+        return await self.update_configs({key: value})
+    
+    @abstractmethod
+    async def get_config_version(self):
+        """获取当前配置版本号（不可用时返回None）"""
+    
+    # ==================== 管理员认证 ====================
+    
+    @abstractmethod
+    async def get_admin_by_username(self, username):
+        """根据用户名获取管理员（包含 password_hash）"""
+    
+    @abstractmethod
+    async def get_admin_by_id(self, admin_id):
+        """根据ID获取管理员信息"""
+    
+    @abstractmethod
+    async def set_admin_password_hash(self, username, password_hash):
+        """保存管理员密码哈希"""
+    
+    async def verify_admin(self, username, password):
+        """
+        验证管理员账号密码
+        
+        Raises:
+            PasswordHasherBusy: 等待中的密码校验过多
+        """
+        user = await self.get_admin_by_username(username)
+        if user and await self.password_hasher.check_password(user['password_hash'], password):
+            logger.info(f"管理员登录成功: {username}")
+            return {
+                'id': user['id'],
+                'username': user['username'],
+                'created_at': user['created_at']
+            }
+        
+        logger.warning(f"管理员登录失败: {username}")
+        return None
+    
+    async def update_admin_password(self, username, new_password):
+        """更新管理员密码（哈希在线程池中计算）"""
+        password_hash = await self.password_hasher.hash_password(new_password)
+        await self.set_admin_password_hash(username, password_hash)
+        logger.info(f"管理员密码已更新: {username}")
+    
+    # ==================== 访问日志 ====================
+    
+    async def add_access_log(self, ip_address, user_agent):
+        """记录访问日志"""
+        try:
+            await self.add_access_logs([(ip_address, user_agent, datetime.now())])
+        except Exception as e:
+            logger.error(f"记录访问日志失败: {str(e)}")
+    
+    @abstractmethod
+    async def add_access_logs(self, rows):
+        """
+        批量记录访问日志（失败时抛出异常由调用方处理）
+        
+        Args:
+            rows: [(ip_address, user_agent, access_time), ...]
+        
+        Returns:
+            写入的行数
+        """
+    
+    @abstractmethod
+    async def add_access_log_hits(self, hits):
+        """
+        把去重窗口内合并的重复访问累加到首条日志的 hits 上（失败时抛出异常由调用方处理）
+        
+        按天汇总和总访问量同时增加，首条日志已被删除时只更新统计
+        
+        Args:
+            hits: [(ip_address, user_agent, 首条日志的access_time, 重复次数), ...]
+        
+        Returns:
+            累加的访问次数
+        """
+    
+    @abstractmethod
+    async def get_access_logs(self, page=1, page_size=50):
+        """获取访问日志（页码分页，按时间倒序）"""
+    
+    @abstractmethod
+    async def get_access_logs_by_cursor(self, cursor=None, page_size=50):
+        """
+        获取访问日志（游标分页）
+        
+        Returns:
+            build_cursor_page 的返回值
+        
+        Raises:
+            ValueError: 游标格式无效
+        """
+    
+    @abstractmethod
+    def iter_access_logs(self, start=None, end=None, batch_size=1000):
+        """按时间升序分批读取 [start, end) 范围内的日志（异步生成器）"""
+    
+    @abstractmethod
+    async def get_access_logs_count(self):
+        """获取日志总数（精确值）"""
+    
+    async def estimate_access_logs_count(self):
+        """获取日志总数估计值（默认返回精确值）"""
+        return await self.get_access_logs_count()
+    
+    @abstractmethod
+    async def get_access_stats(self, days=7):
+        """
+        获取访问统计，返回 build_access_stats 的结果
+        
+        total_visits 包含已按保留期删除的日志（来自按天汇总）
+        """
+    
+    # ==================== 保留期维护 ====================
+    
+    async def ensure_log_partitions(self, through):
+        """
+        预建到 through 所在月份为止的按月分区（不分区的后端无需处理）
+        
+        Returns:
+            新建的分区名列表
+        """
+        return []
+    
+    @abstractmethod
+    async def purge_access_logs(self, before):
+        """
+        删除 before（某月1日）之前的访问日志
+        
+        按天汇总和独立IP记录保留，删除后统计结果不变
+        
+        Returns:
+            删除的行数
+        """
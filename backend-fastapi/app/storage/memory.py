@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+内存存储后端
+数据只保存在进程内（重启后丢失），用于测试、性能测试和演示环境；
+多worker部署时各进程数据互不相通
+"""
+
+import logging
+from bisect import bisect_left, insort
+from datetime import datetime, time
+
+from werkzeug.security import generate_password_hash
+
+from ..query_log import db_timed
+from .base import (
+    StorageBackend,
+    build_access_stats,
+    build_cursor_page,
+    decode_log_cursor,
+    stats_start_date
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryDatabase(StorageBackend):
+    """内存数据库"""
+    
+    name = 'memory'
+    
+    def __init__(self, config):
+        super().__init__(config)
+        self._configs = {}          # config_key -> (config_value, updated_at)
+        self._config_version = 0
+        self._admins = {}           # username -> {id, username, password_hash, created_at}
+        self._logs = []             # (access_time, id, ip_address, user_agent)，按 (access_time, id) 升序
+        self._next_log_id = 1
+        self._hits = {}             # id -> 访问次数（合并了重复访问的日志）
+        self._ips = set()
+        self._daily = {}            # date -> [visits, unique_ips]
+        self._daily_ips = {}        # date -> set(ip)，删除过期日志时一并删除
+        if config.ADMIN_INITIAL_PASSWORD:
+            self.seed(admin_password=config.ADMIN_INITIAL_PASSWORD)
+    
+    def seed(self, configs=None, admin_password=None, logs=()):
+        """
+        写入初始数据（同步，供测试准备使用）
+        
+        Args:
+            configs: {config_key: config_value}
+            admin_password: 创建 admin 账号的密码
+            logs: [(ip_address, user_agent, access_time), ...]
+        """
+        now = datetime.now().replace(microsecond=0)
+        for key, value in (configs or {}).items():
+            self._configs[key] = (value, now)
+        if admin_password is not None:
+            self._admins['admin'] = {
+                'id': 1,
+                'username': 'admin',
+                'password_hash': generate_password_hash(admin_password),
+                'created_at': now,
+            }
+        self._insert_logs(logs)
+    
+    def _insert_logs(self, rows):
+        for ip_address, user_agent, access_time in rows:
+            access_time = access_time.replace(microsecond=0)
+            insort(self._logs, (access_time, self._next_log_id, ip_address, user_agent))
+            self._next_log_id += 1
+            self._ips.add(ip_address)
+            day = self._daily.setdefault(access_time.date(), [0, 0])
+            day[0] += 1
+            ips = self._daily_ips.setdefault(access_time.date(), set())
+            if ip_address not in ips:
+                ips.add(ip_address)
+                day[1] += 1
+    
+    def _row(self, entry):
+        access_time, log_id, ip_address, user_agent = entry
+        return {
+            'id': log_id,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'access_time': access_time,
+            'hits': self._hits.get(log_id, 1),
+        }
+    
+    # ==================== 配置管理 ====================
+    
+    @db_timed
+    async def get_config_snapshot(self):
+        """获取所有配置及最后修改时间"""
+        configs = {key: value for key, (value, _) in self._configs.items()}
+        timestamps = [updated_at for _, updated_at in self._configs.values()]
+        return configs, max(timestamps) if timestamps else None
+    
+    @db_timed
+    async def update_configs(self, updates):
+        """写入多个配置项并递增一次配置版本号"""
+        now = datetime.now().replace(microsecond=0)
+        for key, value in updates.items():
+            self._configs[key] = (value, now)
+        self._config_version += 1
+        return self._config_version
+    
+    @db_timed
+    async def get_config_version(self):
+        """获取当前配置版本号"""
+        return self._config_version
+    
+    # ==================== 管理员认证 ====================
+    
+    @db_timed
+    async def get_admin_by_username(self, username):
+        """根据用户名获取管理员（包含 password_hash）"""
+        user = self._admins.get(username)
+        return dict(user) if user else None
+    
+    @db_timed
+    async def get_admin_by_id(self, admin_id):
+        """根据ID获取管理员信息"""
+        for user in self._admins.values():
+            if user['id'] == admin_id:
+                return {key: user[key] for key in ('id', 'username', 'created_at')}
+        return None
+    
+    @db_timed
+    async def set_admin_password_hash(self, username, password_hash):
+        """保存管理员密码哈希"""
+        if username in self._admins:
+            self._admins[username]['password_hash'] = password_hash
+    
+    # ==================== 访问日志 ====================
+    
+    @db_timed
+    async def add_access_logs(self, rows):
+        """批量记录访问日志"""
+        self._insert_logs(rows)
+        return len(rows)
+    
+    @db_timed
+    async def add_access_log_hits(self, hits):
+        """把重复访问累加到首条日志上"""
+        total = 0
+        for ip_address, user_agent, access_time, count in hits:
+            access_time = access_time.replace(microsecond=0)
+            index = bisect_left(self._logs, (access_time,))
+            while index < len(self._logs) and self._logs[index][0] == access_time:
+                _, log_id, logged_ip, logged_user_agent = self._logs[index]
+                if logged_ip == ip_address and logged_user_agent == user_agent:
+                    self._hits[log_id] = self._hits.get(log_id, 1) + count
+                    break
+                index += 1
+            self._daily.setdefault(access_time.date(), [0, 0])[0] += count
+            total += count
+        return total
+    
+    @db_timed
+    async def get_access_logs(self, page=1, page_size=50):
+        """获取访问日志（分页，按时间倒序）"""
+        end = len(self._logs) - (page - 1) * page_size
+        if end <= 0:
+            return []
+        return [self._row(entry) for entry in reversed(self._logs[max(end - page_size, 0):end])]
+    
+    @db_timed
+    async def get_access_logs_by_cursor(self, cursor=None, page_size=50):
+        """获取访问日志（游标分页）"""
+        direction, boundary_time, boundary_id = (
+            decode_log_cursor(cursor) if cursor else ('next', None, None)
+        )
+        
+        if boundary_time is None:
+            end = len(self._logs)
+            entries = self._logs[max(end - page_size - 1, 0):end][::-1]
+        elif direction == 'next':
+            end = bisect_left(self._logs, (boundary_time, boundary_id))
+            entries = self._logs[max(end - page_size - 1, 0):end][::-1]
+        else:
+            start = bisect_left(self._logs, (boundary_time, boundary_id + 1))
+            entries = self._logs[start:start + page_size + 1]
+        
+        logs = [self._row(entry) for entry in entries]
+        return build_cursor_page(logs, page_size, direction, boundary_time)
+    
+    async def iter_access_logs(self, start=None, end=None, batch_size=1000):
+        """按时间升序分批读取 [start, end) 范围内的日志"""
+        lo = bisect_left(self._logs, (start,)) if start else 0
+        hi = bisect_left(self._logs, (end,)) if end else len(self._logs)
+        for offset in range(lo, hi, batch_size):
+            yield [self._row(entry) for entry in self._logs[offset:min(offset + batch_size, hi)]]
+    
+    @db_timed
+    async def get_access_logs_count(self):
+        """获取日志总数"""
+        return len(self._logs)
+    
+    @db_timed
+    async def get_access_stats(self, days=7):
+        """获取访问统计"""
+        start_date = stats_start_date(days)
+        daily_rows = {
+            day: {'visits': visits, 'unique_ips': unique_ips}
+            for day, (visits, unique_ips) in self._daily.items()
+            if day >= start_date
+        }
+        total_visits = sum(visits for visits, _ in self._daily.values())
+        return build_access_stats(start_date, days, total_visits, len(self._ips), daily_rows)
+    
+    # ==================== 保留期维护 ====================
+    
+    @db_timed
+    async def purge_access_logs(self, before):
+        """删除 before 之前的访问日志"""
+        end = bisect_left(self._logs, (datetime.combine(before, time()),))
+        for entry in self._logs[:end]:
+            self._hits.pop(entry[1], None)
+        del self._logs[:end]
+        for day in [day for day in self._daily_ips if day < before]:
+            del self._daily_ips[day]
+        return end
@@ -0,0 +1,465 @@
+# -*- coding: utf-8 -*-
+"""
+SQLite存储后端
+单机部署时代替MySQL，省去网络往返；使用WAL模式，读写互不阻塞
+
+所有SQL在一个专用线程中通过同一个连接执行（SQLite同一时间只允许一个写入者），
+事件循环只等待结果
+"""
+
+import asyncio
+import contextvars
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+from werkzeug.security import generate_password_hash
+
+from ..query_log import db_timed, record_query
+from .base import (
+    StorageBackend,
+    build_access_stats,
+    build_cursor_page,
+    decode_log_cursor,
+    stats_start_date
+)
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS config (
+        config_key TEXT NOT NULL PRIMARY KEY,
+        config_value TEXT,
+        updated_at TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS config_version (
+        id INTEGER NOT NULL PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "INSERT OR IGNORE INTO config_version (id, version) VALUES (1, 0)",
+    """
+    CREATE TABLE IF NOT EXISTS admin_users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL UNIQUE,
+        password_hash TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS access_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ip_address TEXT NOT NULL,
+        user_agent TEXT,
+        access_time TEXT NOT NULL,
+        hits INTEGER NOT NULL DEFAULT 1
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_access_logs_time_id ON access_logs (access_time, id)",
+    """
+    CREATE TABLE IF NOT EXISTS access_log_daily (
+        stat_date TEXT NOT NULL PRIMARY KEY,
+        visits INTEGER NOT NULL DEFAULT 0,
+        unique_ips INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS access_log_daily_ips (
+        stat_date TEXT NOT NULL,
+        ip_address TEXT NOT NULL,
+        PRIMARY KEY (stat_date, ip_address)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS access_log_ips (
+        ip_address TEXT NOT NULL PRIMARY KEY,
+        first_seen TEXT NOT NULL
+    ) WITHOUT ROWID
+    """,
+)
+
+# 时间以 'YYYY-MM-DD HH:MM:SS' 文本保存，字典序即时间顺序
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _to_text(value):
+    return value.strftime(TIME_FORMAT) if isinstance(value, datetime) else value
+
+
+def _log_row(row):
+    return {
+        'id': row['id'],
+        'ip_address': row['ip_address'],
+        'user_agent': row['user_agent'],
+        'access_time': datetime.fromisoformat(row['access_time']),
+        'hits': row['hits'],
+    }
+
+
+class SQLiteDatabase(StorageBackend):
+    """SQLite数据库（WAL模式）"""
+    
+    name = 'sqlite'
+    
+    def __init__(self, config):
+        super().__init__(config)
+        self.path = config.SQLITE_PATH
+        self.initial_admin_password = config.ADMIN_INITIAL_PASSWORD
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite')
+        self._conn = None
+    
+    # ==================== 连接管理 ====================
+    
+    async def _run(self, func, *args):
+        """在数据库线程中执行 func(conn, *args)（保留当前请求的耗时统计上下文）"""
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, context.run, self._call, func, args
+        )
+    
+    def _call(self, func, args):
+        if self._conn is None:
+            self._conn = self._connect()
+        return func(self._conn, *args)
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        with conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+            # 早期创建的数据库文件没有 hits 列
+            columns = [row['name'] for row in conn.execute("PRAGMA table_info(access_logs)")]
+            if 'hits' not in columns:
+                conn.execute("ALTER TABLE access_logs ADD COLUMN hits INTEGER NOT NULL DEFAULT 1")
+            if self.initial_admin_password:
+                conn.execute(
+                    "INSERT OR IGNORE INTO admin_users (username, password_hash, created_at) VALUES (?, ?, ?)",
+                    ('admin', generate_password_hash(self.initial_admin_password), _to_text(datetime.now()))
+                )
+        logger.info(f"SQLite数据库已打开: {self.path}")
+        return conn
+    
+    @staticmethod
+    def _execute(conn, sql, params=(), many=False):
+        """执行SQL并记录耗时（慢查询日志、Server-Timing）"""
+        start = time.perf_counter()
+        cursor = conn.executemany(sql, params) if many else conn.execute(sql, params)
+        record_query(
+            sql,
+            sum(len(row) for row in params) if many else len(params),
+            cursor.rowcount if cursor.rowcount >= 0 else None,
+            time.perf_counter() - start
+        )
+        return cursor
+    
+    async def warm_up(self):
+        """打开数据库并准备表结构"""
+        await self._run(lambda conn: None)
+    
+    def get_pool_stats(self):
+        """单连接"""
+        opened = int(self._conn is not None)
+        return {'size': 1, 'open': opened, 'idle': opened, 'in_use': 0}
+    
+    async def close(self):
+        """关闭连接和数据库线程"""
+        def close_connection(conn):
+            conn.close()
+            self._conn = None
+        
+        if self._conn is not None:
+            await self._run(close_connection)
+        self._executor.shutdown(wait=True)
+        await super().close()
+    
+    # ==================== 配置管理 ====================
+    
+    @db_timed
+    async def get_config_snapshot(self):
+        """获取所有配置及最后修改时间"""
+        def query(conn):
+            return self._execute(conn, "SELECT config_key, config_value, updated_at FROM config").fetchall()
+        
+        rows = await self._run(query)
+        configs = {row['config_key']: row['config_value'] for row in rows}
+        timestamps = [row['updated_at'] for row in rows if row['updated_at']]
+        return configs, datetime.fromisoformat(max(timestamps)) if timestamps else None
+    
+    @db_timed
+    async def update_configs(self, updates):
+        """写入多个配置项（一个事务，配置版本号只递增一次）"""
+        now = _to_text(datetime.now())
+        
+        def update(conn):
+            with conn:
+                self._execute(conn, """
+                    INSERT INTO config (config_key, config_value, updated_at)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT (config_key) DO UPDATE
+                    SET config_value = excluded.config_value, updated_at = excluded.updated_at
+                """, [(key, value, now) for key, value in sorted(updates.items())], many=True)
+                self._execute(conn, "UPDATE config_version SET version = version + 1 WHERE id = 1")
+                return self._execute(conn, "SELECT version FROM config_version WHERE id = 1").fetchone()['version']
+        
+        version = await self._run(update)
+        logger.info(f"配置更新（版本{version}）: {updates}")
+        return version
+    
+    @db_timed
+    async def get_config_version(self):
+        """获取当前配置版本号"""
+        def query(conn):
+            row = self._execute(conn, "SELECT version FROM config_version WHERE id = 1").fetchone()
+            return row['version'] if row else None
+        
+        return await self._run(query)
+    
+    # ==================== 管理员认证 ====================
+    
+    async def _get_admin(self, column, value):
+        def query(conn):
+            return self._execute(conn, f"""
+                SELECT id, username, password_hash, created_at
+                FROM admin_users
+                WHERE {column} = ?
+            """, (value,)).fetchone()
+        
+        row = await self._run(query)
+        if row is None:
+            return None
+        user = dict(row)
+        user['created_at'] = datetime.fromisoformat(user['created_at'])
+        return user
+    
+    @db_timed
+    async def get_admin_by_username(self, username):
+        """根据用户名获取管理员（包含 password_hash）"""
+        return await self._get_admin('username', username)
+    
+    @db_timed
+    async def get_admin_by_id(self, admin_id):
+        """根据ID获取管理员信息"""
+        user = await self._get_admin('id', admin_id)
+        if user:
+            user.pop('password_hash')
+        return user
+    
+    @db_timed
+    async def set_admin_password_hash(self, username, password_hash):
+        """保存管理员密码哈希"""
+        def update(conn):
+            with conn:
+                self._execute(conn, """
+                    UPDATE admin_users SET password_hash = ? WHERE username = ?
+                """, (password_hash, username))
+        
+        await self._run(update)
+    
+    # ==================== 访问日志 ====================
+    
+    @db_timed
+    async def add_access_logs(self, rows):
+        """批量记录访问日志，按天汇总在同一事务内更新"""
+        if not rows:
+            return 0
+        
+        days = {}           # stat_date -> 当天出现的IP
+        visits = {}         # stat_date -> 访问次数
+        first_seen = {}
+        for ip_address, _, access_time in rows:
+            stat_date = access_time.date().isoformat()
+            days.setdefault(stat_date, set()).add(ip_address)
+            visits[stat_date] = visits.get(stat_date, 0) + 1
+            first_seen.setdefault(ip_address, _to_text(access_time))
+        
+        def insert(conn):
+            with conn:
+                self._execute(conn, """
+                    INSERT INTO access_logs (ip_address, user_agent, access_time)
+                    VALUES (?, ?, ?)
+                """, [(ip, ua, _to_text(access_time)) for ip, ua, access_time in rows], many=True)
+                for stat_date in sorted(days):
+                    new_ips = self._execute(conn, """
+                        INSERT OR IGNORE INTO access_log_daily_ips (stat_date, ip_address)
+                        VALUES (?, ?)
+                    """, [(stat_date, ip) for ip in sorted(days[stat_date])], many=True).rowcount
+                    self._execute(conn, """
+                        INSERT INTO access_log_daily (stat_date, visits, unique_ips)
+                        VALUES (?, ?, ?)
+                        ON CONFLICT (stat_date) DO UPDATE
+                        SET visits = visits + excluded.visits,
+                            unique_ips = unique_ips + excluded.unique_ips
+                    """, (stat_date, visits[stat_date], new_ips))
+                self._execute(conn, """
+                    INSERT OR IGNORE INTO access_log_ips (ip_address, first_seen)
+                    VALUES (?, ?)
+                """, sorted(first_seen.items()), many=True)
+        
+        await self._run(insert)
+        return len(rows)
+    
+    @db_timed
+    async def add_access_log_hits(self, hits):
+        """把重复访问累加到首条日志上，按天汇总在同一事务内更新"""
+        if not hits:
+            return 0
+        
+        visits = {}         # stat_date -> 访问次数
+        for _, _, access_time, count in hits:
+            stat_date = access_time.date().isoformat()
+            visits[stat_date] = visits.get(stat_date, 0) + count
+        
+        def update(conn):
+            with conn:
+                self._execute(conn, """
+                    UPDATE access_logs SET hits = hits + ?
+                    WHERE id = (
+                        SELECT id FROM access_logs
+                        WHERE access_time = ? AND ip_address = ? AND user_agent = ?
+                        ORDER BY id LIMIT 1
+                    )
+                """, [
+                    (count, _to_text(access_time), ip, user_agent)
+                    for ip, user_agent, access_time, count in hits
+                ], many=True)
+                self._execute(conn, """
+                    INSERT INTO access_log_daily (stat_date, visits, unique_ips)
+                    VALUES (?, ?, 0)
+                    ON CONFLICT (stat_date) DO UPDATE
+                    SET visits = visits + excluded.visits
+                """, sorted(visits.items()), many=True)
+        
+        await self._run(update)
+        return sum(visits.values())
+    
+    @db_timed
+    async def get_access_logs(self, page=1, page_size=50):
+        """获取访问日志（分页）"""
+        def query(conn):
+            return self._execute(conn, """
+                SELECT id, ip_address, user_agent, access_time, hits
+                FROM access_logs
+                ORDER BY access_time DESC, id DESC
+                LIMIT ? OFFSET ?
+            """, (page_size, (page - 1) * page_size)).fetchall()
+        
+        return [_log_row(row) for row in await self._run(query)]
+    
+    @db_timed
+    async def get_access_logs_by_cursor(self, cursor=None, page_size=50):
+        """获取访问日志（游标分页，按 (access_time, id) 定位）"""
+        direction, boundary_time, boundary_id = (
+            decode_log_cursor(cursor) if cursor else ('next', None, None)
+        )
+        
+        if boundary_time is None:
+            sql = """
+                SELECT id, ip_address, user_agent, access_time, hits
+                FROM access_logs
+                ORDER BY access_time DESC, id DESC
+                LIMIT ?
+            """
+            params = (page_size + 1,)
+        elif direction == 'next':
+            sql = """
+                SELECT id, ip_address, user_agent, access_time, hits
+                FROM access_logs
+                WHERE (access_time, id) < (?, ?)
+                ORDER BY access_time DESC, id DESC
+                LIMIT ?
+            """
+            params = (_to_text(boundary_time), boundary_id, page_size + 1)
+        else:
+            sql = """
+                SELECT id, ip_address, user_agent, access_time, hits
+                FROM access_logs
+                WHERE (access_time, id) > (?, ?)
+                ORDER BY access_time ASC, id ASC
+                LIMIT ?
+            """
+            params = (_to_text(boundary_time), boundary_id, page_size + 1)
+        
+        rows = await self._run(lambda conn: self._execute(conn, sql, params).fetchall())
+        return build_cursor_page([_log_row(row) for row in rows], page_size, direction, boundary_time)
+    
+    async def iter_access_logs(self, start=None, end=None, batch_size=1000):
+        """按时间升序分批读取 [start, end) 范围内的日志（每批按 (access_time, id) 续读）"""
+        conditions = ["(access_time, id) > (?, ?)"]
+        last = (_to_text(start) if start else '', 0)
+        if end:
+            conditions.append("access_time < ?")
+        sql = f"""
+            SELECT id, ip_address, user_agent, access_time, hits
+            FROM access_logs
+            WHERE {' AND '.join(conditions)}
+            ORDER BY access_time, id
+            LIMIT ?
+        """
+        
+        while True:
+            params = last + ((_to_text(end),) if end else ()) + (batch_size,)
+            rows = await self._run(lambda conn: self._execute(conn, sql, params).fetchall())
+            if not rows:
+                break
+            last = (rows[-1]['access_time'], rows[-1]['id'])
+            yield [_log_row(row) for row in rows]
+            if len(rows) < batch_size:
+                break
+    
+    @db_timed
+    async def get_access_logs_count(self):
+        """获取日志总数"""
+        def query(conn):
+            return self._execute(conn, "SELECT COUNT(*) AS count FROM access_logs").fetchone()['count']
+        
+        return await self._run(query)
+    
+    @db_timed
+    async def get_access_stats(self, days=7):
+        """获取访问统计（读取按天汇总）"""
+        start_date = stats_start_date(days)
+        
+        def query(conn):
+            visits = self._execute(conn, """
+                SELECT COALESCE(SUM(visits), 0) AS count FROM access_log_daily
+            """).fetchone()['count']
+            unique_ips = self._execute(conn, "SELECT COUNT(*) AS count FROM access_log_ips").fetchone()['count']
+            daily_rows = self._execute(conn, """
+                SELECT stat_date, visits, unique_ips
+                FROM access_log_daily
+                WHERE stat_date >= ?
+            """, (start_date.isoformat(),)).fetchall()
+            return visits, unique_ips, daily_rows
+        
+        visits, unique_ips, daily_rows = await self._run(query)
+        by_date = {date.fromisoformat(row['stat_date']): row for row in daily_rows}
+        return build_access_stats(start_date, days, visits, unique_ips, by_date)
+    
+    # ==================== 保留期维护 ====================
+    
+    @db_timed
+    async def purge_access_logs(self, before):
+        """删除 before 之前的访问日志（按 access_time 索引范围删除）"""
+        def purge(conn):
+            with conn:
+                purged = self._execute(conn, """
+                    DELETE FROM access_logs WHERE access_time < ?
+                """, (before.isoformat(),)).rowcount
+                self._execute(conn, """
+                    DELETE FROM access_log_daily_ips WHERE stat_date < ?
+                """, (before.isoformat(),))
+            return purged
+        
+        purged = await self._run(purge)
+        if purged:
+            logger.info(f"已删除{before}之前的访问日志: {purged}条")
+        return purged
@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""性能测试脚本"""
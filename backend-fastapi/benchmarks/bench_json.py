@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+JSON序列化微基准测试
+对比一页100条访问日志的两种响应序列化方式：
+
+- baseline：逐行strftime格式化 + jsonable_encoder + 标准库json（原实现）
+- fast：FastJSONResponse 直接序列化（orjson原生输出ISO格式的datetime，省略微秒，不逐行格式化）
+
+运行：python -m benchmarks.bench_json [--rows 100] [--number 2000]
+"""
+
+import argparse
+import timeit
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.responses import FastJSONResponse, json_dumps
+
+
+def make_page(rows):
+    """生成一页模拟访问日志（与 get_access_logs 返回的行结构相同）"""
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    return [
+        {
+            'id': 100000 - i,
+            'ip_address': f'192.168.{i // 256}.{i % 256}',
+            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                          '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'access_time': now - timedelta(seconds=i),
+        }
+        for i in range(rows)
+    ]
+
+
+def wrap(logs):
+    return {
+        "success": True,
+        "data": logs,
+        "pagination": {"page": 1, "page_size": len(logs), "total": 100000,
+                       "total_type": "exact", "total_pages": 1000}
+    }
+
+
+def baseline(rows):
+    logs = [dict(row) for row in rows]
+    for log in logs:
+        log['access_time'] = log['access_time'].strftime('%Y-%m-%d %H:%M:%S')
+    return JSONResponse(jsonable_encoder(wrap(logs))).body
+
+
+def fast(rows):
+    return FastJSONResponse(wrap(list(rows))).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON序列化微基准测试")
+    parser.add_argument('--rows', type=int, default=100, help="每页行数")
+    parser.add_argument('--number', type=int, default=2000, help="每轮执行次数")
+    parser.add_argument('--repeat', type=int, default=5, help="重复轮数（取最快一轮）")
+    args = parser.parse_args()
+    
+    rows = make_page(args.rows)
+    print(f"编码器: {json_dumps.__name__}，每页 {args.rows} 行，响应体 {len(fast(rows))} 字节")
+    
+    results = {}
+    for name, func in (('baseline', baseline), ('fast', fast)):
+        best = min(timeit.repeat(lambda: func(rows), number=args.number, repeat=args.repeat))
+        results[name] = best / args.number * 1e6
+        print(f"{name:>8}: {results[name]:8.1f} µs/页")
+    print(f" speedup: {results['baseline'] / results['fast']:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+API负载测试
+在进程内启动应用（使用内存数据库替身，不需要MySQL），运行固定的工作负载，
+输出吞吐量和 p50/p95/p99 延迟到JSON文件，可与基线结果对比
+
+工作负载：
+- config_read：/api/config 读多写少（普通请求、带ETag的条件请求、少量管理员修改）
+- log_burst：/api/log 突发写入，并统计缓冲队列写完的时间
+- deep_pagination：/api/admin/logs 深分页（页码分页的深页 + 游标连续翻页）
+- login_storm：并发登录（大部分密码正确）
+
+运行：
+    python -m benchmarks.load_test --output bench.json
+    python -m benchmarks.load_test --output new.json --baseline bench.json
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import httpx
+
+from app import main as app_main
+from app.config import Config
+from app.dependencies import create_access_token
+from app.storage import MemoryDatabase
+
+ADMIN_PASSWORD = 'benchmark-password'
+
+# 各工作负载的默认请求数（--scale 按比例缩放）
+WORKLOAD_REQUESTS = {
+    'config_read': 4000,
+    'log_burst': 4000,
+    'deep_pagination': 600,
+    'login_storm': 24,
+}
+
+
+class Recorder:
+    """记录单个工作负载的请求延迟和状态码"""
+    
+    def __init__(self):
+        self.latencies = []
+        self.status_codes = Counter()
+        self.extra = {}
+    
+    async def request(self, client, method, url, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies.append(time.perf_counter() - start)
+        self.status_codes[response.status_code] += 1
+        return response
+    
+    def summary(self, duration):
+        latencies = sorted(self.latencies)
+        if len(latencies) >= 2:
+            cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+            p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+        else:
+            p50 = p95 = p99 = latencies[0] if latencies else 0.0
+        return {
+            'requests': len(latencies),
+            'duration_s': round(duration, 4),
+            'throughput_rps': round(len(latencies) / duration, 1) if duration > 0 else 0.0,
+            'latency_ms': {
+                'mean': round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+                'p50': round(p50 * 1000, 3),
+                'p95': round(p95 * 1000, 3),
+                'p99': round(p99 * 1000, 3),
+                'max': round(latencies[-1] * 1000, 3) if latencies else 0.0,
+            },
+            'status_codes': {str(code): count for code, count in sorted(self.status_codes.items())},
+            **self.extra,
+        }
+
+
+async def run_workers(concurrency, total, worker):
+    """启动 concurrency 个协程共同完成 total 次操作"""
+    counter = iter(range(total))
+    
+    async def loop(worker_id):
+        for index in counter:
+            await worker(worker_id, index)
+    
+    await asyncio.gather(*(loop(i) for i in range(concurrency)))
+
+
+# ==================== 工作负载 ====================
+
+async def config_read(client, recorder, ctx):
+    """/api/config：50%普通请求，48%条件请求，2%管理员修改配置"""
+    etag = (await client.get('/api/config')).headers.get('ETag')
+    
+    async def worker(worker_id, index):
+        nonlocal etag
+        roll = ctx['rng'].random()
+        if roll < 0.02:
+            await recorder.request(
+                client, 'PUT', '/api/admin/config',
+                headers=ctx['auth'], json={'sub_title': f'benchmark {index}'}
+            )
+        elif roll < 0.50:
+            response = await recorder.request(
+                client, 'GET', '/api/config', headers={'If-None-Match': etag or '*'}
+            )
+            etag = response.headers.get('ETag', etag)
+        else:
+            response = await recorder.request(client, 'GET', '/api/config')
+            etag = response.headers.get('ETag', etag)
+    
+    await run_workers(ctx['concurrency'], ctx['requests'], worker)
+
+
+async def log_burst(client, recorder, ctx):
+    """/api/log 突发写入，结束后等待缓冲队列全部写入"""
+    async def worker(worker_id, index):
+        await recorder.request(
+            client, 'POST', '/api/log',
+            json={}, headers={'X-Real-IP': f'10.{worker_id}.{index // 256 % 256}.{index % 256}'}
+        )
+    
+    await run_workers(ctx['concurrency'], ctx['requests'], worker)
+    start = time.perf_counter()
+    await app_main.app.state.log_buffer.flush()
+    recorder.extra['drain_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    recorder.extra['log_buffer'] = app_main.app.state.log_buffer.stats()
+
+
+async def deep_pagination(client, recorder, ctx):
+    """/api/admin/logs：一半请求取最后20%的深页，一半沿游标连续向后翻页"""
+    page_size = 50
+    total_pages = max(ctx['log_rows'] // page_size, 1)
+    deep_start = max(int(total_pages * 0.8), 1)
+    cursors = {}
+    
+    async def worker(worker_id, index):
+        if index % 2 == 0:
+            page = ctx['rng'].randint(deep_start, total_pages)
+            await recorder.request(
+                client, 'GET', '/api/admin/logs',
+                headers=ctx['auth'], params={'page': page, 'page_size': page_size}
+            )
+            return
+        response = await recorder.request(
+            client, 'GET', '/api/admin/logs',
+            headers=ctx['auth'],
+            params={'cursor': cursors.get(worker_id, ''), 'page_size': page_size}
+        )
+        cursors[worker_id] = response.json()['pagination']['next_cursor'] or ''
+    
+    await run_workers(ctx['concurrency'], ctx['requests'], worker)
+
+
+async def login_storm(client, recorder, ctx):
+    """并发登录：75%密码正确（每次登录使用不同的客户端IP，测的是密码哈希而不是登录限流）"""
+    async def worker(worker_id, index):
+        password = ADMIN_PASSWORD if ctx['rng'].random() < 0.75 else 'wrong-password'
+        await recorder.request(
+            client, 'POST', '/api/admin/login',
+            json={'password': password}, headers={'X-Real-IP': f'172.16.{index // 256 % 256}.{index % 256}'}
+        )
+    
+    await run_workers(ctx['concurrency'], ctx['requests'], worker)
+    recorder.extra['password_hasher'] = app_main.app.state.db.password_hasher.stats()
+
+
+WORKLOADS = {
+    'config_read': config_read,
+    'log_burst': log_burst,
+    'deep_pagination': deep_pagination,
+    'login_storm': login_storm,
+}
+
+
+# ==================== 运行 ====================
+
+def make_database(seed, log_rows):
+    """创建并填充内存数据库（数据只由随机种子决定）"""
+    rng = random.Random(seed)
+    db = MemoryDatabase(Config)
+    start = datetime.now().replace(microsecond=0) - timedelta(days=30)
+    step = timedelta(days=30) / max(log_rows, 1)
+    db.seed(
+        configs={'main_title': 'Hello World', 'sub_title': '欢迎访问'},
+        admin_password=ADMIN_PASSWORD,
+        logs=(
+            (f'192.168.{rng.randint(0, 255)}.{rng.randint(1, 254)}', 'Mozilla/5.0 (benchmark)', start + step * i)
+            for i in range(log_rows)
+        )
+    )
+    return db
+
+
+@contextmanager
+def use_database(db):
+    """让应用启动时使用指定的数据库实例"""
+    original = app_main.create_database
+    app_main.create_database = lambda config: db
+    try:
+        yield
+    finally:
+        app_main.create_database = original
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, timeout=5, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+async def run(args):
+    log_rows = int(50000 * args.scale)
+    db = make_database(args.seed, log_rows)
+    token = create_access_token({'admin_id': 1, 'username': 'admin'})
+    results = {}
+    
+    with use_database(db):
+        async with app_main.app.router.lifespan_context(app_main.app):
+            transport = httpx.ASGITransport(app=app_main.app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+                # 预热（不计入结果）
+                for _ in range(50):
+                    await client.get('/api/config')
+                
+                for name in args.workloads:
+                    ctx = {
+                        'rng': random.Random(f'{args.seed}-{name}'),
+                        'auth': {'Authorization': f'Bearer {token}'},
+                        'concurrency': args.concurrency,
+                        'requests': max(int(WORKLOAD_REQUESTS[name] * args.scale), 1),
+                        'log_rows': log_rows,
+                    }
+                    recorder = Recorder()
+                    gc.collect()
+                    start = time.perf_counter()
+                    await WORKLOADS[name](client, recorder, ctx)
+                    results[name] = recorder.summary(time.perf_counter() - start)
+                    print(format_line(name, results[name]))
+    
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': args.seed,
+            'scale': args.scale,
+            'concurrency': args.concurrency,
+            'log_rows': log_rows,
+        },
+        'workloads': results,
+    }
+
+
+def format_line(name, result):
+    latency = result['latency_ms']
+    return (
+        f"{name:<16} {result['requests']:>6} req  {result['throughput_rps']:>9.1f} req/s  "
+        f"p50 {latency['p50']:>8.2f}ms  p95 {latency['p95']:>8.2f}ms  p99 {latency['p99']:>8.2f}ms"
+    )
+
+
+def compare(results, baseline):
+    """打印与基线结果的对比（吞吐量和p95变化百分比）"""
+    print("\n与基线对比（正数表示吞吐量提升 / 延迟增加）：")
+    for name, result in results['workloads'].items():
+        base = baseline.get('workloads', {}).get(name)
+        if not base:
+            continue
+        rps = (result['throughput_rps'] / base['throughput_rps'] - 1) * 100 if base['throughput_rps'] else 0.0
+        p95 = (result['latency_ms']['p95'] / base['latency_ms']['p95'] - 1) * 100 if base['latency_ms']['p95'] else 0.0
+        print(f"{name:<16} 吞吐量 {rps:+7.1f}%  p95 {p95:+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API负载测试（内存数据库）")
+    parser.add_argument('--output', default='benchmark_results.json', help="结果JSON文件")
+    parser.add_argument('--baseline', help="用于对比的基线结果JSON文件")
+    parser.add_argument('--workloads', default=','.join(WORKLOADS), help="逗号分隔的工作负载名称")
+    parser.add_argument('--concurrency', type=int, default=16, help="并发协程数")
+    parser.add_argument('--scale', type=float, default=1.0, help="请求数和数据量的缩放比例")
+    parser.add_argument('--seed', type=int, default=42, help="随机种子")
+    args = parser.parse_args()
+    
+    args.workloads = [name.strip() for name in args.workloads.split(',') if name.strip()]
+    unknown = set(args.workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"未知的工作负载: {', '.join(sorted(unknown))}")
+    
+    # 测试期间只输出错误日志（登录失败等日志会影响计时）
+    logging.getLogger().setLevel(logging.ERROR)
+    logging.getLogger('app').setLevel(logging.ERROR)
+    
+    results = asyncio.run(run(args))
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入 {args.output}")
+    
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
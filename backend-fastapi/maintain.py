@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+访问日志维护脚本
+可以由cron定时执行，代替应用内的维护任务（ACCESS_LOG_MAINTENANCE_INTERVAL=0）
+
+    python maintain.py partition          # 把 access_logs 转换为按月分区表（MySQL，一次性）
+    python maintain.py run                # 预建分区并删除超过保留期的日志
+    python maintain.py run --retention-months 6
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from datetime import date
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.config import Config
+from app.retention import add_months, month_start, run_log_maintenance
+from app.storage import create_database
+
+
+async def partition(args):
+    db = create_database(Config)
+    try:
+        if db.name != 'mysql':
+            print(f"存储后端 {db.name} 不需要分区")
+            return
+        through = add_months(month_start(date.today()), args.ahead)
+        added = await db.partition_access_logs(through)
+        if added:
+            print(f"✅ access_logs 已转换为按月分区表: {added[0]} ~ {added[-1]}")
+        else:
+            print("access_logs 已经是分区表（或其他进程正在维护），未做修改")
+    finally:
+        await db.close()
+
+
+async def run(args):
+    db = create_database(Config)
+    try:
+        result = await run_log_maintenance(db, args.retention_months, args.ahead)
+    finally:
+        await db.close()
+    print(f"📅 新建分区: {', '.join(result['partitions_added']) or '无'}")
+    if result['cutoff']:
+        print(f"🧹 已删除 {result['cutoff']} 之前的日志: {result['purged_rows']}条")
+    else:
+        print("🧹 未设置保留期，不删除日志")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="访问日志维护")
+    parser.add_argument('command', choices=['partition', 'run'])
+    parser.add_argument('--retention-months', type=int, default=Config.ACCESS_LOG_RETENTION_MONTHS,
+                        help="保留的完整月份数（另加当月），0表示不删除")
+    parser.add_argument('--ahead', type=int, default=Config.ACCESS_LOG_PARTITIONS_AHEAD,
+                        help="预建到当月之后第几个月")
+    args = parser.parse_args()
+    asyncio.run(partition(args) if args.command == 'partition' else run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库迁移脚本（MySQL）
+部署新版本前执行，按版本号顺序创建表和索引
+
+    python migrate.py                # 执行所有未执行的迁移
+    python migrate.py --target 2     # 只执行到版本2
+    python migrate.py status         # 查看已执行 / 未执行的迁移
+    python migrate.py check          # 检查索引和热点查询的执行计划
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.config import Config
+from app.migrations import MIGRATIONS, check_schema, migrate, migration_status
+from app.storage import create_database
+
+
+async def main(args):
+    db = create_database(Config)
+    try:
+        if db.name != 'mysql':
+            print(f"存储后端 {db.name} 启动时自动创建表结构，不需要迁移")
+            return 0
+        
+        if args.command == 'status':
+            status = await migration_status(db)
+            for migration in MIGRATIONS:
+                mark = '✅' if migration.version in status['applied'] else '⏳'
+                print(f"{mark} {migration.version}: {migration.description}")
+            return 0
+        
+        if args.command == 'check':
+            warnings = await check_schema(db)
+            for warning in warnings:
+                print(f"⚠️  {warning}")
+            if not warnings:
+                print("✅ 表结构和索引检查通过")
+            return 1 if warnings else 0
+        
+        executed = await migrate(db, args.target)
+        if executed:
+            print(f"✅ 已执行迁移: {executed}")
+        else:
+            print("✅ 没有需要执行的迁移")
+        return 0
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="数据库迁移")
+    parser.add_argument('command', nargs='?', choices=['up', 'status', 'check'], default='up')
+    parser.add_argument('--target', type=int, default=None, help="最多执行到的版本号")
+    sys.exit(asyncio.run(main(parser.parse_args())))
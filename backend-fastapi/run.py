@@ -3,21 +3,40 @@
 """
 FastAPI应用启动脚本
 用于开发和生产环境
+
+    RUN_MODE=development（默认）: 单进程uvicorn，RELOAD=true 时自动重载
+    RUN_MODE=production: 多进程（app/server.py），worker数默认等于CPU数，
+                         自动重启崩溃的worker，SIGHUP滚动重启
 """
 
 import uvicorn
 import os
 import sys
+from dotenv import load_dotenv
 
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 if __name__ == "__main__":
+    # 读取.env，使 RUN_MODE / WORKERS 等启动参数也可以写在.env中
+    load_dotenv()
+    from app.server import ServerSettings, parse_workers, serve
+    
+    mode = os.getenv("RUN_MODE", "development").lower()
+    
+    # 没有fork的系统（Windows）在生产模式下退回uvicorn自带的多进程
+    if mode == "production" and hasattr(os, "fork"):
+        settings = ServerSettings.from_env()
+        print(f"🚀 Starting FastAPI application (production) on {settings.host}:{settings.port}")
+        print(f"👷 Workers: {settings.workers}  Backlog: {settings.backlog}  Keep-Alive: {settings.keepalive_timeout}s")
+        print(f"🔁 SO_REUSEPORT: {settings.reuse_port}  Preload: {settings.preload_app}")
+        sys.exit(serve(settings))
+    
     # 从环境变量获取配置
     host = os.getenv("HOST", "127.0.0.1")
     port = int(os.getenv("PORT", 8000))
-    reload = os.getenv("RELOAD", "true").lower() == "true"
-    workers = int(os.getenv("WORKERS", 1))
+    reload = mode != "production" and os.getenv("RELOAD", "true").lower() == "true"
+    workers = parse_workers(os.getenv("WORKERS", "1"))
     
     print(f"🚀 Starting FastAPI application on {host}:{port}")
     print(f"📝 Reload: {reload}")
@@ -31,5 +50,7 @@ if __name__ == "__main__":
         reload=reload,
         workers=workers if not reload else 1,  # reload模式不支持多worker
         log_level="info",
-        access_log=True
+        access_log=True,
+        backlog=int(os.getenv("BACKLOG", 2048)),
+        timeout_keep_alive=int(os.getenv("KEEPALIVE_TIMEOUT", 5))
     )
@@ -0,0 +1,556 @@
+# -*- coding: utf-8 -*-
+"""
+异步数据库层测试（使用假连接，不需要MySQL）
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.async_database import AsyncDatabase
+from app.storage.base import decode_log_cursor, encode_log_cursor
+from app.config import Config
+
+
+class FakeCursor:
+    """按SQL模拟 access_logs 查询"""
+    
+    def __init__(self, rows):
+        self.rows = rows
+        self.result = []
+        self.executed = []
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
+    
+    async def executemany(self, sql, rows):
+        self.executed.append((sql, rows))
+        return len(rows)
+    
+    async def execute(self, sql, params=()):
+        self.executed.append((sql, params))
+        if 'FROM access_logs' not in sql:
+            self.result = []
+            return
+        rows = sorted(self.rows, key=lambda r: (r['access_time'], r['id']), reverse=True)
+        if 'WHERE access_time <=' in sql:
+            t, _, i, limit = params
+            rows = [r for r in rows if (r['access_time'], r['id']) < (t, i)]
+        elif 'WHERE access_time >=' in sql:
+            t, _, i, limit = params
+            rows = [r for r in reversed(rows) if (r['access_time'], r['id']) > (t, i)]
+        else:
+            limit = params[0]
+        self.result = [dict(r) for r in rows[:limit]]
+    
+    async def fetchall(self):
+        return self.result
+    
+    async def fetchone(self):
+        return self.result[0] if self.result else None
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.cursors = []
+    
+    def cursor(self):
+        cursor = FakeCursor(self.rows)
+        self.cursors.append(cursor)
+        return cursor
+
+
+class ProbeCursor(FakeCursor):
+    """模拟 information_schema 和 table_counters 查询（检查统计表是否已初始化）"""
+    
+    def __init__(self, tables=('table_counters',), counters=True, error=None):
+        super().__init__([])
+        self.tables = set(tables)
+        self.counters = counters
+        self.error = error
+    
+    async def execute(self, sql, params=()):
+        self.executed.append((sql, params))
+        if 'information_schema.TABLES' in sql:
+            if self.error:
+                raise self.error
+            self.result = [{'count': int(params[0] in self.tables)}]
+        elif 'SELECT 1 FROM table_counters' in sql:
+            self.result = [{'1': 1}] if self.counters else []
+        else:
+            self.result = []
+    
+    async def fetchone(self):
+        return self.result[0] if self.result else None
+
+
+def make_probe_db(cursor):
+    """所有连接共用同一个 ProbeCursor"""
+    db = make_db(0)
+    
+    @asynccontextmanager
+    async def get_connection():
+        conn = FakeConnection([])
+        conn.cursor = lambda: cursor
+        db.connections.append(conn)
+        yield conn
+    
+    db.get_connection = get_connection
+    return db
+
+
+def make_db(count):
+    start = datetime(2024, 1, 1)
+    # 每两条记录同一秒，验证 (access_time, id) 组合定位
+    rows = [
+        {'id': i, 'ip_address': '10.0.0.1', 'user_agent': 'ua',
+         'access_time': start + timedelta(seconds=i // 2)}
+        for i in range(1, count + 1)
+    ]
+    db = AsyncDatabase(Config)
+    db.connections = []
+    
+    @asynccontextmanager
+    async def get_connection():
+        conn = FakeConnection(rows)
+        db.connections.append(conn)
+        yield conn
+    
+    db.get_connection = get_connection
+    return db
+
+
+def test_cursor_roundtrip():
+    """游标可以还原，无效游标抛出ValueError"""
+    t = datetime(2024, 1, 1, 8, 30)
+    assert decode_log_cursor(encode_log_cursor('next', t, 42)) == ('next', t, 42)
+    with pytest.raises(ValueError):
+        decode_log_cursor('not-a-cursor')
+
+
+def test_cursor_pagination_walks_all_rows():
+    """向后翻页覆盖全部记录，向前翻页回到上一页"""
+    db = make_db(7)
+    
+    async def run():
+        pages = []
+        result = await db.get_access_logs_by_cursor(page_size=3)
+        assert result['prev_cursor'] is None
+        pages.append(result)
+        while result['next_cursor']:
+            result = await db.get_access_logs_by_cursor(result['next_cursor'], page_size=3)
+            pages.append(result)
+        back = await db.get_access_logs_by_cursor(pages[1]['prev_cursor'], page_size=3)
+        return pages, back
+    
+    pages, back = asyncio.run(run())
+    ids = [log['id'] for page in pages for log in page['logs']]
+    assert ids == [7, 6, 5, 4, 3, 2, 1]
+    assert [log['id'] for log in back['logs']] == [7, 6, 5]
+    assert back['prev_cursor'] is None
+    assert back['next_cursor'] is not None
+
+
+def test_batch_insert_updates_stats_in_same_transaction():
+    """批量写入与计数、按天汇总使用同一连接（同一事务）"""
+    db = make_db(0)
+    db._log_stats_ready = True
+    day = datetime(2024, 1, 1, 23, 59)
+    rows = [
+        ('10.0.0.1', 'ua', day),
+        ('10.0.0.1', 'ua', day),
+        ('10.0.0.2', 'ua', day + timedelta(minutes=2)),
+    ]
+    
+    assert asyncio.run(db.add_access_logs(rows)) == 3
+    assert len(db.connections) == 1
+    executed = db.connections[0].cursors[0].executed
+    assert 'INSERT INTO access_logs' in executed[0][0]
+    # 跨天的批次按日期分别汇总
+    daily = [params for sql, params in executed if 'INTO access_log_daily (' in sql]
+    assert daily == [(day.date(), 2, 1), ((day + timedelta(minutes=2)).date(), 1, 1)]
+    assert 'UPDATE table_counters' in executed[-1][0]
+    assert executed[-1][1] == (3, 2)
+
+
+def test_hits_update_first_row_and_stats():
+    """重复访问按 (access_time, ip, user_agent) 累加到首条日志，按天汇总和计数在同一事务内增加"""
+    db = make_db(0)
+    db._log_stats_ready = True
+    db._hits_column = True
+    first = datetime(2024, 1, 1, 23, 59, 30)
+    hits = [('10.0.0.1', 'ua', first, 3), ('10.0.0.2', 'curl', first + timedelta(minutes=1), 2)]
+    
+    assert asyncio.run(db.add_access_log_hits(hits)) == 5
+    assert len(db.connections) == 1
+    executed = db.connections[0].cursors[0].executed
+    assert 'UPDATE access_logs SET hits = hits + %s' in executed[0][0]
+    assert 'AND user_agent = %s' in executed[0][0]
+    assert executed[0][1] == [(3, first, '10.0.0.1', 'ua'), (2, first + timedelta(minutes=1), '10.0.0.2', 'curl')]
+    daily = [params for sql, params in executed if 'INTO access_log_daily (' in sql]
+    assert daily == [(first.date(), 3), ((first + timedelta(minutes=1)).date(), 2)]
+    assert "table_name = 'access_log_hits'" in executed[-1][0]
+    assert executed[-1][1] == (5,)
+
+
+def test_stats_fills_missing_days():
+    """按天汇总缺失的日期补0"""
+    db = make_db(0)
+    db._log_stats_ready = True
+    today = date.today()
+    
+    class StatsCursor(FakeCursor):
+        async def execute(self, sql, params=()):
+            if 'table_counters' in sql:
+                self.result = [{'table_name': 'access_logs', 'row_count': 10},
+                               {'table_name': 'access_log_ips', 'row_count': 4}]
+            else:
+                self.result = [{'stat_date': today, 'visits': 3, 'unique_ips': 2}]
+    
+    class StatsConnection(FakeConnection):
+        def cursor(self):
+            return StatsCursor([])
+    
+    @asynccontextmanager
+    async def get_connection():
+        yield StatsConnection([])
+    
+    db.get_connection = get_connection
+    stats = asyncio.run(db.get_access_stats(days=3))
+    assert stats['total_visits'] == 10 and stats['unique_ips'] == 4
+    assert stats['today_visits'] == 3 and stats['today_unique_ips'] == 2
+    assert [d['visits'] for d in stats['daily']] == [0, 0, 3]
+
+
+def test_update_configs_single_statement():
+    """多个配置项用一条多行upsert写入，与版本号递增在同一连接（同一事务）"""
+    db = make_db(0)
+    db._config_version_ready = True
+    
+    async def fetchone():
+        return {'version': 8}
+    
+    @asynccontextmanager
+    async def get_connection():
+        conn = FakeConnection([])
+        conn.cursor = lambda: cursor
+        db.connections.append(conn)
+        yield conn
+    
+    cursor = FakeCursor([])
+    cursor.fetchone = fetchone
+    db.get_connection = get_connection
+    
+    version = asyncio.run(db.update_configs({'sub_title': 'B', 'main_title': 'A'}))
+    assert version == 8
+    assert len(db.connections) == 1
+    (upsert, params), (bump, _), (select, _) = cursor.executed
+    assert upsert.count('(%s, %s)') == 2
+    assert params == ['main_title', 'A', 'sub_title', 'B']
+    assert 'version = version + 1' in bump
+    assert 'SELECT version' in select
+
+
+
+def test_ensure_stats_only_probes_tables():
+    """统计表由迁移创建：启动时只检查是否存在，不执行DDL，未创建时使用实时查询"""
+    def run(tables, counters):
+        cursor = ProbeCursor(tables, counters)
+        ready = asyncio.run(make_probe_db(cursor).ensure_access_log_stats())
+        assert not any('CREATE' in sql or 'INSERT' in sql for sql, _ in cursor.executed)
+        return ready
+    
+    assert run({'table_counters'}, counters=True) is True
+    assert run({'table_counters'}, counters=False) is False
+    assert run(set(), counters=False) is False
+
+
+def test_insert_rechecks_stats_in_transaction():
+    """本进程启动时检查统计表失败，写入时在同一事务内重新检查，统计表可用就一起更新"""
+    cursor = ProbeCursor()
+    db = make_probe_db(cursor)
+    db._log_stats_retry_at = float('inf')
+    rows = [('10.0.0.1', 'ua', datetime(2024, 1, 1, 8))]
+    
+    assert asyncio.run(db.add_access_logs(rows)) == 1
+    assert len(db.connections) == 1
+    assert 'UPDATE table_counters' in cursor.executed[-1][0]
+    assert db._log_stats_ready
+
+
+def test_insert_fails_when_stats_check_fails():
+    """无法确认统计表状态时整批失败（事务回滚，由缓冲队列重试），不写入不计数的日志"""
+    db = make_probe_db(ProbeCursor(error=RuntimeError('lost connection')))
+    
+    with pytest.raises(RuntimeError):
+        asyncio.run(db.add_access_logs([('10.0.0.1', 'ua', datetime(2024, 1, 1, 8))]))
+    with pytest.raises(RuntimeError):
+        asyncio.run(db.add_access_log_hits([('10.0.0.1', 'ua', datetime(2024, 1, 1, 8), 2)]))
+
+
+def test_insert_without_stats_tables():
+    """统计表未初始化（未执行迁移）时只写日志，由迁移6初始化时统计"""
+    cursor = ProbeCursor(tables=(), counters=False)
+    db = make_probe_db(cursor)
+    
+    assert asyncio.run(db.add_access_logs([('10.0.0.1', 'ua', datetime(2024, 1, 1, 8))])) == 1
+    updates = [sql for sql, _ in cursor.executed if 'UPDATE' in sql or 'access_log_daily' in sql]
+    assert updates == []
+
+
+def test_log_queries_without_hits_column():
+    """未执行迁移5的旧表没有 hits 列：列表按每行1次访问返回，重复访问只计入统计"""
+    db = make_db(3)
+    
+    result = asyncio.run(db.get_access_logs_by_cursor(page_size=2))
+    assert len(result['logs']) == 2
+    select = db.connections[0].cursors[0].executed[-1][0]
+    assert '1 AS hits' in select
+    
+    db._log_stats_ready = True
+    assert asyncio.run(db.add_access_log_hits([('10.0.0.1', 'ua', datetime(2024, 1, 1), 2)])) == 2
+    executed = db.connections[-1].cursors[0].executed
+    assert not any('UPDATE access_logs' in sql for sql, _ in executed)
+    assert "table_name = 'access_log_hits'" in executed[-1][0]
+    
+    db._hits_column = True
+    asyncio.run(db.get_access_logs_by_cursor(page_size=2))
+    select = db.connections[-1].cursors[0].executed[-1][0]
+    assert 'access_time, hits' in select
+
+
+# ==================== 连接池（模拟aiomysql） ====================
+
+class FakeAioCursor:
+    """模拟aiomysql字典游标，按预设结果返回"""
+    
+    def __init__(self, connection):
+        self.connection = connection
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
+    
+    async def execute(self, sql, params=None):
+        self.connection.executed.append((' '.join(sql.split()), params))
+        if self.connection.error:
+            raise self.connection.error
+    
+    async def fetchall(self):
+        return self.connection.results
+    
+    async def fetchone(self):
+        return self.connection.results[0] if self.connection.results else None
+
+
+class FakeAioConnection:
+    def __init__(self, results=(), error=None, rollback_error=None):
+        self.results = list(results)
+        self.error = error
+        self.rollback_error = rollback_error
+        self.executed = []
+        self.events = []
+    
+    def cursor(self):
+        return FakeAioCursor(self)
+    
+    async def commit(self):
+        self.events.append('commit')
+    
+    async def rollback(self):
+        self.events.append('rollback')
+        if self.rollback_error:
+            raise self.rollback_error
+    
+    def close(self):
+        self.events.append('close')
+
+
+class FakeAioPool:
+    """模拟aiomysql连接池：按顺序借出预设的连接，记录归还"""
+    
+    def __init__(self, connections, maxsize=10):
+        self.connections = list(connections)
+        self.released = []
+        self.maxsize = maxsize
+        self.closed = False
+    
+    @property
+    def size(self):
+        return len(self.connections) + len(self.released)
+    
+    @property
+    def freesize(self):
+        return len(self.released)
+    
+    async def acquire(self):
+        if not self.connections:
+            await asyncio.sleep(3600)
+        return self.connections.pop(0)
+    
+    def release(self, connection):
+        self.released.append(connection)
+    
+    def close(self):
+        self.closed = True
+    
+    async def wait_closed(self):
+        pass
+
+
+def make_pooled_db(monkeypatch, *connections):
+    """AsyncDatabase + 模拟的 aiomysql.create_pool，返回 (db, 创建连接池的参数列表, 连接池)"""
+    pool = FakeAioPool(connections)
+    calls = []
+    
+    async def create_pool(**kwargs):
+        calls.append(kwargs)
+        await asyncio.sleep(0)
+        return pool
+    
+    monkeypatch.setattr('app.async_database.aiomysql.create_pool', create_pool)
+    return AsyncDatabase(Config), calls, pool
+
+
+def test_get_pool_created_once(monkeypatch):
+    """并发调用只创建一个连接池，连接参数关闭自动提交"""
+    db, calls, pool = make_pooled_db(monkeypatch)
+    
+    async def run():
+        return await asyncio.gather(*(db.get_pool() for _ in range(5)))
+    
+    assert asyncio.run(run()) == [pool] * 5
+    assert len(calls) == 1
+    assert calls[0]['maxsize'] == Config.MYSQL_POOL_SIZE
+    assert calls[0]['minsize'] == min(Config.MYSQL_POOL_MIN_SIZE, Config.MYSQL_POOL_SIZE)
+    assert calls[0]['autocommit'] is False
+    assert calls[0]['charset'] == 'utf8mb4'
+    
+    asyncio.run(db.close())
+    assert pool.closed and db._pool is None
+
+
+def test_get_connection_commits_and_releases(monkeypatch):
+    """正常结束时提交并归还连接"""
+    conn = FakeAioConnection()
+    db, _, pool = make_pooled_db(monkeypatch, conn)
+    
+    async def run():
+        async with db.get_connection() as acquired:
+            assert acquired is conn
+    
+    asyncio.run(run())
+    assert conn.events == ['commit']
+    assert pool.released == [conn]
+
+
+def test_get_connection_rolls_back_on_error(monkeypatch):
+    """出错时回滚并重新抛出异常，连接归还后可继续复用"""
+    conn = FakeAioConnection()
+    db, _, pool = make_pooled_db(monkeypatch, conn)
+    
+    async def run():
+        async with db.get_connection():
+            raise ValueError('bad query')
+    
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+    assert conn.events == ['rollback']
+    assert pool.released == [conn]
+
+
+def test_get_connection_closes_when_rollback_fails(monkeypatch):
+    """回滚也失败时关闭连接（连接池不再复用），抛出原来的异常"""
+    conn = FakeAioConnection(rollback_error=ConnectionError('gone away'))
+    db, _, pool = make_pooled_db(monkeypatch, conn)
+    
+    async def run():
+        async with db.get_connection():
+            raise ValueError('bad query')
+    
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+    assert conn.events == ['rollback', 'close']
+    assert pool.released == [conn]
+
+
+def test_get_connection_pool_timeout(monkeypatch):
+    """连接池耗尽时等待 MYSQL_POOL_TIMEOUT 秒后超时"""
+    db, _, _ = make_pooled_db(monkeypatch)
+    db.pool_timeout = 0.01
+    
+    async def run():
+        async with db.get_connection():
+            pass
+    
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run())
+
+
+def test_queries_through_pool(monkeypatch):
+    """查询通过连接池执行，参数化传入，结果按字典返回"""
+    config_conn = FakeAioConnection([
+        {'config_key': 'main_title', 'config_value': 'Hello'},
+        {'config_key': 'sub_title', 'config_value': 'World'},
+    ])
+    admin = {'id': 1, 'username': 'admin', 'password_hash': 'x', 'created_at': None}
+    admin_conn = FakeAioConnection([admin])
+    failing_conn = FakeAioConnection(error=RuntimeError('server has gone away'))
+    db, _, pool = make_pooled_db(monkeypatch, config_conn, admin_conn, failing_conn)
+    
+    assert asyncio.run(db.get_all_config()) == {'main_title': 'Hello', 'sub_title': 'World'}
+    assert asyncio.run(db.get_admin_by_username('admin')) == admin
+    assert admin_conn.executed[0][1] == ('admin',)
+    assert 'WHERE username = %s' in admin_conn.executed[0][0]
+    with pytest.raises(RuntimeError):
+        asyncio.run(db.get_admin_by_id(1))
+    
+    assert [conn.events for conn in (config_conn, admin_conn, failing_conn)] == [
+        ['commit'], ['commit'], ['rollback'],
+    ]
+    assert pool.released == [config_conn, admin_conn, failing_conn]
+    assert db.get_pool_stats() == {'size': 10, 'open': 3, 'idle': 3, 'in_use': 0}
+
+
+def test_clock_check_warns_on_timezone_mismatch(caplog):
+    """应用进程与MySQL的当前时间相差较大（时区不一致）时警告"""
+    class ClockCursor(FakeCursor):
+        def __init__(self, db_now):
+            super().__init__([])
+            self.db_now = db_now
+        
+        async def execute(self, sql, params=()):
+            self.result = [{'db_now': self.db_now}]
+    
+    skew = asyncio.run(AsyncDatabase._check_clock(ClockCursor(datetime.now())))
+    assert abs(skew) < 5
+    assert 'TZ' not in caplog.text
+    
+    skew = asyncio.run(AsyncDatabase._check_clock(ClockCursor(datetime.now() - timedelta(hours=8))))
+    assert 8 * 3600 - 5 < skew < 8 * 3600 + 5
+    assert 'TZ' in caplog.text
+
+
+def test_warm_up_releases_connections_when_acquire_fails(monkeypatch):
+    """预热时中途借出连接失败，已借出的连接全部归还"""
+    first, second = FakeAioConnection(), FakeAioConnection()
+    db, _, pool = make_pooled_db(monkeypatch, first, second)
+    db.pool_min_size = 3
+    
+    async def acquire():
+        if not pool.connections:
+            raise ConnectionError("too many connections")
+        return pool.connections.pop(0)
+    
+    pool.acquire = acquire
+    with pytest.raises(ConnectionError):
+        asyncio.run(db.warm_up())
+    assert pool.released == [first, second]
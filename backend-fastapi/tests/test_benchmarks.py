@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+负载测试脚本冒烟测试（内存数据库，小规模运行一遍所有工作负载）
+"""
+
+import argparse
+import asyncio
+
+from benchmarks.load_test import WORKLOADS, run
+
+
+def test_load_test_smoke():
+    """所有工作负载都能跑通并输出延迟分位数"""
+    args = argparse.Namespace(
+        seed=1, scale=0.01, concurrency=4, workloads=list(WORKLOADS)
+    )
+    results = asyncio.run(run(args))
+    
+    assert set(results['workloads']) == set(WORKLOADS)
+    for name, result in results['workloads'].items():
+        assert result['requests'] >= 1, name
+        assert result['latency_ms']['p50'] <= result['latency_ms']['p99']
+        assert not any(code.startswith('5') for code in result['status_codes']), name
+        # 测的是各接口本身，不应被限流
+        assert '429' not in result['status_codes'], name
+    assert results['workloads']['log_burst']['log_buffer']['pending'] == 0
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+配置缓存和令牌缓存测试（使用假数据库，不需要MySQL）
+"""
+
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import dependencies
+from app.cache import ConfigCache, VerifiedTokenCache
+from app.dependencies import create_access_token, get_config_cache, get_current_admin, verify_token
+from app.main import app
+
+
+class FakeDatabase:
+    """模拟AsyncDatabase的配置接口"""
+    
+    def __init__(self):
+        self.configs = {'main_title': 'Hello World'}
+        self.version = 1
+        self.reads = 0
+        self.fail = False
+    
+    async def get_config_version(self):
+        if self.fail:
+            raise RuntimeError("db down")
+        return self.version
+    
+    async def get_config_snapshot(self):
+        self.reads += 1
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("db down")
+        return dict(self.configs), datetime(2024, 1, 1, 12, 0, 0)
+    
+    async def update_configs(self, updates):
+        self.configs.update(updates)
+        self.version += 1
+        return self.version
+
+
+def test_hits_served_from_memory():
+    """缓存有效期内不访问数据库"""
+    db = FakeDatabase()
+    cache = ConfigCache(db, ttl=60)
+    
+    async def run():
+        await asyncio.gather(*[cache.get_all_config() for _ in range(10)])
+        return await cache.get_all_config()
+    
+    assert asyncio.run(run()) == {'main_title': 'Hello World'}
+    assert db.reads == 1
+    stats = cache.stats()
+    assert stats['loads'] == 1
+    assert stats['hits'] + stats['misses'] == 11
+
+
+def test_update_invalidates():
+    """写入配置后立即读到新值"""
+    db = FakeDatabase()
+    cache = ConfigCache(db, ttl=60)
+    
+    async def run():
+        await cache.get_all_config()
+        await cache.update_config('main_title', 'New')
+        return await cache.get_all_config()
+    
+    assert asyncio.run(run())['main_title'] == 'New'
+    assert db.reads == 2
+
+
+def test_ttl_zero_disables_cache():
+    """ttl为0时每次回源"""
+    db = FakeDatabase()
+    cache = ConfigCache(db, ttl=0)
+    
+    async def run():
+        await cache.get_all_config()
+        await cache.get_all_config()
+    
+    asyncio.run(run())
+    assert db.reads == 2
+
+
+def test_stale_data_on_load_error():
+    """回源失败时使用旧数据，没有旧数据时抛出异常"""
+    db = FakeDatabase()
+    db.fail = True
+    cache = ConfigCache(db, ttl=60)
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_all_config())
+    
+    db.fail = False
+    asyncio.run(cache.get_all_config())
+    cache._expires_at = 0.0
+    db.fail = True
+    assert asyncio.run(cache.get_all_config()) == {'main_title': 'Hello World'}
+    assert cache.stats()['load_errors'] == 2
+
+
+def test_stale_data_backoff():
+    """回源失败后 error_backoff 秒内直接返回旧数据，不再访问数据库；之后再次回源"""
+    db = FakeDatabase()
+    cache = ConfigCache(db, ttl=60, version_check_interval=0, error_backoff=0.05)
+    asyncio.run(cache.get_all_config())
+    cache._expires_at = 0.0
+    db.fail = True
+    
+    async def run():
+        for _ in range(10):
+            assert (await cache.get_all_config())['main_title'] == 'Hello World'
+    
+    asyncio.run(run())
+    assert cache.stats()['load_errors'] == 1
+    
+    time.sleep(0.06)
+    db.fail = False
+    db.configs['main_title'] = 'Recovered'
+    assert asyncio.run(cache.get_all_config())['main_title'] == 'Recovered'
+
+
+def test_version_change_from_other_worker():
+    """其他进程修改配置后，版本检查使本地缓存失效"""
+    db = FakeDatabase()
+    cache = ConfigCache(db, ttl=60, version_check_interval=0.01)
+    
+    async def run():
+        await cache.get_all_config()
+        # 模拟其他worker直接修改数据库
+        db.configs['main_title'] = 'Changed elsewhere'
+        db.version += 1
+        assert (await cache.get_all_config())['main_title'] == 'Hello World'
+        await asyncio.sleep(0.02)
+        return await cache.get_all_config()
+    
+    assert asyncio.run(run())['main_title'] == 'Changed elsewhere'
+    assert cache.stats()['remote_invalidations'] == 1
+
+
+def test_conditional_get(monkeypatch):
+    """ETag / Last-Modified 命中时返回304"""
+    db = FakeDatabase()
+    cache = ConfigCache(db, ttl=60)
+    monkeypatch.setitem(app.dependency_overrides, get_config_cache, lambda: cache)
+    client = TestClient(app)
+    
+    response = client.get("/api/config")
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    last_modified = response.headers['Last-Modified']
+    assert response.headers['Cache-Control']
+    
+    response = client.get("/api/config", headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.content == b''
+    
+    response = client.get("/api/config", headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 304
+    
+    response = client.get("/api/config", headers={'If-None-Match': '"other"'})
+    assert response.status_code == 200
+    assert db.reads == 1
+
+
+def test_token_cache_skips_decode(monkeypatch):
+    """重复验证同一令牌时不再调用 jwt.decode"""
+    monkeypatch.setattr(dependencies, 'token_cache', VerifiedTokenCache(max_size=8))
+    token = create_access_token({"admin_id": 1, "username": "admin"})
+    assert verify_token(token)['admin_id'] == 1
+    
+    def fail(*args, **kwargs):
+        raise AssertionError("should not decode")
+    
+    monkeypatch.setattr(dependencies.jwt, 'decode', fail)
+    assert verify_token(token)['username'] == 'admin'
+    stats = dependencies.token_cache.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1 and stats['hit_rate'] == 0.5
+
+
+def test_token_cache_expiry_rotation_and_lru(monkeypatch):
+    """过期条目失效、密钥变化时清空、超出容量时淘汰最久未用的令牌"""
+    cache = VerifiedTokenCache(max_size=2)
+    now = datetime.utcnow().timestamp()
+    cache.put('expired', 'k1', {'exp': now - 1})
+    assert cache.get('expired', 'k1') is None
+    assert cache.stats()['expired'] == 1
+    
+    cache.put('a', 'k1', {'exp': now + 60})
+    cache.put('b', 'k1', {'exp': now + 60})
+    assert cache.get('a', 'k1') is not None
+    cache.put('c', 'k1', {'exp': now + 60})
+    assert cache.get('b', 'k1') is None
+    assert cache.get('a', 'k1') is not None
+    assert cache.stats()['evictions'] == 1
+    
+    assert cache.get('a', 'k2') is None
+    assert cache.stats()['size'] == 0 and cache.stats()['flushes'] == 1
+
+
+def test_update_config_endpoint_single_transaction(monkeypatch):
+    """PUT /api/admin/config 一次写入所有字段，返回新的配置版本号"""
+    db = FakeDatabase()
+    calls = []
+    original = db.update_configs
+    
+    async def update_configs(updates):
+        calls.append(dict(updates))
+        return await original(updates)
+    
+    db.update_configs = update_configs
+    cache = ConfigCache(db, ttl=60)
+    monkeypatch.setitem(app.dependency_overrides, get_config_cache, lambda: cache)
+    monkeypatch.setitem(app.dependency_overrides, get_current_admin, lambda: {'id': 1, 'username': 'admin'})
+    client = TestClient(app)
+    
+    response = client.put("/api/admin/config", json={'main_title': 'A', 'sub_title': 'B'})
+    assert response.status_code == 200
+    assert response.json()['version'] == 2
+    assert calls == [{'main_title': 'A', 'sub_title': 'B'}]
+    
+    response = client.put("/api/admin/config", json={})
+    assert response.status_code == 400
+    assert len(calls) == 1
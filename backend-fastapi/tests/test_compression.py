@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+响应压缩中间件测试
+"""
+
+import asyncio
+import gzip
+import zlib
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.compression import CompressionMiddleware, brotli, negotiate_encoding
+from app.main import app as main_app
+
+LARGE = {'logs': [{'id': i, 'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'} for i in range(100)]}
+
+
+def make_client(**options):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, **options)
+    
+    @app.get('/large')
+    async def large():
+        return LARGE
+    
+    @app.get('/small')
+    async def small():
+        return {'success': True}
+    
+    @app.get('/etag')
+    async def etag():
+        return Response(b'x' * 2000, media_type='text/plain', headers={'ETag': '"abc"'})
+    
+    @app.get('/not-modified')
+    async def not_modified():
+        return Response(status_code=304, headers={'ETag': '"abc"'})
+    
+    @app.get('/image-not-modified')
+    async def image_not_modified():
+        return Response(status_code=304, media_type='image/png')
+    
+    @app.get('/image')
+    async def image():
+        return Response(b'\x89PNG' * 1000, media_type='image/png')
+    
+    @app.get('/gz')
+    async def already_encoded():
+        return Response(gzip.compress(b'a' * 2000), media_type='text/csv', headers={'Content-Encoding': 'gzip'})
+    
+    @app.get('/stream')
+    async def stream():
+        async def chunks():
+            for i in range(5):
+                yield f'{i},10.0.0.{i},Mozilla/5.0\n'.encode() * 50
+        return StreamingResponse(chunks(), media_type='text/csv')
+    
+    return TestClient(app)
+
+
+def raw_get(client, path, accept_encoding):
+    """读取未解压的响应体"""
+    with client.stream('GET', path, headers={'Accept-Encoding': accept_encoding}) as response:
+        return response, b''.join(response.iter_raw())
+
+
+def test_negotiate_encoding():
+    """按权重选择，权重相同时优先br，q=0表示不接受"""
+    assert negotiate_encoding('gzip, br', ('br', 'gzip')) == 'br'
+    assert negotiate_encoding('gzip, br;q=0.5', ('br', 'gzip')) == 'gzip'
+    assert negotiate_encoding('br', ('gzip',)) is None
+    assert negotiate_encoding('*', ('br', 'gzip')) == 'br'
+    assert negotiate_encoding('gzip;q=0, *;q=0.1', ('gzip',)) is None
+    assert negotiate_encoding('identity', ('br', 'gzip')) is None
+    assert negotiate_encoding(None) is None
+
+
+def test_large_json_gzip():
+    """大于阈值的JSON按gzip压缩，Content-Length为压缩后长度"""
+    client = make_client(minimum_size=500)
+    response, body = raw_get(client, '/large', 'gzip')
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.headers['vary'] == 'Accept-Encoding'
+    assert int(response.headers['content-length']) == len(body)
+    assert gzip.decompress(body) == client.get('/large', headers={'Accept-Encoding': 'identity'}).content
+    assert client.get('/large').json() == LARGE
+
+
+def test_skipped_responses():
+    """小响应、不在白名单的类型、已压缩的响应和不支持压缩的客户端都不压缩"""
+    client = make_client(minimum_size=500)
+    
+    response, _ = raw_get(client, '/small', 'gzip')
+    assert 'content-encoding' not in response.headers
+    assert response.headers['vary'] == 'Accept-Encoding'
+    
+    response, _ = raw_get(client, '/image', 'gzip')
+    assert 'content-encoding' not in response.headers
+    assert 'vary' not in response.headers
+    
+    response, body = raw_get(client, '/gz', 'gzip')
+    assert gzip.decompress(body) == b'a' * 2000
+    
+    response, body = raw_get(client, '/large', 'identity')
+    assert 'content-encoding' not in response.headers
+    assert body.startswith(b'{"logs"')
+
+
+def test_not_modified_varies_like_200():
+    """304与200带相同的 Vary，缓存才能区分不同编码的已缓存表示"""
+    client = make_client(minimum_size=100)
+    response, body = raw_get(client, '/not-modified', 'gzip')
+    assert response.status_code == 304 and body == b''
+    assert response.headers['vary'] == 'Accept-Encoding'
+    assert 'content-encoding' not in response.headers
+    
+    response, _ = raw_get(client, '/image-not-modified', 'gzip')
+    assert 'vary' not in response.headers
+
+
+def test_config_not_modified_has_vary():
+    """/api/config 的200和304都带 Vary: Accept-Encoding"""
+    with TestClient(main_app) as client:
+        first = client.get('/api/config')
+        if first.status_code != 200:
+            pytest.skip('数据库不可用')
+        second = client.get('/api/config', headers={'If-None-Match': first.headers['ETag']})
+    assert 'Accept-Encoding' in first.headers['vary']
+    assert second.status_code == 304
+    assert 'Accept-Encoding' in second.headers['vary']
+
+
+def test_etag_weakened():
+    """压缩后强ETag改为弱ETag"""
+    response, _ = raw_get(make_client(), '/etag', 'gzip')
+    assert response.headers['etag'] == 'W/"abc"'
+
+
+def test_streaming_response_compressed():
+    """流式响应压缩后去掉Content-Length，可以完整解压"""
+    client = make_client(minimum_size=500)
+    response, body = raw_get(client, '/stream', 'gzip')
+    assert response.headers['content-encoding'] == 'gzip'
+    assert 'content-length' not in response.headers
+    assert gzip.decompress(body).count(b'\n') == 250
+
+
+def test_stream_chunks_flushed_immediately():
+    """每个数据块压缩后立即发送，客户端收到即可解压，不等待整个响应"""
+    chunks = [b'0,10.0.0.1,Mozilla\n' * 100, b'1,10.0.0.2,Mozilla\n' * 100]
+    
+    async def streaming_app(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', b'text/csv')]})
+        for chunk in chunks:
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+    
+    sent = []
+    
+    async def send(message):
+        sent.append(message)
+    
+    scope = {'type': 'http', 'method': 'GET', 'headers': [(b'accept-encoding', b'gzip')]}
+    asyncio.run(CompressionMiddleware(streaming_app, minimum_size=500)(scope, None, send))
+    
+    bodies = [message['body'] for message in sent[1:]]
+    assert [message['more_body'] for message in sent[1:]] == [True, True, False]
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    assert [decompressor.decompress(body) for body in bodies[:2]] == chunks
+    assert gzip.decompress(b''.join(bodies)) == b''.join(chunks)
+
+
+@pytest.mark.skipif(brotli is None, reason="未安装brotli")
+def test_brotli_preferred():
+    """客户端支持br时优先使用brotli"""
+    client = make_client(minimum_size=500)
+    response, body = raw_get(client, '/large', 'gzip, br')
+    assert response.headers['content-encoding'] == 'br'
+    assert brotli.decompress(body) == client.get('/large', headers={'Accept-Encoding': 'identity'}).content
+
+
+def test_health_not_compressed():
+    """/api/health 响应很小，不压缩"""
+    response, _ = raw_get(TestClient(main_app), '/api/health', 'gzip, br')
+    assert response.status_code == 200
+    assert 'content-encoding' not in response.headers
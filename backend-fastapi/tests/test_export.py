@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+访问日志导出测试（使用假数据库，不需要MySQL）
+"""
+
+import asyncio
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+from app.export import stream_access_logs
+
+
+class FakeDatabase:
+    """按批返回日志，记录生成器是否被关闭"""
+    
+    def __init__(self, batches):
+        self.batches = batches
+        self.closed = False
+    
+    async def iter_access_logs(self, start=None, end=None, batch_size=1000):
+        try:
+            for rows in self.batches:
+                yield rows
+        finally:
+            self.closed = True
+
+
+def make_rows(start, count):
+    return [
+        {'id': i, 'ip_address': '10.0.0.1', 'user_agent': 'Mozilla, "quoted"',
+         'access_time': datetime(2024, 1, 1, 8, 0, i), 'hits': 1}
+        for i in range(start, start + count)
+    ]
+
+
+def collect(generator):
+    async def run():
+        return b''.join([chunk async for chunk in generator])
+    return asyncio.run(run())
+
+
+def test_csv_export():
+    """CSV带表头，特殊字符正确转义"""
+    db = FakeDatabase([make_rows(1, 2), make_rows(3, 1)])
+    body = collect(stream_access_logs(db, fmt='csv'))
+    rows = list(csv.reader(io.StringIO(body.decode('utf-8'))))
+    assert rows[0] == ['id', 'ip_address', 'user_agent', 'access_time', 'hits']
+    assert len(rows) == 4
+    assert rows[1][2] == 'Mozilla, "quoted"'
+    assert rows[3][3] == '2024-01-01 08:00:03'
+
+
+def test_csv_export_escapes_formulas():
+    """以公式字符开头的 User-Agent / IP 加单引号前缀，NDJSON保持原值"""
+    rows = make_rows(1, 5)
+    for row, user_agent in zip(rows, ['=HYPERLINK("http://x")', '+1', '-2+3', '@SUM(A1)', 'Mozilla']):
+        row['user_agent'] = user_agent
+    rows[0]['ip_address'] = '=1+1'
+    
+    body = collect(stream_access_logs(FakeDatabase([rows]), fmt='csv'))
+    parsed = list(csv.reader(io.StringIO(body.decode('utf-8'))))[1:]
+    assert [row[2] for row in parsed] == ["'=HYPERLINK(\"http://x\")", "'+1", "'-2+3", "'@SUM(A1)", 'Mozilla']
+    assert parsed[0][1] == "'=1+1"
+    
+    body = collect(stream_access_logs(FakeDatabase([rows]), fmt='ndjson'))
+    assert json.loads(body.splitlines()[0])['user_agent'] == '=HYPERLINK("http://x")'
+
+
+def test_ndjson_gzip_export():
+    """NDJSON经gzip压缩后可还原"""
+    db = FakeDatabase([make_rows(1, 3)])
+    body = gzip.decompress(collect(stream_access_logs(db, fmt='ndjson', compress=True)))
+    lines = body.decode('utf-8').splitlines()
+    assert [json.loads(line)['id'] for line in lines] == [1, 2, 3]
+
+
+def test_early_close_releases_cursor():
+    """客户端中断时关闭底层生成器"""
+    db = FakeDatabase([make_rows(1, 1), make_rows(2, 1), make_rows(3, 1)])
+    
+    async def run():
+        generator = stream_access_logs(db, fmt='ndjson')
+        await generator.__anext__()
+        await generator.aclose()
+    
+    asyncio.run(run())
+    assert db.closed
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+密码哈希执行器测试
+"""
+
+import asyncio
+import time
+
+from werkzeug.security import generate_password_hash
+
+from app.hashing import PasswordHasher, PasswordHasherBusy
+
+
+def test_check_and_hash_password():
+    """在线程池中校验和生成密码哈希"""
+    hasher = PasswordHasher(max_workers=1)
+    password_hash = generate_password_hash('secret')
+    
+    async def run():
+        assert await hasher.check_password(password_hash, 'secret')
+        assert not await hasher.check_password(password_hash, 'wrong')
+        new_hash = await hasher.hash_password('other')
+        assert await hasher.check_password(new_hash, 'other')
+    
+    try:
+        asyncio.run(run())
+    finally:
+        hasher.shutdown()
+    assert hasher.stats()['completed'] == 4
+
+
+def test_event_loop_not_blocked():
+    """哈希计算期间事件循环仍可调度其他协程"""
+    hasher = PasswordHasher(max_workers=1)
+    ticks = []
+    
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+    
+    async def run():
+        await asyncio.gather(hasher._run(time.sleep, 0.2), ticker())
+    
+    try:
+        asyncio.run(run())
+    finally:
+        hasher.shutdown()
+    assert len(ticks) == 5
+    assert ticks[-1] - ticks[0] < 0.15
+
+
+def test_rejects_when_queue_full():
+    """排队任务超过上限时拒绝并记录队列深度"""
+    hasher = PasswordHasher(max_workers=1, max_pending=1)
+    
+    async def run():
+        tasks = [asyncio.ensure_future(hasher._run(time.sleep, 0.05)) for _ in range(3)]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+    
+    try:
+        results = asyncio.run(run())
+    finally:
+        hasher.shutdown()
+    assert sum(isinstance(r, PasswordHasherBusy) for r in results) == 1
+    stats = hasher.stats()
+    assert stats['rejected'] == 1
+    assert stats['max_queue_depth'] == 1
+    assert stats['queue_depth'] == 0
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+访问日志缓冲测试（使用假数据库，不需要MySQL）
+"""
+
+import asyncio
+from datetime import datetime
+
+from app.log_buffer import AccessLogBuffer, VisitDeduplicator
+
+
+class FakeDatabase:
+    """模拟AsyncDatabase的批量写入接口"""
+    
+    def __init__(self):
+        self.batches = []
+        self.hits = []
+        self.fail = False
+    
+    async def add_access_logs(self, rows):
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("db down")
+        self.batches.append(list(rows))
+        return len(rows)
+    
+    async def add_access_log_hits(self, hits):
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("db down")
+        self.hits.append(list(hits))
+        return sum(count for _, _, _, count in hits)
+
+
+def test_batches_by_size():
+    """按批次大小分批写入"""
+    db = FakeDatabase()
+    buffer = AccessLogBuffer(db, max_size=100, batch_size=10, flush_interval=60)
+    
+    async def run():
+        buffer.start()
+        for i in range(25):
+            buffer.put(f'10.0.0.{i}', 'ua')
+        await asyncio.sleep(0.01)
+        await buffer.stop()
+    
+    asyncio.run(run())
+    assert [len(b) for b in db.batches] == [10, 10, 5]
+    assert buffer.stats()['written'] == 25
+
+
+def test_flush_on_interval():
+    """未满一批时按时间间隔写入"""
+    db = FakeDatabase()
+    buffer = AccessLogBuffer(db, batch_size=100, flush_interval=0.01)
+    
+    async def run():
+        buffer.start()
+        buffer.put('10.0.0.1', 'ua')
+        await asyncio.sleep(0.05)
+        written = sum(len(b) for b in db.batches)
+        await buffer.stop()
+        return written
+    
+    assert asyncio.run(run()) == 1
+
+
+def test_drops_when_full():
+    """队列满时丢弃并计数"""
+    buffer = AccessLogBuffer(FakeDatabase(), max_size=2)
+    assert buffer.put('a', 'ua') and buffer.put('b', 'ua')
+    assert not buffer.put('c', 'ua')
+    assert buffer.stats()['dropped'] == 1
+
+
+def test_failed_batch_is_retried():
+    """写入失败的批次保留，下次写入"""
+    db = FakeDatabase()
+    db.fail = True
+    buffer = AccessLogBuffer(db, batch_size=10)
+    buffer.put('a', 'ua')
+    asyncio.run(buffer.flush())
+    assert buffer.stats()['pending'] == 1
+    assert buffer.stats()['failed_batches'] == 1
+    
+    db.fail = False
+    asyncio.run(buffer.flush())
+    assert buffer.stats()['pending'] == 0
+    assert db.batches[0][0][0] == 'a'
+
+
+def test_dedup_collapses_repeats_into_first_row():
+    """窗口内的重复访问不入队，日志写入后累加到首条日志上"""
+    db = FakeDatabase()
+    buffer = AccessLogBuffer(db, batch_size=10, deduplicator=VisitDeduplicator(window=60))
+    for _ in range(4):
+        assert buffer.put('10.0.0.1', 'Mozilla')
+    buffer.put('10.0.0.1', 'curl')
+    buffer.put('10.0.0.2', 'Mozilla')
+    assert buffer.stats()['pending'] == 3
+    
+    asyncio.run(buffer.flush())
+    rows = db.batches[0]
+    assert [(ip, ua) for ip, ua, _ in rows] == [('10.0.0.1', 'Mozilla'), ('10.0.0.1', 'curl'), ('10.0.0.2', 'Mozilla')]
+    assert rows[0][2].microsecond == 0
+    assert db.hits == [[('10.0.0.1', 'Mozilla', rows[0][2], 3)]]
+    assert buffer.stats()['hits_written'] == 3
+    assert buffer.deduplicator.stats()['duplicates'] == 3
+
+
+def test_dedup_window_expiry_and_bound():
+    """窗口结束后写入新日志；超出访客上限时提前结束最早的窗口"""
+    dedup = VisitDeduplicator(window=10, max_size=2)
+    first = datetime(2024, 1, 1, 8, 0, 0)
+    dedup.remember('a', 'ua', first, now=0)
+    assert dedup.add_repeat('a', 'ua', now=5)
+    assert not dedup.add_repeat('a', 'ua', now=10)
+    
+    dedup.remember('a', 'ua', first, now=10)
+    dedup.remember('b', 'ua', first, now=11)
+    dedup.remember('c', 'ua', first, now=12)
+    assert not dedup.add_repeat('a', 'ua', now=13)
+    assert dedup.add_repeat('c', 'ua', now=13)
+    assert dedup.stats()['evictions'] == 1
+    assert sorted(dedup.take_pending()) == [('a', 'ua', first, 1), ('c', 'ua', first, 1)]
+    
+    disabled = VisitDeduplicator(window=0)
+    disabled.remember('a', 'ua', first)
+    assert not disabled.add_repeat('a', 'ua')
+
+
+def test_dedup_keeps_visitors_behind_one_ip_apart():
+    """同一IP后的两个访客在同一秒首次访问，重复次数按 User-Agent 分别记到各自的首条日志"""
+    db = FakeDatabase()
+    buffer = AccessLogBuffer(db, batch_size=10, deduplicator=VisitDeduplicator(window=60))
+    buffer.put('10.0.0.1', 'Mozilla')
+    buffer.put('10.0.0.1', 'curl')
+    buffer.put('10.0.0.1', 'curl')
+    buffer.put('10.0.0.1', 'Mozilla')
+    buffer.put('10.0.0.1', 'curl')
+    
+    asyncio.run(buffer.flush())
+    first = {ua: access_time for _, ua, access_time in db.batches[0]}
+    assert sorted(db.hits[0]) == [
+        ('10.0.0.1', 'Mozilla', first['Mozilla'], 1),
+        ('10.0.0.1', 'curl', first['curl'], 2),
+    ]
+
+
+def test_long_user_agent_truncated_to_column_length():
+    """User-Agent 按列长度截断，写入的值与去重定位首条日志时使用的值一致"""
+    db = FakeDatabase()
+    buffer = AccessLogBuffer(db, batch_size=10, deduplicator=VisitDeduplicator(window=60))
+    buffer.put('10.0.0.1', 'x' * 600)
+    buffer.put('10.0.0.1', 'x' * 600)
+    asyncio.run(buffer.flush())
+    assert len(db.batches[0][0][1]) == 500
+    assert db.hits[0][0][1] == db.batches[0][0][1]
+
+
+def test_dedup_hits_wait_for_rows_and_retry():
+    """首条日志写入失败时不累加；累加失败时放回，下次重试"""
+    db = FakeDatabase()
+    db.fail = True
+    buffer = AccessLogBuffer(db, batch_size=10, deduplicator=VisitDeduplicator(window=60))
+    buffer.put('10.0.0.1', 'ua')
+    buffer.put('10.0.0.1', 'ua')
+    asyncio.run(buffer.flush())
+    assert db.hits == []
+    assert buffer.deduplicator.stats()['pending_hits'] == 1
+    
+    db.fail = False
+    asyncio.run(buffer.flush())
+    assert len(db.batches) == 1
+    assert db.hits[0][0][3] == 1
+    assert buffer.deduplicator.stats()['pending_hits'] == 0
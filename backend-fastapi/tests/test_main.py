@@ -10,6 +10,13 @@ from app.main import app
 client = TestClient(app)
 
 
+@pytest.fixture(scope="module", autouse=True)
+def app_lifespan():
+    """运行应用生命周期（创建共享的数据库连接池、配置缓存等）"""
+    with client:
+        yield
+
+
 def test_root():
     """测试根路径"""
     response = client.get("/")
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+监控指标测试
+"""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import Config
+from app.main import app
+from app.metrics import Counter, Histogram, Registry, DB_CALLS
+from app.query_log import db_timed
+
+
+def test_text_format():
+    """计数器和直方图按Prometheus文本格式输出"""
+    registry = Registry()
+    counter = registry.register(Counter('demo_total', '示例', ('route',)))
+    histogram = registry.register(Histogram('demo_seconds', '示例', ('route',), buckets=(0.1, 1)))
+    counter.inc('/a"b')
+    histogram.observe('/a', value=0.05)
+    histogram.observe('/a', value=0.5)
+    histogram.observe('/a', value=5)
+    
+    lines = registry.render().splitlines()
+    assert '# TYPE demo_total counter' in lines
+    assert 'demo_total{route="/a\\"b"} 1' in lines
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'demo_seconds_sum{route="/a"} 5.55' in lines
+    assert 'demo_seconds_count{route="/a"} 3' in lines
+
+
+def test_db_timed_counts_errors():
+    """数据库方法按结果计数"""
+    @db_timed
+    async def failing_query():
+        raise RuntimeError("db down")
+    
+    with pytest.raises(RuntimeError):
+        asyncio.run(failing_query())
+    assert DB_CALLS._values[('failing_query', 'error')] == 1
+
+
+def test_metrics_endpoint(monkeypatch):
+    """请求按路由模板统计，/api/metrics 需要令牌"""
+    monkeypatch.setattr(Config, 'METRICS_TOKEN', 'scrape-token')
+    monkeypatch.setattr(Config, 'STARTUP_WARMUP_TIMEOUT', 0.1)
+    with TestClient(app) as client:
+        check_metrics(client)
+
+
+def check_metrics(client):
+    client.get("/api/health")
+    client.get("/no/such/path")
+    
+    assert client.get("/api/metrics").status_code == 401
+    assert client.get(
+        "/api/metrics", headers={"Authorization": "Bearer wrong"}
+    ).status_code == 401
+    
+    response = client.get("/api/metrics", headers={"Authorization": "Bearer scrape-token"})
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/api/health",status="200"}' in body
+    assert 'route="<unmatched>",status="404"' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/health",status="200",le="+Inf"}' in body
+    assert 'app_component_stat{component="db_pool",stat="size"}' in body
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+数据库迁移和表结构检查测试（使用假游标，不需要MySQL）
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app import migrations
+from app.migrations import (
+    MIGRATIONS,
+    check_schema,
+    explain_warnings,
+    find_missing_indexes,
+    has_index,
+    migrate
+)
+
+
+def test_migration_versions_ascending():
+    """迁移版本号唯一且递增"""
+    versions = [migration.version for migration in MIGRATIONS]
+    assert versions == sorted(set(versions))
+
+
+def test_has_index_prefix_and_unique():
+    """普通索引按前缀匹配，唯一索引要求列完全相同"""
+    indexes = {
+        'access_logs': {
+            'PRIMARY': (True, ['id', 'access_time']),
+            'idx_time': (False, ['access_time', 'id', 'ip_address']),
+        },
+        'config': {'idx_key_value': (True, ['config_key', 'id'])},
+    }
+    assert has_index(indexes, 'access_logs', ('access_time', 'id'))
+    assert not has_index(indexes, 'access_logs', ('ip_address',))
+    assert not has_index(indexes, 'config', ('config_key',), unique=True)
+    assert find_missing_indexes(indexes) == [('config', ('config_key',), True)]
+
+
+def test_explain_warnings():
+    """全表扫描和filesort都会警告"""
+    plan = [{'table': 'access_logs', 'type': 'ALL', 'rows': 50000, 'Extra': 'Using filesort'}]
+    warnings = explain_warnings('访问日志第一页', plan)
+    assert len(warnings) == 2
+    assert explain_warnings('访问日志第一页', [{'table': 'access_logs', 'type': 'index', 'Extra': None}]) == []
+
+
+class SchemaCursor:
+    """按SQL返回预设结果，记录执行过的语句"""
+    
+    def __init__(self, applied=(), indexes=(), row_estimates=None, plans=None):
+        self.applied = set(applied)
+        self.indexes = list(indexes)
+        self.row_estimates = row_estimates or {}
+        self.plans = plans or {}
+        self.statements = []
+        self.result = []
+        self.connection = self
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
+    
+    def cursor(self):
+        return self
+    
+    async def commit(self):
+        self.statements.append('COMMIT')
+    
+    async def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        self.statements.append(sql)
+        if "TABLE_NAME = 'schema_migrations'" in sql:
+            self.result = [{'count': int(bool(self.applied))}]
+        elif sql.startswith('SELECT version FROM schema_migrations'):
+            self.result = [{'version': version} for version in self.applied]
+        elif 'information_schema.STATISTICS' in sql:
+            self.result = [
+                {'table_name': table, 'index_name': name, 'non_unique': 0 if unique else 1, 'column_name': column}
+                for table, name, unique, columns in self.indexes
+                if table in params
+                for column in columns
+            ]
+        elif 'information_schema.COLUMNS' in sql:
+            self.result = [{'count': 0}]
+        elif 'information_schema.TABLES' in sql:
+            self.result = [{'table_name': t, 'row_estimate': n} for t, n in self.row_estimates.items()]
+        elif sql.startswith('EXPLAIN'):
+            self.result = self.plans.get('access_logs' if 'access_logs' in sql else 'admin_users', [])
+        elif sql.startswith('INSERT INTO schema_migrations'):
+            self.applied.add(params[0])
+        else:
+            self.result = []
+    
+    async def fetchone(self):
+        return self.result[0] if self.result else None
+    
+    async def fetchall(self):
+        return self.result
+
+
+class FakeDatabase:
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.locks = []
+    
+    @asynccontextmanager
+    async def get_connection(self):
+        yield self.cursor
+    
+    @asynccontextmanager
+    async def maintenance_cursor(self, lock, timeout=0):
+        self.locks.append(lock)
+        yield self.cursor
+
+
+def test_migrate_runs_pending_in_order():
+    """只执行未执行的迁移，每个迁移后记录并提交"""
+    cursor = SchemaCursor(applied=[1], indexes=[
+        ('access_logs', 'PRIMARY', True, ['id']),
+        ('config', 'uk_config_key', True, ['config_key']),
+        ('admin_users', 'uk_admin_users_username', True, ['username']),
+    ])
+    db = FakeDatabase(cursor)
+    
+    assert asyncio.run(migrate(db, target=3)) == [2, 3]
+    assert db.locks == [migrations.MIGRATION_LOCK]
+    assert cursor.applied == {1, 2, 3}
+    alters = [s for s in cursor.statements if s.startswith('ALTER TABLE')]
+    assert alters == ['ALTER TABLE access_logs ADD INDEX idx_access_logs_time_id (access_time, id)']
+    assert cursor.statements.count('COMMIT') == 2
+    
+    assert asyncio.run(migrate(db)) == [4, 5, 6]
+    assert 'ALTER TABLE access_logs ADD COLUMN hits INT UNSIGNED NOT NULL DEFAULT 1' in cursor.statements
+    # 统计表由迁移根据现有日志初始化
+    assert any(s.startswith('INSERT IGNORE INTO access_log_daily ') for s in cursor.statements)
+    assert asyncio.run(migrate(db)) == []
+
+
+def test_migrate_lock_busy():
+    """其他进程持有迁移锁时报错"""
+    class BusyDatabase(FakeDatabase):
+        @asynccontextmanager
+        async def maintenance_cursor(self, lock, timeout=0):
+            yield None
+    
+    with pytest.raises(RuntimeError):
+        asyncio.run(migrate(BusyDatabase(SchemaCursor())))
+
+
+def test_check_schema_reports_missing_index_and_full_scan():
+    """缺少索引、未执行的迁移和大表全表扫描都会警告"""
+    cursor = SchemaCursor(
+        applied=[1],
+        indexes=[
+            ('access_logs', 'PRIMARY', True, ['id']),
+            ('config', 'uk_config_key', True, ['config_key']),
+            ('admin_users', 'uk_admin_users_username', True, ['username']),
+        ],
+        row_estimates={'access_logs': 200000, 'admin_users': 1},
+        plans={'access_logs': [{'table': 'access_logs', 'type': 'ALL', 'rows': 200000, 'Extra': 'Using filesort'}]},
+    )
+    warnings = asyncio.run(check_schema(FakeDatabase(cursor)))
+    
+    assert any('迁移未执行' in w for w in warnings)
+    assert any('access_logs 缺少索引 (access_time, id)' in w for w in warnings)
+    assert sum('全表扫描' in w for w in warnings) == 2
+    # 小表不检查执行计划
+    assert not any('管理员登录' in w for w in warnings)
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+数据库耗时统计测试（不需要MySQL）
+"""
+
+import asyncio
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config import Config
+from app import query_log
+from app.query_log import (
+    RequestDbTiming,
+    ServerTimingMiddleware,
+    TimedCursorMixin,
+    db_timed,
+    record_query
+)
+
+
+class FakeCursor:
+    """模拟aiomysql游标：executemany逐条调用execute"""
+    
+    rowcount = -1
+    
+    async def execute(self, query, args=None):
+        self.rowcount = 1
+        return 1
+    
+    async def executemany(self, query, args):
+        for arg in args:
+            await self.execute(query, arg)
+        self.rowcount = len(args)
+        return len(args)
+
+
+class TimedFakeCursor(TimedCursorMixin, FakeCursor):
+    pass
+
+
+def test_slow_query_log(monkeypatch, caplog):
+    """超过阈值的语句输出结构化日志"""
+    monkeypatch.setattr(Config, 'SLOW_QUERY_THRESHOLD_MS', 100)
+    with caplog.at_level(logging.WARNING, logger='app.slow_query'):
+        record_query("SELECT id\n    FROM access_logs LIMIT %s OFFSET %s", 2, 50, 0.25)
+        record_query("SELECT 1", 0, 1, 0.01)
+    
+    records = [r for r in caplog.records if r.name == 'app.slow_query']
+    assert len(records) == 1
+    assert records[0].slow_query == {
+        'sql': 'SELECT id FROM access_logs LIMIT %s OFFSET %s',
+        'params': 2,
+        'rows': 50,
+        'duration_ms': 250.0,
+        'path': None,
+    }
+
+
+def test_cursor_timing_counts_statements():
+    """execute逐条计数，executemany只按模板计一次"""
+    timing = RequestDbTiming('/test')
+    
+    async def run():
+        token = query_log._request_timing.set(timing)
+        try:
+            cursor = TimedFakeCursor()
+            await cursor.execute("SELECT %s", (1,))
+            await cursor.executemany("INSERT INTO t VALUES (%s, %s)", [(1, 2), (3, 4)])
+        finally:
+            query_log._request_timing.reset(token)
+    
+    asyncio.run(run())
+    assert timing.queries == 2
+    assert timing.query_time >= 0
+
+
+def test_server_timing_header():
+    """响应头包含请求内的数据库耗时和各方法耗时"""
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware)
+    
+    @db_timed
+    async def get_access_logs():
+        record_query("SELECT 1", 0, 1, 0.002)
+        record_query("SELECT 2", 0, 1, 0.003)
+    
+    @app.get("/logs")
+    async def logs():
+        await get_access_logs()
+        return {"success": True}
+    
+    response = TestClient(app).get("/logs")
+    header = response.headers['server-timing']
+    assert header.startswith('db;dur=5.00;desc="2 queries", db-pool;dur=0.00')
+    assert 'db.get_access_logs;dur=' in header
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+按客户端IP限流测试
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.dependencies import get_db, get_log_buffer, log_rate_limiter, login_rate_limiter
+from app.main import app
+from app.rate_limit import TokenBucketLimiter
+
+
+def test_bucket_allows_burst_then_refills():
+    """突发请求用完后拒绝并返回等待秒数，按速率补充令牌"""
+    limiter = TokenBucketLimiter(per_minute=60, burst=3)
+    assert [limiter.acquire('10.0.0.1', now=0) for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire('10.0.0.1', now=0) == pytest.approx(1.0)
+    assert limiter.acquire('10.0.0.2', now=0) == 0
+    
+    assert limiter.acquire('10.0.0.1', now=0.5) == pytest.approx(0.5)
+    assert limiter.acquire('10.0.0.1', now=1.0) == 0
+    # 长时间空闲后最多积累 burst 个令牌
+    assert [limiter.acquire('10.0.0.1', now=100) for _ in range(4)][-1] > 0
+    
+    stats = limiter.stats()
+    assert stats['allowed'] == 8
+    assert stats['rejected'] == 3
+    assert limiter.retry_after(0.2) == '1'
+    assert limiter.retry_after(2.5) == '3'
+
+
+def test_bucket_memory_bounded_and_disabled():
+    """记录的IP数有上限，淘汰最久未访问的IP；每分钟请求数为0时不限流"""
+    limiter = TokenBucketLimiter(per_minute=60, burst=1, max_clients=2)
+    limiter.acquire('a', now=0)
+    limiter.acquire('b', now=0)
+    limiter.acquire('a', now=0)
+    limiter.acquire('c', now=0)
+    assert limiter.stats()['clients'] == 2
+    assert limiter.stats()['evictions'] == 1
+    assert limiter.acquire('a', now=0) > 0
+    assert limiter.acquire('b', now=0) == 0
+    
+    disabled = TokenBucketLimiter(per_minute=0)
+    assert all(disabled.acquire('a') == 0 for _ in range(100))
+
+
+def limit(monkeypatch, limiter, burst):
+    """测试期间把限流器调整为每分钟1个请求、突发 burst 个"""
+    monkeypatch.setattr(limiter, 'per_minute', 1)
+    monkeypatch.setattr(limiter, 'rate', 1 / 60)
+    monkeypatch.setattr(limiter, 'burst', burst)
+    limiter.clear()
+
+
+def test_login_rejected_before_password_check(monkeypatch):
+    """超出登录频率后返回429和 Retry-After，不再校验密码"""
+    class FakeDatabase:
+        verifications = 0
+        
+        async def verify_admin(self, username, password):
+            self.verifications += 1
+            return None
+    
+    db = FakeDatabase()
+    limit(monkeypatch, login_rate_limiter, burst=2)
+    monkeypatch.setitem(app.dependency_overrides, get_db, lambda: db)
+    client = TestClient(app)
+    
+    headers = {'X-Real-IP': '203.0.113.7'}
+    statuses = [
+        client.post("/api/admin/login", json={'password': 'wrong'}, headers=headers).status_code
+        for _ in range(2)
+    ]
+    response = client.post("/api/admin/login", json={'password': 'wrong'}, headers=headers)
+    assert statuses == [401, 401]
+    assert response.status_code == 429
+    assert 1 <= int(response.headers['Retry-After']) <= 60
+    assert db.verifications == 2
+    
+    # 其他IP不受影响
+    other = client.post("/api/admin/login", json={'password': 'wrong'}, headers={'X-Real-IP': '203.0.113.8'})
+    assert other.status_code == 401
+
+
+def test_log_rejected_before_buffering(monkeypatch):
+    """超出频率的访问日志请求不进入写入队列"""
+    class FakeBuffer:
+        def __init__(self):
+            self.items = []
+        
+        def put(self, ip_address, user_agent):
+            self.items.append(ip_address)
+            return True
+    
+    buffer = FakeBuffer()
+    limit(monkeypatch, log_rate_limiter, burst=3)
+    monkeypatch.setitem(app.dependency_overrides, get_log_buffer, lambda: buffer)
+    client = TestClient(app)
+    
+    statuses = [
+        client.post("/api/log", headers={'X-Forwarded-For': '198.51.100.1, 10.0.0.1'}).status_code
+        for _ in range(5)
+    ]
+    assert statuses == [200, 200, 200, 429, 429]
+    assert buffer.items == ['198.51.100.1'] * 3
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+JSON响应测试
+"""
+
+import json
+from datetime import date, datetime
+
+from fastapi.testclient import TestClient
+
+from app import responses
+from app.main import app
+from app.responses import FastJSONResponse
+
+
+def test_datetime_serialization():
+    """datetime 输出为ISO格式（省略微秒），中文不转义"""
+    response = FastJSONResponse({
+        "access_time": datetime(2024, 1, 2, 3, 4, 5),
+        "date": date(2024, 1, 2),
+        "message": "你好"
+    })
+    assert json.loads(response.body) == {
+        "access_time": "2024-01-02T03:04:05",
+        "date": "2024-01-02",
+        "message": "你好"
+    }
+    assert response.headers['content-type'] == 'application/json'
+
+
+def test_encoders_agree():
+    """orjson与标准库json的输出格式一致"""
+    content = {"access_time": datetime(2024, 1, 2, 3, 4, 5, 678), "date": date(2024, 1, 2), "hits": 1}
+    expected = {"access_time": "2024-01-02T03:04:05", "date": "2024-01-02", "hits": 1}
+    assert json.loads(responses._stdlib_dumps(content)) == expected
+    if responses.orjson is not None:
+        assert json.loads(responses._orjson_dumps(content)) == expected
+
+
+def test_pre_encoded_routes():
+    """根路径和健康检查返回预编码的JSON"""
+    client = TestClient(app)
+    response = client.get("/")
+    assert response.headers['content-type'] == 'application/json'
+    assert response.json()['docs'] == '/api/docs'
+    
+    data = client.get("/api/health").json()
+    assert data['success'] is True and data['message'] == 'API运行正常'
+    datetime.strptime(data['timestamp'], '%Y-%m-%d %H:%M:%S')
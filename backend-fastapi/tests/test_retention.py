@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+访问日志保留期维护测试
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+
+from app.async_database import AsyncDatabase
+from app.config import Config
+from app.retention import (
+    LogMaintenanceTask,
+    add_months,
+    months_between,
+    partition_month,
+    partition_name,
+    retention_cutoff,
+    run_log_maintenance
+)
+from app.storage import MemoryDatabase
+
+
+def test_month_helpers():
+    """月份计算跨年正确，分区名可以互相转换"""
+    assert add_months(date(2024, 11, 1), 3) == date(2025, 2, 1)
+    assert add_months(date(2024, 2, 1), -2) == date(2023, 12, 1)
+    assert months_between(date(2024, 11, 15), date(2025, 1, 1)) == [
+        date(2024, 11, 1), date(2024, 12, 1), date(2025, 1, 1)
+    ]
+    assert partition_name(date(2024, 3, 1)) == 'p202403'
+    assert partition_month('p202403') == date(2024, 3, 1)
+    assert partition_month('pmax') is None
+
+
+def test_retention_cutoff():
+    """保留当月和之前N个完整月份"""
+    assert retention_cutoff(3, date(2024, 5, 20)) == date(2024, 2, 1)
+    assert retention_cutoff(1, date(2024, 1, 31)) == date(2023, 12, 1)
+
+
+def test_memory_purge_keeps_stats():
+    """删除过期日志后，日志数减少，访问统计不变"""
+    db = MemoryDatabase(Config)
+    today = date.today()
+    old = datetime.combine(add_months(today.replace(day=1), -4), datetime.min.time())
+    db.seed(logs=[
+        ('10.0.0.1', 'ua', old),
+        ('10.0.0.2', 'ua', old + timedelta(days=1)),
+        ('10.0.0.1', 'ua', datetime.now()),
+    ])
+    
+    async def scenario():
+        before = await db.get_access_stats(days=7)
+        result = await run_log_maintenance(db, retention_months=2)
+        return before, result, await db.get_access_stats(days=7), await db.get_access_logs_count()
+    
+    before, result, after, count = asyncio.run(scenario())
+    assert result['cutoff'] == retention_cutoff(2)
+    assert result['purged_rows'] == 2
+    assert result['partitions_added'] == []
+    assert count == 1
+    assert after == before
+    assert after['total_visits'] == 3
+
+
+def test_maintenance_task_counts_failures():
+    """维护失败只计数，不抛出异常"""
+    class BrokenDatabase:
+        async def ensure_log_partitions(self, through):
+            raise RuntimeError("database down")
+    
+    task = LogMaintenanceTask(BrokenDatabase(), retention_months=1)
+    assert asyncio.run(task.run_once()) is None
+    stats = task.stats()
+    assert stats['runs'] == 1
+    assert stats['failures'] == 1
+
+
+class ScriptedCursor:
+    """记录执行的SQL，按语句内容返回结果"""
+    
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.statements = []
+        self.result = None
+        self.connection = self
+    
+    async def commit(self):
+        self.statements.append('COMMIT')
+    
+    async def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        self.statements.append(sql)
+        if 'information_schema.PARTITIONS' in sql:
+            self.result = [{'name': name} for name in self.partitions]
+        elif sql.startswith('SELECT COUNT(*)'):
+            self.result = [{'count': 10}]
+        if sql.startswith('INSERT IGNORE INTO access_log_purges'):
+            return 1
+        if sql.startswith('ALTER TABLE access_logs DROP PARTITION'):
+            self.partitions.remove(sql.rsplit(' ', 1)[1])
+        return 0
+    
+    async def fetchall(self):
+        return self.result
+    
+    async def fetchone(self):
+        return self.result[0]
+
+
+def make_mysql(partitions):
+    db = AsyncDatabase(Config)
+    db.cursor = ScriptedCursor(partitions)
+    db._log_stats_ready = True
+    db._hits_column = True
+    
+    async def ensure_access_log_stats():
+        return True
+    
+    @asynccontextmanager
+    async def maintenance_cursor():
+        yield db.cursor
+    
+    db.ensure_access_log_stats = ensure_access_log_stats
+    db.maintenance_cursor = maintenance_cursor
+    return db
+
+
+def test_mysql_purge_rolls_up_before_drop():
+    """MySQL按分区删除：先汇总、记录、提交，再DROP PARTITION"""
+    db = make_mysql(['p202401', 'p202402', 'p202403', 'pmax'])
+    purged = asyncio.run(db.purge_access_logs(date(2024, 3, 1)))
+    
+    assert purged == 20
+    assert db.cursor.partitions == ['p202403', 'pmax']
+    statements = [s.split(' (')[0] for s in db.cursor.statements]
+    first = statements.index('ALTER TABLE access_logs DROP PARTITION p202401')
+    assert statements[1:first + 1] == [
+        'INSERT INTO access_log_daily',
+        'SELECT COUNT(*) AS count FROM access_logs PARTITION',
+        'INSERT IGNORE INTO access_log_purges',
+        "UPDATE table_counters SET row_count = row_count + IF(table_name = 'access_logs', -%s, %s) WHERE table_name IN",
+        'COMMIT',
+        'ALTER TABLE access_logs DROP PARTITION p202401',
+    ]
+    assert 'FROM access_logs PARTITION (p202401)' in db.cursor.statements[1]
+    assert db.cursor.statements[-2].startswith('DELETE FROM access_log_daily_ips')
+
+
+def test_mysql_adds_future_partitions():
+    """只拆分 pmax 新建缺少的月份"""
+    db = make_mysql(['p202401', 'p202402', 'pmax'])
+    added = asyncio.run(db.ensure_log_partitions(date(2024, 4, 1)))
+    
+    assert added == ['p202403', 'p202404']
+    alter = db.cursor.statements[-1]
+    assert alter.startswith('ALTER TABLE access_logs REORGANIZE PARTITION pmax INTO')
+    assert "PARTITION p202404 VALUES LESS THAN ('2024-05-01')" in alter
+    assert alter.endswith('PARTITION pmax VALUES LESS THAN (MAXVALUE) )')
+
+
+def test_mysql_unpartitioned_table_is_skipped():
+    """未分区的表不做任何修改"""
+    db = make_mysql([])
+    assert asyncio.run(db.purge_access_logs(date(2024, 3, 1))) == 0
+    assert asyncio.run(db.ensure_log_partitions(date(2024, 4, 1))) == []
+    assert not any(s.startswith(('ALTER', 'DELETE')) for s in db.cursor.statements)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+生产模式多进程启动器测试
+"""
+
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from app.server import ServerSettings, available_cpus, parse_workers
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def test_parse_workers():
+    """auto 或空表示CPU数，最少1个"""
+    assert parse_workers('auto') == available_cpus()
+    assert parse_workers('') == available_cpus()
+    assert parse_workers('3') == 3
+    assert parse_workers('0') == 1
+
+
+def test_settings_from_env():
+    """启动参数从环境变量读取，未设置时使用默认值"""
+    settings = ServerSettings.from_env({
+        'HOST': '0.0.0.0',
+        'PORT': '9000',
+        'WORKERS': '4',
+        'BACKLOG': '512',
+        'KEEPALIVE_TIMEOUT': '75',
+        'REUSE_PORT': 'true',
+        'PRELOAD_APP': 'false',
+    })
+    assert (settings.host, settings.port, settings.workers) == ('0.0.0.0', 9000, 4)
+    assert settings.backlog == 512
+    assert settings.keepalive_timeout == 75
+    assert settings.reuse_port is True
+    assert settings.preload_app is False
+    
+    defaults = ServerSettings.from_env({})
+    assert defaults.workers == available_cpus()
+    assert (defaults.backlog, defaults.keepalive_timeout, defaults.graceful_timeout) == (2048, 5, 30)
+    assert defaults.reuse_port is False
+    assert defaults.preload_app is True
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class ServerProcess:
+    """在子进程中以生产模式运行 run.py，收集就绪的worker pid"""
+    
+    def __init__(self, **env):
+        self.port = free_port()
+        environ = dict(
+            os.environ,
+            RUN_MODE='production',
+            HOST='127.0.0.1',
+            PORT=str(self.port),
+            STORAGE_BACKEND='memory',
+            SECRET_KEY='test-secret-key',
+            ACCESS_LOG_MAINTENANCE_INTERVAL='0',
+            GRACEFUL_TIMEOUT='5',
+            **env,
+        )
+        self.process = subprocess.Popen(
+            [sys.executable, 'run.py'],
+            cwd=BACKEND_DIR,
+            env=environ,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        os.set_blocking(self.process.stderr.fileno(), False)
+        self._output = b''
+    
+    def read_output(self):
+        while not self.process.stderr.closed:
+            try:
+                chunk = os.read(self.process.stderr.fileno(), 65536)
+            except BlockingIOError:
+                break
+            if not chunk:
+                break
+            self._output += chunk
+        return self._output.decode('utf-8', 'replace')
+    
+    def ready_pids(self):
+        return [int(pid) for pid in re.findall(r'worker进程已就绪 pid=(\d+)', self.read_output())]
+    
+    def wait_for(self, predicate, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if predicate():
+                return True
+            if self.process.poll() is not None:
+                break
+            time.sleep(0.1)
+        raise AssertionError(f"等待超时，服务输出:\n{self.read_output()}")
+    
+    def get(self, path='/api/health'):
+        with urllib.request.urlopen(f'http://127.0.0.1:{self.port}{path}', timeout=5) as response:
+            return response.status
+    
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+        try:
+            return self.process.wait(timeout=30)
+        finally:
+            self.read_output()
+            self.process.stderr.close()
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="需要fork")
+@pytest.mark.parametrize('reuse_port', ['false', 'true'])
+def test_prefork_supervises_and_rolls_workers(reuse_port):
+    """启动多个worker；被杀掉的worker自动重启；SIGHUP滚动替换全部worker且不中断服务；SIGTERM正常退出"""
+    server = ServerProcess(WORKERS='2', REUSE_PORT=reuse_port)
+    try:
+        server.wait_for(lambda: len(server.ready_pids()) == 2)
+        assert server.get() == 200
+        
+        first, second = server.ready_pids()
+        os.kill(first, signal.SIGKILL)
+        server.wait_for(lambda: len(server.ready_pids()) == 3)
+        assert server.get() == 200
+        
+        before = set(server.ready_pids()) - {first}
+        server.process.send_signal(signal.SIGHUP)
+        failures = 0
+        deadline = time.monotonic() + 30
+        while '滚动重启完成' not in server.read_output():
+            assert time.monotonic() < deadline, server.read_output()
+            try:
+                server.get()
+            except OSError:
+                failures += 1
+            time.sleep(0.05)
+        assert failures == 0
+        assert len(set(server.ready_pids()) - before - {first}) == 2
+        assert server.get() == 200
+    finally:
+        code = server.stop()
+    assert code == 0, server.read_output()
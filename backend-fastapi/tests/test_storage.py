@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+存储后端测试（内存、SQLite 共用同一组用例）
+"""
+
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.config import Config
+from app.storage import MemoryDatabase, SQLiteDatabase, create_database
+
+
+class StorageConfig(Config):
+    ADMIN_INITIAL_PASSWORD = 'initial-password'
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def make_storage(request, tmp_path):
+    """创建存储后端，测试结束后关闭"""
+    created = []
+    
+    def factory():
+        class TestConfig(StorageConfig):
+            STORAGE_BACKEND = request.param
+            SQLITE_PATH = str(tmp_path / 'test.db')
+        db = create_database(TestConfig)
+        created.append(db)
+        return db
+    
+    yield factory
+    for db in created:
+        asyncio.run(db.close())
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_create_database_backends(tmp_path):
+    """STORAGE_BACKEND 选择对应实现，未知值报错"""
+    class SQLiteConfig(Config):
+        STORAGE_BACKEND = 'sqlite'
+        SQLITE_PATH = str(tmp_path / 'test.db')
+    
+    class UnknownConfig(Config):
+        STORAGE_BACKEND = 'oracle'
+    
+    memory = create_database(type('MemoryConfig', (Config,), {'STORAGE_BACKEND': 'memory'}))
+    sqlite = create_database(SQLiteConfig)
+    assert isinstance(memory, MemoryDatabase)
+    assert isinstance(sqlite, SQLiteDatabase)
+    run(memory.close())
+    run(sqlite.close())
+    
+    with pytest.raises(ValueError):
+        create_database(UnknownConfig)
+
+
+def test_config_and_version(make_storage):
+    """更新配置递增版本号，快照包含最后修改时间"""
+    db = make_storage()
+    
+    async def scenario():
+        assert await db.get_config_snapshot() == ({}, None)
+        version = await db.get_config_version()
+        await db.update_config('main_title', 'Hello')
+        await db.update_config('main_title', 'Hello World')
+        await db.update_config('sub_title', 'Hi')
+        configs, updated_at = await db.get_config_snapshot()
+        return version, await db.get_config_version(), configs, updated_at, await db.get_all_config()
+    
+    version, new_version, configs, updated_at, all_config = run(scenario())
+    assert new_version == version + 3
+    assert configs == {'main_title': 'Hello World', 'sub_title': 'Hi'}
+    assert isinstance(updated_at, datetime)
+    assert all_config == configs
+
+
+def test_update_configs_bumps_version_once(make_storage):
+    """多个配置项一次写入，版本号只加1并返回"""
+    db = make_storage()
+    
+    async def scenario():
+        version = await db.get_config_version()
+        new_version = await db.update_configs({'main_title': 'A', 'sub_title': 'B'})
+        return version, new_version, await db.get_config_version(), await db.get_all_config()
+    
+    version, new_version, current, configs = run(scenario())
+    assert new_version == current == version + 1
+    assert configs == {'main_title': 'A', 'sub_title': 'B'}
+
+
+def test_admin_login_and_password_change(make_storage):
+    """初始管理员可以登录，修改密码后旧密码失效"""
+    db = make_storage()
+    
+    async def scenario():
+        user = await db.verify_admin('admin', 'initial-password')
+        assert await db.verify_admin('admin', 'wrong') is None
+        assert await db.verify_admin('nobody', 'initial-password') is None
+        await db.update_admin_password('admin', 'new-password')
+        return (
+            user,
+            await db.get_admin_by_id(user['id']),
+            await db.verify_admin('admin', 'initial-password'),
+            await db.verify_admin('admin', 'new-password'),
+        )
+    
+    user, by_id, old_login, new_login = run(scenario())
+    assert user['username'] == 'admin'
+    assert by_id == user
+    assert 'password_hash' not in by_id
+    assert old_login is None
+    assert new_login == user
+
+
+def test_access_logs_pagination(make_storage):
+    """页码分页与游标分页结果一致，同一秒的记录按ID区分"""
+    db = make_storage()
+    start = datetime(2024, 1, 1)
+    rows = [(f'10.0.0.{i % 3}', 'ua', start + timedelta(seconds=i // 2)) for i in range(25)]
+    
+    async def scenario():
+        assert await db.add_access_logs(rows) == 25
+        offset_pages = [await db.get_access_logs(page=p, page_size=10) for p in (1, 2, 3)]
+        
+        cursor_pages = []
+        page = await db.get_access_logs_by_cursor(page_size=10)
+        cursor_pages.append(page)
+        while page['next_cursor']:
+            page = await db.get_access_logs_by_cursor(page['next_cursor'], page_size=10)
+            cursor_pages.append(page)
+        back = await db.get_access_logs_by_cursor(cursor_pages[-1]['prev_cursor'], page_size=10)
+        return offset_pages, cursor_pages, back, await db.get_access_logs_count()
+    
+    offset_pages, cursor_pages, back, count = run(scenario())
+    assert count == 25
+    assert [len(p) for p in offset_pages] == [10, 10, 5]
+    assert [p['logs'] for p in cursor_pages] == offset_pages
+    assert cursor_pages[0]['prev_cursor'] is None
+    assert back['logs'] == offset_pages[1]
+    
+    ordered = [(log['access_time'], log['id']) for page in offset_pages for log in page]
+    assert ordered == sorted(ordered, reverse=True)
+    assert len(set(log_id for _, log_id in ordered)) == 25
+
+
+def test_invalid_cursor(make_storage):
+    """无效游标抛出 ValueError"""
+    db = make_storage()
+    with pytest.raises(ValueError):
+        run(db.get_access_logs_by_cursor('not-a-cursor'))
+
+
+def test_iter_access_logs_range(make_storage):
+    """按时间范围分批读取，批次按时间升序"""
+    db = make_storage()
+    start = datetime(2024, 1, 1)
+    rows = [('10.0.0.1', 'ua', start + timedelta(minutes=i)) for i in range(30)]
+    
+    async def scenario():
+        await db.add_access_logs(rows)
+        batches = []
+        async for batch in db.iter_access_logs(
+            start + timedelta(minutes=5), start + timedelta(minutes=25), batch_size=7
+        ):
+            batches.append(batch)
+        return batches
+    
+    batches = run(scenario())
+    assert [len(b) for b in batches] == [7, 7, 6]
+    times = [log['access_time'] for batch in batches for log in batch]
+    assert times == [start + timedelta(minutes=i) for i in range(5, 25)]
+
+
+def test_access_stats(make_storage):
+    """统计总访问量、独立IP和按天汇总"""
+    db = make_storage()
+    now = datetime.now().replace(microsecond=0)
+    yesterday = now - timedelta(days=1)
+    
+    async def scenario():
+        await db.add_access_logs([
+            ('10.0.0.1', 'ua', yesterday),
+            ('10.0.0.2', 'ua', yesterday),
+            ('10.0.0.1', 'ua', now),
+        ])
+        await db.add_access_logs([('10.0.0.1', 'ua', now), ('10.0.0.3', 'ua', now)])
+        return await db.get_access_stats(days=2)
+    
+    stats = run(scenario())
+    assert stats['total_visits'] == 5
+    assert stats['unique_ips'] == 3
+    assert stats['today_visits'] == 3
+    assert stats['today_unique_ips'] == 2
+    assert stats['daily'] == [
+        {'date': yesterday.date().isoformat(), 'visits': 2, 'unique_ips': 2},
+        {'date': date.today().isoformat(), 'visits': 3, 'unique_ips': 2},
+    ]
+
+
+def test_sqlite_persists_across_restarts(tmp_path):
+    """SQLite数据在重新打开后仍然存在，初始管理员不会重复创建"""
+    class TestConfig(StorageConfig):
+        SQLITE_PATH = str(tmp_path / 'test.db')
+    
+    async def write():
+        db = SQLiteDatabase(TestConfig)
+        await db.update_config('main_title', 'Persisted')
+        await db.update_admin_password('admin', 'changed')
+        await db.close()
+    
+    async def read():
+        db = SQLiteDatabase(TestConfig)
+        try:
+            return await db.get_all_config(), await db.verify_admin('admin', 'changed')
+        finally:
+            await db.close()
+    
+    run(write())
+    configs, user = run(read())
+    assert configs == {'main_title': 'Persisted'}
+    assert user is not None
+
+
+def test_purge_access_logs(make_storage):
+    """按保留期删除日志后，剩余日志可以正常分页，统计不变"""
+    db = make_storage()
+    now = datetime.now().replace(microsecond=0)
+    old = now - timedelta(days=400)
+    
+    async def scenario():
+        await db.add_access_logs([('10.0.0.1', 'ua', old), ('10.0.0.2', 'ua', old), ('10.0.0.1', 'ua', now)])
+        before = await db.get_access_stats(days=7)
+        purged = await db.purge_access_logs(now.date().replace(day=1))
+        page = await db.get_access_logs_by_cursor(page_size=10)
+        return before, purged, page, await db.get_access_logs_count(), await db.get_access_stats(days=7)
+    
+    before, purged, page, count, after = run(scenario())
+    assert purged == 2
+    assert count == 1
+    assert [log['access_time'] for log in page['logs']] == [now]
+    assert after == before
+
+
+def test_access_log_hits(make_storage):
+    """重复访问累加到首条日志上，日志数不变，总访问量和当天访问量增加，删除日志后统计不变"""
+    db = make_storage()
+    now = datetime.now().replace(microsecond=0)
+    old = now - timedelta(days=400)
+    
+    async def scenario():
+        await db.add_access_logs([('10.0.0.1', 'ua', old), ('10.0.0.1', 'ua', now), ('10.0.0.2', 'ua', now)])
+        assert await db.add_access_log_hits([('10.0.0.2', 'ua', now, 4), ('10.0.0.1', 'ua', old, 2)]) == 6
+        logs = await db.get_access_logs(page=1, page_size=10)
+        stats = await db.get_access_stats(days=1)
+        await db.purge_access_logs(now.date().replace(day=1))
+        return logs, stats, await db.get_access_logs_count(), await db.get_access_stats(days=1)
+    
+    logs, stats, count, after = run(scenario())
+    assert {(log['ip_address'], log['access_time']): log['hits'] for log in logs} == {
+        ('10.0.0.1', now): 1, ('10.0.0.2', now): 5, ('10.0.0.1', old): 3,
+    }
+    assert stats['total_visits'] == 9
+    assert stats['today_visits'] == 6
+    assert stats['today_unique_ips'] == 2
+    assert count == 2
+    assert after == stats
+
+
+def test_access_log_hits_match_user_agent(make_storage):
+    """同一IP后的两个访客在同一秒各有一条日志，重复次数累加到 User-Agent 相同的那条"""
+    db = make_storage()
+    now = datetime.now().replace(microsecond=0)
+    
+    async def scenario():
+        await db.add_access_logs([('10.0.0.1', 'Mozilla', now), ('10.0.0.1', 'curl', now)])
+        await db.add_access_log_hits([('10.0.0.1', 'curl', now, 3)])
+        return await db.get_access_logs(page=1, page_size=10)
+    
+    logs = run(scenario())
+    assert {log['user_agent']: log['hits'] for log in logs} == {'Mozilla': 1, 'curl': 4}
@@ -44,6 +44,23 @@ export interface LogsResult {
   }
 }
 
+export interface DailyStats {
+  date: string
+  visits: number
+  unique_ips: number
+}
+
+export interface StatsResult {
+  success: boolean
+  data: {
+    total_visits: number
+    unique_ips: number
+    today_visits: number
+    today_unique_ips: number
+    daily: DailyStats[]
+  }
+}
+
 // 登录
 export function login(data: LoginParams) {
   return request.post<any, LoginResult>('/admin/login', data)
@@ -70,3 +87,10 @@ export function getLogs(page: number = 1, pageSize: number = 20) {
     params: { page, page_size: pageSize },
   })
 }
+
+// 获取访问统计
+export function getStats(days: number = 7) {
+  return request.get<any, StatsResult>('/admin/stats', {
+    params: { days },
+  })
+}
@@ -37,6 +37,7 @@ export default {
     welcome: 'Welcome back',
     totalVisits: 'Total Visits',
     todayVisits: 'Today Visits',
+    uniqueIps: 'Unique Visitors',
     quickActions: 'Quick Actions',
     editContent: 'Edit Content',
     viewLogs: 'View Logs',
@@ -37,6 +37,7 @@ export default {
     welcome: '欢迎回来',
     totalVisits: '总访问量',
     todayVisits: '今日访问',
+    uniqueIps: '独立访客',
     quickActions: '快捷操作',
     editContent: '编辑内容',
     viewLogs: '查看日志',